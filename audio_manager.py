@@ -8,6 +8,7 @@ import os
 import json
 from flask import Response
 from config import Config
+from keyword_automaton import KeywordAutomaton
 
 class AudioManager:
     """Manages PCM audio file library and serving with ULTRA-FAST memory caching"""
@@ -18,6 +19,49 @@ class AudioManager:
         self.cached_files = set()
         self.memory_cache = {}  # 🚀 IN-MEMORY PCM FILE CACHE
         self._cache_loaded = False  # Prevent double loading
+        
+        # Stable integer clip IDs (append-only so per-session bitsets stay valid)
+        self.clip_ids = {}
+        self.clip_names = []
+        self.library_version = 0
+        self._reload_listeners = []
+        self._build_clip_index()
+        self._build_quick_matcher()
+    
+    def _build_clip_index(self):
+        """Assign an integer ID to every clip in the library"""
+        for category, files in self.audio_snippets.items():
+            names = files.values() if category == "quick_responses" else files.keys()
+            for filename in names:
+                if filename not in self.clip_ids:
+                    self.clip_ids[filename] = len(self.clip_names)
+                    self.clip_names.append(filename)
+    
+    def _build_quick_matcher(self):
+        """Compile quick-response phrases into one automaton (earlier phrases win)"""
+        matcher = KeywordAutomaton()
+        quick_responses = self.audio_snippets.get("quick_responses", {})
+        for priority, (phrase, filename) in enumerate(quick_responses.items()):
+            matcher.add(phrase, (priority, filename))
+        self.quick_matcher = matcher.build()
+    
+    def get_filler_clips(self):
+        """Latency-masking filler clips (never offered to the routers)"""
+        return self.audio_snippets.get(Config.FILLER_CATEGORY, {}).keys()
+    
+    def register_reload_listener(self, callback):
+        """Call callback() whenever the audio library changes (indexes, caches, prompts)"""
+        self._reload_listeners.append(callback)
+    
+    def _notify_library_change(self):
+        """Bump the library version and let dependent indexes rebuild"""
+        self.library_version += 1
+        self._build_quick_matcher()
+        for callback in self._reload_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Audio library listener failed: {e}")
     
     def _load_audio_snippets(self):
         """Load audio snippets configuration from JSON file"""
@@ -97,8 +141,8 @@ class AudioManager:
         prompt_text = "Available audio files:\n\n"
         
         for category, files in self.audio_snippets.items():
-            if category == "quick_responses":
-                continue  # Skip quick responses in main prompt
+            if category in ("quick_responses", Config.FILLER_CATEGORY):
+                continue  # Skip quick responses and fillers in main prompt
             
             # Format category name
             category_name = category.replace("_", " ").title()
@@ -113,15 +157,15 @@ class AudioManager:
     
     def get_quick_response(self, user_input):
         """Check if user input matches any quick response patterns"""
-        user_lower = user_input.lower()
-        quick_responses = self.audio_snippets.get("quick_responses", {})
+        matches = self.quick_matcher.find_all(user_input)
+        if not matches:
+            return None
         
-        for phrase, filename in quick_responses.items():
-            if phrase in user_lower:
-                print(f"⚡ QUICK RESPONSE CACHE HIT: '{phrase}' → {filename}")
-                return filename
-        
-        return None
+        # Same winner as the old scan: first phrase in library order that occurs
+        match = min(matches, key=lambda m: m.payload[0])
+        filename = match.payload[1]
+        print(f"⚡ QUICK RESPONSE CACHE HIT: '{match.phrase}' → {filename}")
+        return filename
     
     def serve_audio_file(self, filename):
         """🚀 SERVE PCM FILE FROM MEMORY CACHE (ULTRA-FAST!)"""
@@ -212,6 +256,7 @@ class AudioManager:
             self.audio_snippets[category] = {}
         
         self.audio_snippets[category][filename] = transcript
+        self._build_clip_index()
         
         # Save updated library
         with open('audio_snippets.json', 'w', encoding='utf-8') as f:
@@ -231,6 +276,8 @@ class AudioManager:
                 print(f"➕ Added to library but failed to cache PCM: {filename} - {e}")
         else:
             print(f"➕ Added to library: {filename} (PCM file not found for caching)")
+        
+        self._notify_library_change()
     
     def list_all_files(self):
         """List all PCM audio files with their memory cache status"""
@@ -262,6 +309,7 @@ class AudioManager:
         # Only load if not already loaded
         if not self._cache_loaded:
             self._load_all_files_into_memory()
+            self._notify_library_change()
     
     def __del__(self):
         """Cleanup method called when object is destroyed"""
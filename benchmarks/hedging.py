@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+HEDGED ROUTING BENCHMARK
+Turn latency with a single provider vs primary + hedged backup, using local stub
+providers: the primary has a slow tail (e.g. OpenAI latency spikes), the backup
+is a little slower on average but steady.
+
+Usage: python benchmarks/hedging.py [turns] [tail_rate]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_manager import audio_manager
+from hedged_router import HedgedRouter
+from router_stubs import StubRouter, tail_latency
+from session import StreamingSession
+
+
+def percentiles(latencies):
+    ordered = sorted(latencies)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    return {"p50": round(pick(0.5)), "p95": round(pick(0.95)), "p99": round(pick(0.99)), "max": round(ordered[-1])}
+
+
+def run(router, turns):
+    session = StreamingSession("bench", "inbound")
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        router.get_school_response("fees kitni hai", session)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return percentiles(latencies)
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tail_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.04
+
+    clip = next(iter(audio_manager.clip_ids))
+    make_primary = lambda: StubRouter("primary", tail_latency(60, 1500, tail_rate), ("AUDIO", clip), seed=1)
+    make_backup = lambda: StubRouter("backup", tail_latency(90, 1500, 0.01), ("AUDIO", clip), seed=2)
+
+    print(f"🧪 {turns} turns, primary slow tail on {tail_rate:.0%} of calls")
+    single = run(make_primary(), turns)
+    print(f"   primary only : {single}")
+
+    hedged = HedgedRouter(make_primary(), make_backup())
+    result = run(hedged, turns)
+    stats = hedged.get_stats()
+    print(f"   hedged       : {result}")
+    print(f"   hedge rate {stats['hedge_rate']:.1%}, backup won {stats['hedge_win_rate']:.1%} of hedges, "
+          f"hedge delay now {stats['hedge_delay_ms']}ms")
+    for role, provider in stats["providers"].items():
+        print(f"   {role:8s} {provider['histogram_ms']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+PROMPT TOKEN BENCHMARK
+Prompt tokens per LLM routing call (system + user message) with the whole clip
+library in the system prompt vs the per-turn retrieved shortlist, as the
+library grows with synthetic clips.
+
+Usage: python benchmarks/prompt_tokens.py [extra_clip_counts, e.g. 0,100,300]
+"""
+
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from audio_manager import audio_manager
+from clip_retriever import clip_retriever
+from router import response_router
+from session import StreamingSession
+from text_utils import estimate_tokens
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hinglish_utterances.json")
+TOPICS = ["hostel", "library", "canteen", "uniform", "books", "exam", "holiday", "sports_day",
+          "swimming", "art", "robotics", "parent_meeting", "medical", "lab", "trip"]
+
+
+def add_synthetic_clips(count):
+    """Grow the library with plausible extra clips (filename + Hinglish transcript)"""
+    category = audio_manager.audio_snippets.setdefault("synthetic", {})
+    for i in range(len(category), count):
+        topic = TOPICS[i % len(TOPICS)]
+        category[f"{topic}_info_{i}.mp3"] = f"जी, हमारे school में {topic.replace('_', ' ')} की सुविधा है, details {i} के लिए school visit करें।"
+
+
+def mean_prompt_tokens(utterances, top_k):
+    Config.CLIP_RETRIEVAL_TOP_K = top_k
+    clip_retriever.build()
+    system_prompt = response_router._build_base_prompt()
+
+    total = 0
+    for i, text in enumerate(utterances):
+        session = StreamingSession(f"CA{i:06d}")
+        total += estimate_tokens(system_prompt) + estimate_tokens(response_router._build_context_prompt(session, text))
+    return total / len(utterances)
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [0, 100, 300, 500]
+    top_k = Config.CLIP_RETRIEVAL_TOP_K or 8
+
+    with open(CORPUS, 'r', encoding='utf-8') as f:
+        utterances = [item["text"] for item in json.load(f)]
+
+    print(f"🧪 {len(utterances)} utterances, shortlist top-{top_k}")
+    print(f"   {'library clips':>13s} {'full library':>13s} {'shortlist':>10s} {'saved':>7s}")
+    for extra in sizes:
+        add_synthetic_clips(extra)
+        clips = sum(len(files) for category, files in audio_manager.audio_snippets.items() if category != "quick_responses")
+        before = mean_prompt_tokens(utterances, 0)
+        after = mean_prompt_tokens(utterances, top_k)
+        print(f"   {clips:13d} {before:13.0f} {after:10.0f} {(1 - after / before):7.0%}")
+
+    print("   (mean prompt tokens per routing call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+ROUTER REPLAY BENCHMARK
+Replays recorded conversations through a router offline and scores it
+against the reply each turn should have got: exact clip chain, first clip,
+reply type, invalid clips (not in the library), provider errors and
+p50/p95/p99 latency. Calls can be replayed concurrently for throughput.
+
+Corpus: logs/conversation_logs.csv (or any log in that format) or a curated
+YAML file like benchmarks/router_corpus.yaml. Each call runs on a fresh
+stub session that follows the reference conversation, so every turn sees
+the history the real call had.
+
+Routers, separated by '/':
+  openai, gemini   the LLM routers (router.py, router_gemini.py)
+  smart            SmartRouter keyword flow
+  quick,intent,... a routing_pipeline tier order (its llm tier uses LLM_ROUTER)
+
+Provider replies:
+  reference   a local stub answers every LLM request with the turn's reference
+              reply (measures parsing, resolution and router overhead)
+  live        the real provider; its raw replies are saved in the results
+  <file>.json recorded replies, {transcript: raw reply} or an earlier live
+              results file; turns missing from it get the reference reply
+
+Results are written as JSON; compare two runs with
+  python benchmarks/router_replay.py compare old.json new.json
+
+Usage: python benchmarks/router_replay.py [corpus] [routers] [concurrency] [replies] [output.json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import threading
+import contextlib
+from types import SimpleNamespace
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from audio_manager import audio_manager
+from logger import call_logger
+from session import StreamingSession
+from router_stubs import tail_latency
+from text_utils import estimate_tokens
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_corpus.yaml")
+STUB_MEDIAN_MS = 300  # stub provider latency: lognormal-ish median ...
+STUB_TAIL_MS = 1500  # ... with a slow tail
+STUB_TAIL_RATE = 0.03
+MAX_MISMATCHES = 50  # mismatched turns kept in the results for inspection
+
+_PARENT_LINE = re.compile(r'Parent: "(.*)"')
+
+
+def parse_expected(expect):
+    """Corpus reply → (response_type, content)"""
+    expect = str(expect).strip()
+    if expect.startswith("GENERATE:"):
+        return "TTS", expect[len("GENERATE:"):].strip()
+    return "AUDIO", " + ".join(clip.strip() for clip in expect.split('+') if clip.strip())
+
+
+def load_log_corpus(path):
+    """[(call_id, [(transcript, (response_type, content))])] from a conversation log"""
+    calls = defaultdict(list)
+    for call_sid, transcript, response_type, content in call_logger.load_answered_turns(path):
+        calls[call_sid].append((transcript, (response_type, content)))
+    return list(calls.items())
+
+
+def load_yaml_corpus(path):
+    """[(call_id, [(transcript, (response_type, content))])] from a curated YAML corpus"""
+    try:
+        import yaml
+    except ImportError:
+        raise SystemExit("❌ YAML corpora need PyYAML: pip install pyyaml")
+    with open(path, 'r', encoding='utf-8') as f:
+        corpus = yaml.safe_load(f) or {}
+    return [
+        (call.get("id") or f"call-{number}", [(turn["say"], parse_expected(turn["expect"])) for turn in call["turns"]])
+        for number, call in enumerate(corpus.get("calls", []), 1)
+    ]
+
+
+def load_corpus(path):
+    if path.endswith(('.yaml', '.yml')):
+        return load_yaml_corpus(path)
+    return load_log_corpus(path)
+
+
+def load_recorded(path):
+    """{transcript: raw provider reply} from a replies file or an earlier live results file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        recorded = json.load(f)
+    replies = recorded.get("replies")
+    return replies if isinstance(replies, dict) else recorded
+
+
+class ReplayProvider:
+    """
+    Stands in for the LLM providers during a replay
+
+    Requests are matched to their turn by the 'Parent: "<transcript>"' line of
+    the router's context prompt. In live mode the real provider answers and
+    its raw replies are captured so the run can be replayed later.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.live = source == "live"
+        self.recorded = load_recorded(source) if source not in ("reference", "live") else {}
+        self.references = {}
+        self.captured = {}
+        self.latency = tail_latency(STUB_MEDIAN_MS, STUB_TAIL_MS, STUB_TAIL_RATE)
+        self.rng = random.Random(7)
+        self._lock = threading.Lock()
+        self._server = None
+        self._patched = set()
+
+    def expect(self, calls):
+        """Register every turn's reference reply (a repeated transcript keeps its first)"""
+        for _, turns in calls:
+            for transcript, reference in turns:
+                self.references.setdefault(transcript, reference)
+
+    def _transcript(self, prompt):
+        lines = _PARENT_LINE.findall(prompt)
+        return lines[-1] if lines else ""
+
+    def reply(self, prompt, structured):
+        """Raw reply text for an LLM request, after a simulated provider delay"""
+        transcript = self._transcript(prompt)
+        with self._lock:
+            delay_ms = self.latency(self.rng)
+        time.sleep(delay_ms / 1000)
+
+        if transcript in self.recorded:
+            return self.recorded[transcript]
+        response_type, content = self.references.get(transcript, ("TTS", ""))
+        if structured:
+            if response_type == "TTS":
+                return json.dumps({"type": "GENERATE", "clips": [], "text": content}, ensure_ascii=False)
+            return json.dumps({"type": "AUDIO", "clips": [c.strip() for c in content.split('+')], "text": ""})
+        return f"GENERATE: {content}" if response_type == "TTS" else content
+
+    def _capture(self, prompt, text):
+        with self._lock:
+            self.captured[self._transcript(prompt)] = text
+
+    def _serve_openai(self):
+        """Local chat completions endpoint answering from reply()"""
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt = "\n".join(message["content"] for message in body["messages"])
+                response_format = body.get("response_format") or {}
+                text = provider.reply(prompt, response_format.get("type") == "json_schema")
+                tokens = estimate_tokens(prompt) + estimate_tokens(text)
+                payload = json.dumps({
+                    "id": "replay", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": tokens - estimate_tokens(text),
+                              "completion_tokens": estimate_tokens(text), "total_tokens": tokens},
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def openai_router(self):
+        """router.response_router wired to the stub (or capturing the live provider)"""
+        import router
+        if "openai" not in self._patched:
+            self._patched.add("openai")
+            if self.live:
+                completions = router.openai_client.chat.completions
+                create = completions.create
+
+                def capturing_create(messages, **options):
+                    response = create(messages=messages, **options)
+                    self._capture("\n".join(m["content"] for m in messages), response.choices[0].message.content)
+                    return response
+                completions.create = capturing_create
+            else:
+                from openai import OpenAI
+                router.openai_client = OpenAI(api_key="replay", base_url=self._serve_openai())
+        return router.response_router
+
+    def gemini_router(self):
+        """router_gemini.response_router_gemini with its model answering from reply() (or captured)"""
+        from router_gemini import response_router_gemini
+        if "gemini" not in self._patched:
+            self._patched.add("gemini")
+            model = response_router_gemini.model
+            provider = self
+
+            class ReplayModel:
+                def generate_content(self, prompt, generation_config=None, stream=False):
+                    if provider.live:
+                        response = model.generate_content(prompt, generation_config=generation_config)
+                        provider._capture(prompt, response.text)
+                        text = response.text
+                    else:
+                        text = provider.reply(prompt, Config.ROUTER_STRUCTURED_OUTPUT)
+                    response = SimpleNamespace(text=text, parts=[text], usage_metadata=None)
+                    return [response] if stream else response
+
+            response_router_gemini.model = ReplayModel()
+        return response_router_gemini
+
+    def llm_router(self, name):
+        if name == "gemini":
+            return self.gemini_router()
+        if name != "openai":
+            print(f"⚠️ LLM router '{name}' is not replayable, using OpenAI")
+        return self.openai_router()
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+
+
+def build_router(spec, provider):
+    """(router, pipeline or None) for a router spec"""
+    if spec == "smart":
+        from smart_router import smart_router
+        return smart_router, None
+    if spec in ("openai", "gemini"):
+        return provider.llm_router(spec), None
+
+    from routing_pipeline import RoutingPipeline
+    from decision_cache import decision_cache
+    from semantic_cache import semantic_cache
+    decision_cache.invalidate()  # every spec starts cold, so runs in one invocation compare fairly
+    semantic_cache.invalidate()
+    pipeline = RoutingPipeline(spec.split(','))
+    if "llm" in pipeline.tier_order:
+        pipeline.llm_router = provider.llm_router(Config.LLM_ROUTER)
+    return pipeline, pipeline
+
+
+def chain(content):
+    return [clip.strip() for clip in content.split('+') if clip.strip()]
+
+
+def score(reference, response):
+    """Per-turn outcome against the reference reply"""
+    expected_type, expected = reference
+    response_type, content = response
+    same_type = expected_type == response_type
+    outcome = {"type": same_type, "exact": same_type, "first_clip": same_type, "invalid": False}
+    if response_type == "AUDIO":
+        clips = chain(content)
+        outcome["invalid"] = not clips or any(clip not in audio_manager.clip_ids for clip in clips)
+    if same_type and expected_type == "AUDIO":
+        outcome["exact"] = clips == chain(expected)
+        outcome["first_clip"] = clips[:1] == chain(expected)[:1]
+    return outcome
+
+
+def replay_call(router, call_id, turns):
+    """Replay one call on a stub session that follows the reference conversation"""
+    session = StreamingSession(f"replay-{call_id}", "inbound")
+    results = []
+    for transcript, reference in turns:
+        session.turn_count += 1
+        error = False
+        start = time.perf_counter()
+        try:
+            response = router.get_school_response(transcript, session)
+        except Exception as e:
+            response, error = ("TTS", f"<error: {e}>"), True
+        latency_ms = (time.perf_counter() - start) * 1000
+        if not error and hasattr(router, "last_call_info"):
+            error = not router.last_call_info()[0]
+
+        outcome = score(reference, response)
+        outcome.update({"call": call_id, "transcript": transcript, "expected": list(reference),
+                        "got": list(response), "latency_ms": latency_ms, "error": error})
+        results.append(outcome)
+
+        session.record_parent_turn(transcript)
+        session.record_response(*reference)
+    return results
+
+
+def percentiles(latencies):
+    ordered = sorted(latencies)
+    pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 2)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99),
+            "mean": round(sum(ordered) / len(ordered), 2), "max": round(ordered[-1], 2)}
+
+
+def run(spec, calls, provider, concurrency):
+    router, pipeline = build_router(spec, provider)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            per_call = list(executor.map(lambda call: replay_call(router, *call), calls))
+    wall_s = time.perf_counter() - start
+
+    turns = [outcome for results in per_call for outcome in results]
+    count = len(turns) or 1
+    rate = lambda key: round(sum(outcome[key] for outcome in turns) / count, 3)
+    audio_turns = [outcome for outcome in turns if outcome["got"][0] == "AUDIO"]
+    result = {
+        "turns": len(turns),
+        "accuracy": {"exact": rate("exact"), "first_clip": rate("first_clip"), "type": rate("type")},
+        "invalid_clip_rate": round(sum(o["invalid"] for o in audio_turns) / len(audio_turns), 3) if audio_turns else 0.0,
+        "error_rate": rate("error"),
+        "latency_ms": percentiles([outcome["latency_ms"] for outcome in turns]) if turns else {},
+        "wall_s": round(wall_s, 3),
+        "throughput_tps": round(len(turns) / wall_s, 2) if wall_s else 0.0,
+        "mismatches": [
+            {key: outcome[key] for key in ("call", "transcript", "expected", "got")}
+            for outcome in turns if not outcome["exact"] or outcome["invalid"]
+        ][:MAX_MISMATCHES],
+    }
+    if pipeline is not None:
+        result["tiers"] = pipeline.get_stats()["tiers"]
+    return result
+
+
+def compare(old_path, new_path):
+    """Print metric changes per router between two results files"""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+
+    metrics = [("exact", lambda r: r["accuracy"]["exact"]), ("first_clip", lambda r: r["accuracy"]["first_clip"]),
+               ("invalid", lambda r: r["invalid_clip_rate"]), ("errors", lambda r: r["error_rate"]),
+               ("p50_ms", lambda r: r["latency_ms"]["p50"]), ("p95_ms", lambda r: r["latency_ms"]["p95"]),
+               ("p99_ms", lambda r: r["latency_ms"]["p99"]), ("tps", lambda r: r["throughput_tps"])]
+    print(f"📊 {old_path} → {new_path}")
+    for spec, result in new["routers"].items():
+        before = old["routers"].get(spec)
+        if not before or not result["turns"] or not before["turns"]:
+            print(f"   {spec}: not in both runs")
+            continue
+        changes = ", ".join(f"{name} {get(before)} → {get(result)}" for name, get in metrics)
+        print(f"   {spec}: {changes}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+        return
+
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS
+    specs = (sys.argv[2] if len(sys.argv) > 2 else "smart/openai/quick,intent,cache,semantic,llm").split('/')
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    source = sys.argv[4] if len(sys.argv) > 4 else "reference"
+    output_path = sys.argv[5] if len(sys.argv) > 5 else os.path.join(
+        Config.LOGS_FOLDER, f"router_replay_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+    if not os.path.exists(corpus_path):
+        print(f"❌ Corpus not found: {corpus_path}")
+        return
+    calls = [(call_id, turns) for call_id, turns in load_corpus(corpus_path) if turns]
+    if not calls:
+        print("❌ No answered turns in the corpus")
+        return
+
+    provider = ReplayProvider(source)
+    provider.expect(calls)
+    print(f"🧪 {len(calls)} calls, {sum(len(turns) for _, turns in calls)} turns from {corpus_path} "
+          f"(provider replies: {source}, concurrency {concurrency})")
+
+    results = {
+        "corpus": corpus_path, "calls": len(calls), "provider": source, "concurrency": concurrency,
+        "structured_output": Config.ROUTER_STRUCTURED_OUTPUT, "llm_router": Config.LLM_ROUTER,
+        "run_at": time.strftime("%Y-%m-%d %H:%M:%S"), "routers": {},
+    }
+    try:
+        for spec in specs:
+            result = run(spec, calls, provider, concurrency)
+            results["routers"][spec] = result
+            print(f"   {spec:30s} exact {result['accuracy']['exact']:.1%}, first clip "
+                  f"{result['accuracy']['first_clip']:.1%}, type {result['accuracy']['type']:.1%}, "
+                  f"invalid {result['invalid_clip_rate']:.1%}, errors {result['error_rate']:.1%}, "
+                  f"latency {result['latency_ms']}, {result['throughput_tps']} turns/s")
+    finally:
+        provider.close()
+    if provider.live:
+        results["replies"] = provider.captured
+
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 Saved {output_path}")
+
+
+if __name__ == "__main__":
+    main()
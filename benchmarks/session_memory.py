@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+SESSION MEMORY BENCHMARK
+Compares the memory footprint of 10k call sessions: the previous dict-based
+session with string history vs the slotted StreamingSession with a TurnRecord ring.
+
+Usage: python benchmarks/session_memory.py [session_count] [exchanges_per_call]
+"""
+
+import os
+import sys
+import time
+import queue
+import threading
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from session import StreamingSession
+
+
+class LegacySession:
+    """Attribute layout of StreamingSession before slots / TurnRecord history"""
+    
+    def __init__(self, call_sid, call_direction="inbound", lead_data=None):
+        self.call_sid = call_sid
+        self.call_direction = call_direction
+        self.lead_data = lead_data or {}
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        self.session_memory = Config.SESSION_FLAGS_TEMPLATE.copy()
+        self.session_variables = Config.SESSION_VARIABLES_TEMPLATE.copy()
+        self.conversation_history = []
+        self.accumulated_text = ""
+        self.last_activity_time = None
+        self.silence_threshold = Config.SILENCE_THRESHOLD
+        self.turn_state = "LISTENING"
+        self.turn_timestamps = {"LISTENING": time.time()}
+        self.turn_count = 0
+        self.last_turn_latencies = {}
+        self.completed_transcript = None
+        self._turn_lock = threading.Lock()
+        self.events = queue.Queue()
+        self._turn_worker = None
+        self._turn_worker_stop = threading.Event()
+        self.dg_connection = None
+        self.twilio_ws = None
+        self.stream_sid = None
+        self.next_response_type = None
+        self.next_response_content = None
+        self.next_transcript = None
+    
+    def add_to_history(self, speaker, message):
+        timestamp = time.strftime("%H:%M:%S")
+        self.conversation_history.append(f"[{timestamp}] {speaker}: {message}")
+
+
+# A typical admission-enquiry exchange
+SAMPLE_TURNS = [
+    ("AUDIO", "fees kitni hai class 2 ki", "fees_ask_class.mp3"),
+    ("AUDIO", "bus facility hai kya", "bus_ask_location.mp3"),
+    ("AUDIO", "school timing kya hai", "school_timings.mp3"),
+    ("TTS", "sunday ko visit kar sakte hain?", "जी, रविवार को स्कूल बंद रहता है। आप सोमवार से शुक्रवार सुबह आठ से तीन बजे तक आ सकते हैं।"),
+    ("AUDIO", "admission process batao", "admission_process_firsttime.mp3 + school_timings.mp3"),
+]
+
+
+def fill_legacy(session, exchanges):
+    for i in range(exchanges):
+        response_type, transcript, content = SAMPLE_TURNS[i % len(SAMPLE_TURNS)]
+        session.add_to_history("Parent", transcript)
+        session.add_to_history("Nisha", f"<{response_type}: {content}>")
+
+
+def fill_slotted(session, exchanges):
+    for i in range(exchanges):
+        response_type, transcript, content = SAMPLE_TURNS[i % len(SAMPLE_TURNS)]
+        session.record_parent_turn(transcript)
+        session.record_response(response_type, content)
+
+
+def measure(factory, fill, count, exchanges):
+    """Return (bytes allocated, seconds) to build `count` sessions"""
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    
+    sessions = []
+    for i in range(count):
+        session = factory(f"CA{i:08d}")
+        fill(session, exchanges)
+        sessions.append(session)
+    
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    
+    allocated = sum(stat.size_diff for stat in snapshot.compare_to(baseline, "filename"))
+    return allocated, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    exchanges = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    
+    print(f"🧪 {count} sessions x {exchanges} exchanges (history capacity {Config.HISTORY_CAPACITY})")
+    
+    results = {}
+    for label, factory, fill in (
+        ("before (dict + string history)", LegacySession, fill_legacy),
+        ("after (slots + TurnRecord ring)", StreamingSession, fill_slotted),
+    ):
+        allocated, elapsed = measure(factory, fill, count, exchanges)
+        results[label] = allocated
+        print(f"   {label:34s} {allocated / (1024 * 1024):8.1f}MB  "
+              f"{allocated // count:7d} B/session  {elapsed:.2f}s")
+    
+    before, after = results.values()
+    print(f"📉 Memory saved: {(before - after) / (1024 * 1024):.1f}MB ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
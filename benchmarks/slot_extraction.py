@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+SLOT EXTRACTION BENCHMARK
+Compares the previous per-router substring scan against the single-pass
+SlotExtractor on a corpus of Hinglish / Devanagari utterances: slot accuracy
+and microseconds per utterance.
+
+Usage: python benchmarks/slot_extraction.py [corpus.json] [repeats]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slot_extractor import slot_extractor
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hinglish_utterances.json")
+
+
+def legacy_extract(user_input):
+    """ResponseRouter._extract_session_variables before the shared extractor (returns a dict)"""
+    found = {}
+    user_lower = user_input.lower()
+
+    if any(word in user_lower for word in ["first time", "firsttime", "pehli bar", "naya admission"]):
+        found["admission_type"] = "firsttime"
+    elif any(word in user_lower for word in ["transfer", "dusre school se", "change school"]):
+        found["admission_type"] = "transfer"
+
+    class_mappings = {
+        "kg1": "KG1", "kg 1": "KG1", "nursery": "KG1", "pre kg": "KG1",
+        "kg2": "KG2", "kg 2": "KG2", "ukg": "KG2",
+        "1st class": "Class 1", "class 1": "Class 1", "first class": "Class 1", "पहली क्लास": "Class 1",
+        "2nd class": "Class 2", "class 2": "Class 2", "second class": "Class 2", "दूसरी क्लास": "Class 2",
+        "3rd class": "Class 3", "class 3": "Class 3", "third class": "Class 3", "तीसरी क्लास": "Class 3",
+        "4th class": "Class 4", "class 4": "Class 4", "fourth class": "Class 4", "चौथी क्लास": "Class 4",
+        "5th class": "Class 5", "class 5": "Class 5", "fifth class": "Class 5", "पांचवी क्लास": "Class 5"
+    }
+    for key, value in class_mappings.items():
+        if key in user_lower:
+            found["admission_class"] = value
+            break
+
+    location_indicators = ["area", "location", "jagah", "रहते हैं", "से आना है", "pick up"]
+    if any(indicator in user_lower for indicator in location_indicators):
+        words = user_input.split()
+        for i, word in enumerate(words):
+            if any(indicator in word.lower() for indicator in location_indicators):
+                if i > 0:
+                    found["student_location"] = words[i-1]
+                break
+
+    age_match = re.search(r'(\d+)\s*(?:years?|साल|वर्ष)', user_lower)
+    if age_match:
+        found["student_age"] = int(age_match.group(1))
+
+    if any(word in user_lower for word in ["fees", "fee", "फीस", "cost", "charges"]):
+        found["inquiry_focus"] = "fees"
+    elif any(word in user_lower for word in ["transport", "bus", "बस", "pickup"]):
+        found["inquiry_focus"] = "transport"
+    elif any(word in user_lower for word in ["activity", "activities", "sports", "खेल"]):
+        found["inquiry_focus"] = "activities"
+    elif any(word in user_lower for word in ["admission", "एडमिशन", "दाखिला"]):
+        found["inquiry_focus"] = "admission"
+
+    return found
+
+
+def score(extract, corpus):
+    """Return (utterances fully correct, slots correct, slots expected, wrong slots)"""
+    exact = correct = expected_total = wrong = 0
+    for item in corpus:
+        expected = item["expected"]
+        got = extract(item["text"])
+        if got == expected:
+            exact += 1
+        expected_total += len(expected)
+        correct += sum(1 for slot, value in expected.items() if got.get(slot) == value)
+        wrong += sum(1 for slot, value in got.items() if expected.get(slot) != value)
+    return exact, correct, expected_total, wrong
+
+
+def time_per_utterance(extract, corpus, repeats):
+    texts = [item["text"] for item in corpus]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            extract(text)
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+
+
+def main():
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    print(f"🧪 {len(corpus)} utterances x {repeats} repeats")
+    for label, extract in (
+        ("before (router substring scan)", legacy_extract),
+        ("after (single-pass extractor)", slot_extractor.extract),
+    ):
+        exact, correct, expected_total, wrong = score(extract, corpus)
+        micros = time_per_utterance(extract, corpus, repeats)
+        print(f"   {label:32s} utterances {exact:3d}/{len(corpus)}  "
+              f"slots {correct:3d}/{expected_total}  wrong {wrong:3d}  {micros:6.1f}µs/utterance")
+
+
+if __name__ == "__main__":
+    main()
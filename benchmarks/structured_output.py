@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+STRUCTURED OUTPUT BENCHMARK
+Free-text vs schema-constrained router output, end to end through
+router.ResponseRouter against a local stub of the chat completions API.
+
+The stub "model" picks a clip chain per request. Free-text replies carry the
+kinds of noise seen in production logs (quotes, .pcm extensions, typos,
+commentary, invented clip names) at NOISE_RATE. When a json_schema
+response_format is sent, replies are JSON restricted to the schema's enum,
+like constrained decoding. Latency is a base delay plus a per-output-token
+cost, so the extra JSON tokens are paid for.
+
+Reports the valid-turn rate (raw model output, and after the router's
+parsing/resolution) and client-side latency percentiles.
+
+Usage: python benchmarks/structured_output.py [turns] [noise_rate]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from config import Config
+from audio_manager import audio_manager
+from session import StreamingSession
+from text_utils import estimate_tokens
+import router
+
+BASE_LATENCY_MS = 120
+PER_TOKEN_MS = 8
+GENERATE_RATE = 0.1
+
+
+class StubModel:
+    """Deterministic (seeded) reply generator shared by the request handler threads"""
+
+    def __init__(self, noise_rate, seed=11):
+        self.noise_rate = noise_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        fillers = set(audio_manager.get_filler_clips())
+        self.clips = [clip for clip in audio_manager.clip_names
+                      if not clip.startswith('intro_klariqo') and clip not in fillers]
+
+    def _noisy(self, chain, rng):
+        kind = rng.choice(["quotes", "pcm", "typo", "commentary", "invented", "comma"])
+        if kind == "quotes":
+            return " + ".join(f'"{clip}"' for clip in chain)
+        if kind == "pcm":
+            return " + ".join(clip.replace('.mp3', '.pcm') for clip in chain)
+        if kind == "typo":
+            clip = chain[0]
+            at = rng.randrange(1, len(clip) - 5)
+            return " + ".join([clip[:at] + clip[at + 1:]] + chain[1:])
+        if kind == "commentary":
+            return f"Play these files: {' + '.join(chain)}"
+        if kind == "invented":
+            return " + ".join(chain + ["school_fee_structure_details.mp3"])
+        return ", ".join(chain)
+
+    def reply(self, structured):
+        """(reply text, intended (type, content))"""
+        with self.lock:
+            rng = random.Random(self.random.random())
+        if rng.random() < GENERATE_RATE:
+            text = "कृपया थोड़ा और स्पष्ट करें कि आप क्या जानना चाहते हैं?"
+            if structured:
+                return json.dumps({"type": "GENERATE", "clips": [], "text": text}, ensure_ascii=False), ("TTS", text)
+            return f"GENERATE: {text}", ("TTS", text)
+
+        chain = rng.sample(self.clips, rng.choice([1, 1, 2, 2, 3]))
+        intended = ("AUDIO", " + ".join(chain))
+        if structured:
+            return json.dumps({"type": "AUDIO", "clips": chain, "text": ""}), intended
+        if rng.random() < self.noise_rate:
+            return self._noisy(chain, rng), intended
+        return " + ".join(chain), intended
+
+
+def make_handler(model, log):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            response_format = body.get("response_format") or {}
+            text, intended = model.reply(response_format.get("type") == "json_schema")
+            completion_tokens = estimate_tokens(text)
+            time.sleep((BASE_LATENCY_MS + PER_TOKEN_MS * completion_tokens) / 1000)
+            log.append((text, intended))
+
+            payload = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": completion_tokens,
+                          "total_tokens": completion_tokens},
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def raw_valid(text):
+    """Would the reply be usable without any cleanup or fuzzy resolution?"""
+    if text.startswith("{"):
+        reply = json.loads(text)
+        return reply["type"] == "GENERATE" or all(clip in audio_manager.clip_ids for clip in reply["clips"])
+    if text.startswith("GENERATE:"):
+        return True
+    return all(clip.strip() in audio_manager.clip_ids for clip in text.split('+'))
+
+
+def run(structured, turns, noise_rate, port):
+    Config.ROUTER_STRUCTURED_OUTPUT = structured
+    model, log = StubModel(noise_rate), []
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(model, log))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    router.openai_client = OpenAI(api_key="stub", base_url=f"http://127.0.0.1:{port}/v1")
+    response_router = router.ResponseRouter()
+    latencies, valid, exact = [], 0, 0
+    try:
+        for turn in range(turns):
+            session = StreamingSession(f"bench-{turn}", "inbound")  # fresh call: no repeat filtering
+            start = time.perf_counter()
+            response_type, content = response_router.get_school_response("admission ke baare mein batao", session)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            _, intended = log[-1]
+            playable = response_type == "TTS" or all(clip.strip() in audio_manager.clip_ids for clip in content.split('+'))
+            valid += playable and response_router.last_call_info()[0]
+            exact += (response_type, content) == intended
+    finally:
+        server.shutdown()
+
+    latencies.sort()
+    pick = lambda fraction: round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))])
+    return {
+        "raw_valid_rate": round(sum(raw_valid(text) for text, _ in log) / len(log), 3),
+        "valid_rate": round(valid / turns, 3),
+        "intended_rate": round(exact / turns, 3),
+        "latency_ms": {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)},
+        "mean_completion_tokens": round(sum(estimate_tokens(text) for text, _ in log) / len(log), 1),
+    }
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    noise_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+
+    print(f"🧪 {turns} turns per mode, free-text noise on {noise_rate:.0%} of replies")
+    results = {
+        "free_text": run(False, turns, noise_rate, 18765),
+        "structured": run(True, turns, noise_rate, 18766),
+    }
+    for mode, result in results.items():
+        print(f"   {mode:10s} raw valid {result['raw_valid_rate']:.1%}, valid after parsing {result['valid_rate']:.1%}, "
+              f"as intended {result['intended_rate']:.1%}, latency {result['latency_ms']}, "
+              f"~{result['mean_completion_tokens']} completion tokens")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
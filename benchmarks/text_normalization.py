@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+TEXT NORMALIZATION BENCHMARK
+normalize_transcript on Hinglish / Devanagari transcripts: expected outputs
+(Devanagari vowel signs and viramas must survive, punctuation and dandas
+must not), distinct words that must stay distinct, and microseconds per
+utterance over the slot-extraction corpus.
+
+Usage: python benchmarks/text_normalization.py [repeats]
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_utils import normalize_transcript
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hinglish_utterances.json")
+
+CASES = [
+    ("फीस कितनी है?", "फीस कितनी है"),
+    ("हाँ जी, बताइए।", "हाँ जी बताइए"),
+    ("क्लास ३ में एडमिशन चाहिए!!", "क्लास ३ में एडमिशन चाहिए"),
+    ("Bus  facility hai kya?", "bus facility hai kya"),
+    ("स्कूल का समय क्या है॥", "स्कूल का समय क्या है"),
+]
+
+# Words that differ only in vowel signs - they must not normalize to the same string
+DISTINCT = [("कितना", "कितनी", "कितने"), ("की", "के", "का"), ("हाँ", "है")]
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    passed = 0
+    for text, expected in CASES:
+        got = normalize_transcript(text)
+        passed += got == expected
+        if got != expected:
+            print(f"   ❌ {text!r} → {got!r} (expected {expected!r})")
+    collapsed = [words for words in DISTINCT if len({normalize_transcript(w) for w in words}) != len(words)]
+    for words in collapsed:
+        print(f"   ❌ {' / '.join(words)} normalize to the same string")
+
+    with open(CORPUS, 'r', encoding='utf-8') as f:
+        utterances = [item["text"] for item in json.load(f)]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in utterances:
+            normalize_transcript(text)
+    per_call_us = (time.perf_counter() - start) / (repeats * len(utterances)) * 1e6
+
+    print(f"🧪 Expected outputs {passed}/{len(CASES)}, distinct word groups {len(DISTINCT) - len(collapsed)}/{len(DISTINCT)}, "
+          f"{per_call_us:.2f}µs per utterance")
+
+
+if __name__ == "__main__":
+    main()
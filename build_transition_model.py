@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+KLARIQO TRANSITION MODEL BUILDER
+Builds the next-turn transition table from logs/conversation_logs.csv: for
+every response Nisha gave (keyed by its clip chain, its last clip, or
+GENERATE), which response came next on the same call and how often.
+next_turn_predictor.py loads the result; prefetch.py uses it to render
+likely TTS replies while the parent is still talking.
+
+Calls are split 80/20 for the evaluation report: top-1 / top-k accuracy of
+the next response, and a prefetch simulation at PREFETCH_MIN_PROBABILITY
+(how many generated replies would have been rendered ahead, and how many of
+those renders would have been wasted). The saved table uses every call.
+
+Usage: python build_transition_model.py [conversation_logs.csv] [model.json]
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+from collections import Counter, defaultdict
+from config import Config
+from logger import call_logger
+from next_turn_predictor import state_keys, normalize_text
+
+DEFAULT_LOG = os.path.join(Config.LOGS_FOLDER, "conversation_logs.csv")
+MIN_TRANSITIONS = 2  # next responses seen fewer times than this after a state are dropped
+
+
+def call_sequences(turns):
+    """{call_sid: [(response_type, content), ...]} in log order"""
+    sequences = defaultdict(list)
+    for call_sid, _, response_type, content in turns:
+        if response_type == "TTS":
+            content = normalize_text(content)
+        if content:
+            sequences[call_sid].append((response_type, content))
+    return sequences
+
+
+def build(sequences, top_k):
+    """{state: {"total": n, "next": [[type, content, probability, count], ...]}}"""
+    counts = defaultdict(Counter)
+    for responses in sequences:
+        previous = (None, None)
+        for response in responses:
+            for key in state_keys(*previous):
+                counts[key][response] += 1
+            previous = response
+
+    transitions = {}
+    for state, following in counts.items():
+        total = sum(following.values())
+        top = [
+            [response_type, content, round(count / total, 4), count]
+            for (response_type, content), count in following.most_common(top_k)
+            if count >= MIN_TRANSITIONS
+        ]
+        if top:
+            transitions[state] = {"total": total, "next": top}
+    return transitions
+
+
+def predict(transitions, previous):
+    for key in state_keys(*previous):
+        entry = transitions.get(key)
+        if entry and entry["total"] >= Config.PREDICTOR_MIN_STATE_COUNT:
+            return entry["next"]
+    return []
+
+
+def evaluate(transitions, sequences, min_probability, max_renders):
+    """Next-response accuracy and simulated TTS prefetch on held-out calls"""
+    report = Counter()
+    for responses in sequences:
+        previous = (None, None)
+        for response in responses:
+            predictions = predict(transitions, previous)
+            report["turns"] += 1
+            report["covered"] += bool(predictions)
+            report["top1"] += bool(predictions) and tuple(predictions[0][:2]) == response
+            report["topk"] += any(tuple(p[:2]) == response for p in predictions)
+
+            renders = [p for p in predictions if p[0] == "TTS" and p[2] >= min_probability][:max_renders]
+            hit = any(p[1] == response[1] for p in renders) and response[0] == "TTS"
+            report["tts_turns"] += response[0] == "TTS"
+            report["renders"] += len(renders)
+            report["render_hits"] += hit
+            report["wasted_renders"] += len(renders) - hit
+            previous = response
+
+    turns = report["turns"] or 1
+    return {
+        "turns": report["turns"],
+        "coverage": round(report["covered"] / turns, 3),
+        "top1_accuracy": round(report["top1"] / turns, 3),
+        "topk_accuracy": round(report["topk"] / turns, 3),
+        "prefetch": {
+            "min_probability": min_probability,
+            "tts_turns": report["tts_turns"],
+            "renders": report["renders"],
+            "hits": report["render_hits"],
+            "wasted": report["wasted_renders"],
+            "tts_hit_rate": round(report["render_hits"] / report["tts_turns"], 3) if report["tts_turns"] else None,
+            "render_precision": round(report["render_hits"] / report["renders"], 3) if report["renders"] else None,
+        },
+    }
+
+
+def main():
+    log_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    model_path = sys.argv[2] if len(sys.argv) > 2 else Config.TRANSITION_MODEL_PATH
+
+    if not os.path.exists(log_path):
+        print(f"❌ Conversation log not found: {log_path}")
+        return
+
+    sequences = call_sequences(call_logger.load_answered_turns(log_path))
+    if not sequences:
+        print("❌ No answered turns in the log")
+        return
+
+    # Hold out whole calls, as in train_intent_classifier.py
+    held_out = {call_sid for call_sid in sequences if zlib.crc32(call_sid.encode('utf-8')) % 5 == 0}
+    if len(held_out) in (0, len(sequences)):
+        held_out = set(list(sequences)[::5])
+    train = [responses for call_sid, responses in sequences.items() if call_sid not in held_out]
+    test = [responses for call_sid, responses in sequences.items() if call_sid in held_out]
+
+    print(f"🧪 {len(sequences)} calls, {sum(len(r) for r in sequences.values())} responses "
+          f"(training on {len(train)} calls, evaluating on {len(test)})")
+    report = evaluate(build(train, Config.PREDICTOR_TOP_K), test,
+                      Config.PREFETCH_MIN_PROBABILITY, Config.PREFETCH_MAX_RENDERS)
+    print(f"📊 Next response: coverage {report['coverage']:.1%}, top-1 {report['top1_accuracy']:.1%}, "
+          f"top-{Config.PREDICTOR_TOP_K} {report['topk_accuracy']:.1%}")
+    prefetch = report["prefetch"]
+    if prefetch["tts_turns"]:
+        precision = f"{prefetch['render_precision']:.1%}" if prefetch["render_precision"] is not None else "-"
+        print(f"🔥 TTS prefetch at p≥{prefetch['min_probability']}: {prefetch['hits']}/{prefetch['tts_turns']} "
+              f"generated replies rendered ahead, {prefetch['wasted']} wasted renders (precision {precision})")
+
+    # Final table sees every call
+    transitions = build(list(sequences.values()), Config.PREDICTOR_TOP_K)
+
+    folder = os.path.dirname(model_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    model = {"calls": len(sequences), "log": log_path, "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+             "transitions": transitions}
+    with open(model_path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, ensure_ascii=False, indent=1)
+
+    report.update({"states": len(transitions), "log": log_path, "trained_at": model["trained_at"]})
+    report_path = os.path.splitext(model_path)[0] + "_report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    size_kb = os.path.getsize(model_path) // 1024
+    print(f"💾 Saved {model_path} ({size_kb}KB, {len(transitions)} states) and {report_path}")
+
+
+if __name__ == "__main__":
+    main()
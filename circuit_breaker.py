@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+KLARIQO CIRCUIT BREAKER MODULE
+Per-backend circuit breakers for the LLM routing tier: a rolling window of call
+outcomes opens the breaker when errors or slow calls go over budget, periodic
+probes close it again, and an in-flight cap sheds calls before the backend
+is overwhelmed. While a call is not allowed the caller answers locally.
+"""
+
+import time
+import threading
+from collections import deque
+from config import Config
+
+CLOSED = "CLOSED"        # calls flow normally
+OPEN = "OPEN"            # calls rejected until the cool-down ends
+HALF_OPEN = "HALF_OPEN"  # a limited number of probe calls decide whether to close
+
+
+class CircuitBreaker:
+    """Rolling error-rate / slow-call-rate breaker with in-flight load shedding"""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.window = deque()  # (finished_at, ok, latency_ms)
+        self.in_flight = 0
+        self.probes_in_flight = 0
+        self.probe_generation = 0  # bumped on every HALF_OPEN; only probes of the current one decide
+        self.events = deque(maxlen=Config.BREAKER_EVENT_HISTORY)
+        self.listeners = []
+        self.counters = {"allowed": 0, "rejected_open": 0, "shed": 0, "probes": 0, "opened": 0, "closed": 0}
+        self._lock = threading.Lock()
+
+    def register_listener(self, callback):
+        """callback(event_dict) on every state change"""
+        self.listeners.append(callback)
+
+    def _trim(self, now):
+        horizon = now - Config.BREAKER_WINDOW_SECONDS
+        while self.window and self.window[0][0] < horizon:
+            self.window.popleft()
+
+    def _rates(self):
+        calls = len(self.window)
+        if not calls:
+            return 0, 0.0, 0.0
+        errors = sum(1 for _, ok, _ in self.window if not ok)
+        slow = sum(1 for _, ok, latency in self.window if ok and latency > Config.BREAKER_SLOW_CALL_MS)
+        return calls, errors / calls, slow / calls
+
+    def _transition(self, new_state, reason, now):
+        """Caller holds the lock; returns the event for listeners"""
+        event = {"breaker": self.name, "from": self.state, "to": new_state, "reason": reason,
+                 "at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))}
+        self.state = new_state
+        if new_state == OPEN:
+            self.opened_at = now
+            self.counters["opened"] += 1
+        elif new_state == HALF_OPEN:
+            self.probe_generation += 1
+            self.probes_in_flight = 0
+        elif new_state == CLOSED:
+            self.window.clear()
+            self.counters["closed"] += 1
+        self.events.append(event)
+        return event
+
+    def _emit(self, event):
+        if not event:
+            return
+        icon = {OPEN: "🔴", HALF_OPEN: "🟡", CLOSED: "🟢"}[event["to"]]
+        print(f"{icon} Circuit breaker '{self.name}' {event['from']} → {event['to']} ({event['reason']})")
+        for callback in self.listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"❌ Circuit breaker listener failed: {e}")
+
+    def acquire(self):
+        """
+        Ask to make a backend call: (allowed, reason, probe)
+
+        reason is None when allowed, otherwise "open" (breaker tripped) or
+        "shed" (too many calls in flight). probe is a token for a half-open
+        probe call (None otherwise). An allowed call must be followed by
+        release(), passing the probe token back.
+        """
+        event = None
+        probe = None
+        now = time.time()
+        with self._lock:
+            if self.state == OPEN and now - self.opened_at >= Config.BREAKER_OPEN_SECONDS:
+                event = self._transition(HALF_OPEN, f"probing after {Config.BREAKER_OPEN_SECONDS}s", now)
+
+            if self.state == OPEN:
+                self.counters["rejected_open"] += 1
+                allowed, reason = False, "open"
+            elif self.state == HALF_OPEN:
+                if self.probes_in_flight >= Config.BREAKER_PROBE_CALLS:
+                    self.counters["rejected_open"] += 1
+                    allowed, reason = False, "open"
+                else:
+                    self.probes_in_flight += 1
+                    self.in_flight += 1
+                    self.counters["probes"] += 1
+                    allowed, reason, probe = True, None, self.probe_generation
+            elif self.in_flight >= Config.BREAKER_MAX_IN_FLIGHT:
+                self.counters["shed"] += 1
+                allowed, reason = False, "shed"
+            else:
+                self.in_flight += 1
+                self.counters["allowed"] += 1
+                allowed, reason = True, None
+
+        self._emit(event)
+        return allowed, reason, probe
+
+    def release(self, ok, latency_ms, probe=None):
+        """Record the outcome of an allowed call (probe: the token acquire() returned)"""
+        event = None
+        now = time.time()
+        slow = latency_ms > Config.BREAKER_SLOW_CALL_MS
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+            if probe is not None and self.state == HALF_OPEN and probe == self.probe_generation:
+                self.probes_in_flight = max(0, self.probes_in_flight - 1)
+                if ok and not slow:
+                    event = self._transition(CLOSED, f"probe ok in {int(latency_ms)}ms", now)
+                else:
+                    event = self._transition(OPEN, "probe failed" if not ok else f"probe slow ({int(latency_ms)}ms)", now)
+            elif probe is None and self.state == CLOSED:
+                self.window.append((now, ok, latency_ms))
+                self._trim(now)
+                calls, error_rate, slow_rate = self._rates()
+                if calls >= Config.BREAKER_MIN_CALLS:
+                    if error_rate > Config.BREAKER_ERROR_RATE:
+                        event = self._transition(OPEN, f"error rate {error_rate:.0%} over {calls} calls", now)
+                    elif slow_rate > Config.BREAKER_SLOW_RATE:
+                        event = self._transition(OPEN, f"slow-call rate {slow_rate:.0%} over {calls} calls", now)
+            # Calls admitted before a trip (finishing while OPEN or HALF_OPEN) and probes
+            # of a round another probe already decided have nothing to teach
+
+        self._emit(event)
+
+    def get_stats(self):
+        """State, rolling rates and counters"""
+        with self._lock:
+            self._trim(time.time())
+            calls, error_rate, slow_rate = self._rates()
+            stats = dict(self.counters)
+            stats.update({
+                "state": self.state,
+                "in_flight": self.in_flight,
+                "window_calls": calls,
+                "error_rate": round(error_rate, 3),
+                "slow_rate": round(slow_rate, 3),
+                "recent_events": list(self.events)[-5:],
+            })
+        return stats
+
+
+class CircuitBreakerRegistry:
+    """One breaker per routing backend name, created on first use"""
+
+    def __init__(self):
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name)
+            return self.breakers[name]
+
+    def get_stats(self):
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {name: breaker.get_stats() for name, breaker in breakers.items()}
+
+# Global circuit breakers (keyed by routing backend)
+circuit_breakers = CircuitBreakerRegistry()
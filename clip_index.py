@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+KLARIQO PLAYED-CLIP INDEX MODULE
+Per-session record of played clips (bitset over library clip IDs) and
+repeat filtering applied to router output
+"""
+
+from config import Config
+from audio_manager import audio_manager
+
+
+class PlayedClipIndex:
+    """Bitset of played clip IDs plus play counts and last-played turn"""
+
+    __slots__ = ("bits", "play_counts", "last_played_turn")
+
+    def __init__(self):
+        self.bits = 0
+        self.play_counts = {}       # clip_id -> times played
+        self.last_played_turn = {}  # clip_id -> turn number
+
+    def mark_played(self, clip_id, turn):
+        """Record that a clip was played on the given turn"""
+        self.bits |= 1 << clip_id
+        self.play_counts[clip_id] = self.play_counts.get(clip_id, 0) + 1
+        self.last_played_turn[clip_id] = turn
+
+    def mark_chain(self, clips, turn):
+        """Record every known clip of a played chain"""
+        for clip in clips:
+            clip_id = audio_manager.clip_ids.get(clip)
+            if clip_id is not None:
+                self.mark_played(clip_id, turn)
+
+    def was_played(self, clip_id):
+        """O(1) check whether a clip was ever played in this call"""
+        return (self.bits >> clip_id) & 1 == 1
+
+    def played_within(self, clip_id, turn, window):
+        """True if the clip was played within the last `window` turns"""
+        if not self.was_played(clip_id):
+            return False
+        return turn - self.last_played_turn[clip_id] <= window
+
+    def play_count(self, clip):
+        """Get how many times a clip (by filename) was played"""
+        clip_id = audio_manager.clip_ids.get(clip)
+        return self.play_counts.get(clip_id, 0) if clip_id is not None else 0
+
+    def played_count(self):
+        """Number of distinct clips played"""
+        return bin(self.bits).count("1")
+
+
+def fresh_clip(clip, session, kept=()):
+    """
+    The clip itself, a fresh configured alternative, or None when playing it
+    would repeat something heard within the last REPEAT_WINDOW_TURNS turns
+    """
+    index = session.played_clips
+    turn = session.turn_count
+    window = Config.REPEAT_WINDOW_TURNS
+    clip_ids = audio_manager.clip_ids
+
+    def is_fresh(name):
+        clip_id = clip_ids.get(name)
+        return clip_id is None or not index.played_within(clip_id, turn, window)
+
+    if clip in Config.REPEAT_EXEMPT_CLIPS or is_fresh(clip):
+        return clip
+    for alternative in Config.REPEAT_ALTERNATIVES.get(clip, ()):
+        if alternative not in kept and is_fresh(alternative):
+            return alternative
+    return None
+
+
+def filter_repeats(response_type, content, session):
+    """
+    Remove clips the caller heard within the last REPEAT_WINDOW_TURNS turns
+
+    Repeated clips are swapped for a configured alternative when one is fresh,
+    otherwise dropped. Only when nothing is left does the response become a
+    generated (TTS) reply.
+    """
+    if response_type != "AUDIO" or not content:
+        return response_type, content
+
+    kept = []
+    repeats = []
+    for clip in (f.strip() for f in content.split('+')):
+        if not clip or clip in kept:
+            continue
+
+        chosen = fresh_clip(clip, session, kept)
+        if chosen != clip:
+            repeats.append(clip)
+        if chosen:
+            kept.append(chosen)
+
+    if not repeats:
+        return response_type, content
+
+    if kept:
+        filtered = " + ".join(kept)
+        print(f"🔁 Repeat filtered: {', '.join(repeats)} → {filtered}")
+        return "AUDIO", filtered
+
+    print(f"🔁 Repeat filtered: {', '.join(repeats)} → GENERATE")
+    return "TTS", Config.REPEAT_FALLBACK_TEXT
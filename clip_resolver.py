@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+KLARIQO CLIP RESOLVER MODULE
+Maps clip names written by the LLM router onto the audio library: exact
+lookup, then a normalized-name map (case, quotes, extension, separators),
+then a trigram index verified by edit distance. Built at library load;
+resolved names are memoized so repeats cost a dict lookup.
+"""
+
+import re
+import threading
+from collections import Counter
+from config import Config
+from audio_manager import audio_manager
+from logger import call_logger
+
+_EXTENSION = re.compile(r"\.(mp3|pcm|wav|mpeg|mp)$")
+_SEPARATORS = re.compile(r"[\s\-.]+")
+_STRIP = "\"'`*,;:()[]<> "
+
+
+def normalize_clip_name(name):
+    """Lowercase, no quotes/extension, spaces/hyphens/dots → single underscores"""
+    name = name.strip(_STRIP).lower()
+    name = _EXTENSION.sub("", name)
+    name = _SEPARATORS.sub("_", name)
+    return re.sub(r"_+", "_", name).strip("_")
+
+
+def trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ClipResolver:
+    """Exact → normalized → trigram/edit-distance resolution over the clip library"""
+
+    def __init__(self):
+        self.normalized = {}   # normalized key → clip filename
+        self.keys = []         # normalized keys, position = key id
+        self.postings = {}     # trigram → [key ids]
+        self.memo = {}         # raw name → (clip or None, method, distance)
+        self.near_misses = Counter()
+        self.stats = Counter()
+        self._lock = threading.Lock()
+
+        self.build()
+        audio_manager.register_reload_listener(self.build)
+
+    def build(self):
+        """Index every library clip name (called again on each library reload)"""
+        normalized, keys, postings = {}, [], {}
+        for clip in audio_manager.clip_names:
+            key = normalize_clip_name(clip)
+            if key in normalized:
+                continue
+            normalized[key] = clip
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(len(keys))
+            keys.append(key)
+
+        with self._lock:
+            self.normalized, self.keys, self.postings = normalized, keys, postings
+            self.memo = {}
+        print(f"🩹 Clip resolver indexed {len(keys)} clip names")
+
+    def _fuzzy(self, key):
+        """Closest clip by edit distance among the keys sharing the most trigrams, if unambiguous"""
+        shared = Counter()
+        for gram in trigrams(key):
+            for key_id in self.postings.get(gram, ()):
+                shared[key_id] += 1
+
+        limit = max(1, int(len(key) * Config.CLIP_RESOLVER_MAX_EDIT_RATIO))
+        best, best_distance, runner_up = None, limit + 1, limit + 1
+        for key_id, _ in shared.most_common(Config.CLIP_RESOLVER_CANDIDATES):
+            distance = edit_distance(key, self.keys[key_id], limit)
+            if distance < best_distance:
+                best, best_distance, runner_up = key_id, distance, best_distance
+            elif distance < runner_up:
+                runner_up = distance
+
+        # A tie means two clips are equally plausible - not a confident substitute
+        if best is None or best_distance == runner_up:
+            return None, None
+        return self.normalized[self.keys[best]], best_distance
+
+    def lookup(self, name):
+        """(clip or None, method, edit distance) for one name written by the router"""
+        if name in audio_manager.clip_ids:
+            return name, "exact", 0
+
+        memo = self.memo
+        if name in memo:
+            result = memo[name]
+            self._count(name, result)
+            return result
+
+        key = normalize_clip_name(name)
+        if key in self.normalized:
+            result = (self.normalized[key], "normalized", 0)
+        elif key:
+            clip, distance = self._fuzzy(key)
+            result = (clip, "fuzzy", distance) if clip else (None, "unresolved", None)
+        else:
+            result = (None, "unresolved", None)
+
+        if len(memo) < Config.CLIP_RESOLVER_MEMO_SIZE:
+            memo[name] = result
+        self._count(name, result)
+        self._report(name, result)
+        return result
+
+    def _count(self, name, result):
+        clip, method, _ = result
+        with self._lock:
+            self.stats[method] += 1
+            entry = (name, clip or "", method)
+            if entry in self.near_misses or len(self.near_misses) < Config.CLIP_RESOLVER_MEMO_SIZE:
+                self.near_misses[entry] += 1
+
+    def _report(self, name, result):
+        """First sighting of a near miss (per library load) is printed and logged for prompt fixes"""
+        clip, method, distance = result
+        if clip:
+            print(f"🩹 Clip name '{name}' → {clip} ({method}{f', distance {distance}' if distance else ''})")
+        else:
+            print(f"⚠️ Clip name '{name}' matches nothing in the library")
+        call_logger.log_clip_near_miss(name, clip, method, distance)
+
+    def resolve(self, name):
+        """Library clip for a router-written name, or None"""
+        return self.lookup(name)[0]
+
+    def resolve_chain(self, content):
+        """Rewrite an "a.mp3 + b.mp3" chain onto library names; unresolvable names are kept as written"""
+        clips = []
+        for name in content.split('+'):
+            name = name.strip()
+            if name:
+                clips.append(self.resolve(name) or name)
+        return " + ".join(clips)
+
+    def get_stats(self):
+        """Resolution counts by method and the most frequent near misses"""
+        with self._lock:
+            stats = dict(self.stats)
+            top = self.near_misses.most_common(10)
+        stats["top_near_misses"] = [
+            {"raw": raw, "clip": clip or None, "method": method, "count": count}
+            for (raw, clip, method), count in top
+        ]
+        return stats
+
+# Global clip resolver over the audio library
+clip_resolver = ClipResolver()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+KLARIQO CLIP RETRIEVER MODULE
+Local top-k retrieval over the clip library (filename words + category +
+transcript) so the LLM prompt carries a short candidate list instead of
+every filename in audio_snippets.json
+"""
+
+import re
+import threading
+import numpy as np
+from config import Config
+from audio_manager import audio_manager
+from text_vectors import HashingVectorizer
+
+_FILENAME_WORDS = re.compile(r"[a-z]+")
+
+
+class ClipRetriever:
+    """Cosine top-k over a float32 matrix of clip document vectors, rebuilt on library reload"""
+
+    def __init__(self, vectorizer=None):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.clips = []
+        self.categories = []
+        self.vectors = np.zeros((0, self.vectorizer.dim), dtype=np.float32)
+        self._lock = threading.Lock()
+
+        self.build()
+        audio_manager.register_reload_listener(self.build)
+
+    def _document(self, category, filename, transcript):
+        """Filename words count twice - they are in English, like most Hinglish keywords"""
+        name_words = " ".join(_FILENAME_WORDS.findall(filename.lower().replace('.mp3', '')))
+        category_words = category.replace('_', ' ')
+        return f"{name_words} {name_words} {category_words} {transcript}"
+
+    def build(self):
+        """Index every clip except quick responses, fillers and excluded intros"""
+        clips, categories, documents = [], [], []
+        for category, files in audio_manager.audio_snippets.items():
+            if category in ("quick_responses", Config.FILLER_CATEGORY):
+                continue
+            for filename, transcript in files.items():
+                if filename.startswith('intro_klariqo'):
+                    continue
+                clips.append(filename)
+                categories.append(category)
+                documents.append(self._document(category, filename, transcript))
+
+        vectors = self.vectorizer.transform_many(documents)
+        with self._lock:
+            self.clips, self.categories, self.vectors = clips, categories, vectors
+        print(f"🔍 Clip retriever indexed {len(clips)} clips")
+
+    def retrieve(self, transcript, session=None, k=None):
+        """Top-k (category, filename) for the utterance, skipping clips the caller just heard"""
+        k = k or Config.CLIP_RETRIEVAL_TOP_K
+
+        # Session state sharpens short follow-ups ("aur kitna?" while discussing fees)
+        query = transcript
+        excluded = set()
+        if session is not None:
+            focus = session.session_variables.get("inquiry_focus")
+            if focus:
+                query = f"{query} {focus}"
+            excluded = set(session.recent_clips(limit=3, window=6))
+
+        vector = self.vectorizer.transform(query)
+        with self._lock:
+            clips, categories, vectors = self.clips, self.categories, self.vectors
+        if not clips:
+            return []
+
+        scores = vectors @ vector
+        ranked = np.argsort(-scores, kind="stable")
+        picked = []
+        for index in ranked:
+            if clips[index] in excluded:
+                continue
+            picked.append((categories[index], clips[index]))
+            if len(picked) == k:
+                break
+        return picked
+
+    def format_candidates(self, transcript, session=None, k=None):
+        """Candidate list in the prompt's "category: a.mp3, b.mp3" layout, best category first"""
+        grouped = {}
+        for category, filename in self.retrieve(transcript, session, k):
+            grouped.setdefault(category, []).append(filename)
+        return "\n".join(f"{category}: {', '.join(files)}" for category, files in grouped.items())
+
+# Global clip retriever over the audio library
+clip_retriever = ClipRetriever()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+KLARIQO CLIP SCHEMA MODULE
+Structured router output: a JSON schema whose clip field is an enum of the
+current library's clip IDs (or a GENERATE text reply), in the OpenAI
+response_format and Gemini response_schema flavours. Schemas are built from
+the library snapshot and cached until the library changes.
+"""
+
+import json
+import threading
+from config import Config
+from audio_manager import audio_manager
+
+# Appended to the router system prompts when structured output is on
+PROMPT_NOTE = """
+
+📤 OUTPUT FORMAT (JSON):
+Pre-recorded reply: {"type": "AUDIO", "clips": ["first.mp3", "second.mp3"], "text": ""}
+Generated reply: {"type": "GENERATE", "clips": [], "text": "<Hindi sentence to speak>"}
+Use GENERATE wherever the rules above say "GENERATE:"."""
+
+
+class ClipSchema:
+    """Library-derived output schemas, rebuilt lazily when audio_manager.library_version moves"""
+
+    def __init__(self):
+        self._version = None
+        self._openai_format = None
+        self._gemini_schema = None
+        self._lock = threading.Lock()
+
+    def _clip_enum(self):
+        """Every library clip except the intro greetings (already played) and the latency fillers"""
+        fillers = set(audio_manager.get_filler_clips())
+        return [clip for clip in audio_manager.clip_names
+                if not clip.startswith('intro_klariqo') and clip not in fillers]
+
+    def _ensure_current(self):
+        version = audio_manager.library_version
+        if self._version == version:
+            return
+        with self._lock:
+            if self._version == version:
+                return
+            clips = self._clip_enum()
+
+            # OpenAI strict mode: every property required, no extras
+            schema = {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": ["AUDIO", "GENERATE"]},
+                    "clips": {"type": "array", "items": {"type": "string", "enum": clips}},
+                    "text": {"type": "string"},
+                },
+                "required": ["type", "clips", "text"],
+                "additionalProperties": False,
+            }
+            self._openai_format = {
+                "type": "json_schema",
+                "json_schema": {"name": "clip_choice", "strict": True, "schema": schema},
+            }
+
+            # Gemini takes the OpenAPI subset: upper-case types, no additionalProperties, enums need format "enum"
+            self._gemini_schema = {
+                "type": "OBJECT",
+                "properties": {
+                    "type": {"type": "STRING", "format": "enum", "enum": ["AUDIO", "GENERATE"]},
+                    "clips": {"type": "ARRAY", "items": {"type": "STRING", "format": "enum", "enum": clips}},
+                    "text": {"type": "STRING"},
+                },
+                "required": ["type", "clips", "text"],
+            }
+            self._version = version
+            print(f"🧾 Router output schema built: {len(clips)} clip IDs (library v{version})")
+
+    def openai_response_format(self):
+        """response_format argument for chat.completions.create"""
+        self._ensure_current()
+        return self._openai_format
+
+    def gemini_schema(self):
+        """response_schema for Gemini's GenerationConfig"""
+        self._ensure_current()
+        return self._gemini_schema
+
+    def parse(self, raw):
+        """
+        (response_type, content) from a structured reply, or None if it is not one
+
+        AUDIO content is the usual "a.mp3 + b.mp3" chain (deduplicated, capped
+        at ROUTER_MAX_CHAIN_CLIPS); GENERATE becomes ("TTS", text).
+        """
+        try:
+            reply = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(reply, dict):
+            return None
+
+        if reply.get("type") == "GENERATE":
+            text = str(reply.get("text") or "").strip()
+            return ("TTS", text) if text else None
+
+        clips = []
+        for clip in reply.get("clips") or ():
+            if isinstance(clip, str) and clip.strip() and clip.strip() not in clips:
+                clips.append(clip.strip())
+        if reply.get("type") != "AUDIO" or not clips:
+            return None
+        return "AUDIO", " + ".join(clips[:Config.ROUTER_MAX_CHAIN_CLIPS])
+
+# Global clip schema (follows the audio library)
+clip_schema = ClipSchema()
@@ -37,6 +37,131 @@ class Config:
     
     # Session Settings
     SILENCE_THRESHOLD = 0.4  # seconds before considering speech complete
+    HISTORY_CAPACITY = 40  # turn records kept per call (oldest dropped first)
+    SESSION_IDLE_TTL = 300  # seconds without any activity before a session is evicted
+    SESSION_ORPHAN_TTL = 120  # seconds a session may sit with no media stream attached
+    SESSION_MAX_AGE = 3600  # hard cap on session lifetime (seconds)
+    SESSION_SWEEP_INTERVAL = 15  # seconds between eviction sweeps
+    SESSION_LOCK_SHARDS = 16  # lock shards for concurrent session access
+    BARGE_IN_ENABLED = os.getenv('BARGE_IN_ENABLED', 'true').lower() == 'true'
+    BARGE_IN_MIN_WORDS = 2  # caller words that stop a reply mid-play (a lone "haan" is a backchannel)
+    
+    # Repeat Filtering (router output stage)
+    REPEAT_WINDOW_TURNS = 3  # a clip played within this many turns counts as a repeat
+    REPEAT_EXEMPT_CLIPS = ["ji_bilkul.mp3"]  # acknowledgements that may repeat freely
+    REPEAT_ALTERNATIVES = {}  # clip -> alternative clips to play instead of a repeat
+    REPEAT_FALLBACK_TEXT = "जैसा मैंने अभी बताया, क्या आप इसके बारे में कुछ और जानना चाहेंगे?"
+    
+    # Speculative Routing (start routing on stable interim transcripts)
+    SPECULATIVE_ROUTING = True
+    SPECULATION_STABLE_MS = 200  # partial transcript unchanged this long → speculate
+    SPECULATION_MATCH_RATIO = 0.9  # final vs speculated text similarity needed to commit
+    SPECULATION_MAX_PER_TURN = 3  # caps extra LLM calls when the caller keeps talking
+    SPECULATION_WORKERS = 50
+    
+    # Next-Turn Prediction & Prefetch (transition model from build_transition_model.py)
+    TRANSITION_MODEL_PATH = os.getenv('TRANSITION_MODEL_PATH', 'models/transition_model.json')
+    PREDICTOR_TOP_K = 5  # next responses kept per state
+    PREDICTOR_MIN_STATE_COUNT = 5  # states seen fewer times than this make no predictions
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'true').lower() == 'true'
+    PREFETCH_MIN_PROBABILITY = 0.3  # render a predicted GENERATE reply at or above this probability
+    PREFETCH_MAX_RENDERS = 2  # speculative TTS renders per turn
+    PREFETCH_WORKERS = 4  # separate from the playout render workers so live turns never queue behind prefetch
+    STAGE_PRERENDER_MAX = 32  # fixed dialogue-stage TTS replies kept pre-rendered
+    
+    # Turn Deadline (endpoint → first audio; stages degrade instead of leaving the caller in silence)
+    DEADLINE_TURN_MS = int(os.getenv('DEADLINE_TURN_MS', '3500'))
+    DEADLINE_RESPONSE_RESERVE_MS = 1200  # kept back from routing for TTS + conversion of a generated reply
+    DEADLINE_CONVERSION_RESERVE_MS = 300  # kept back from TTS synthesis for the MP3 → PCM conversion
+    DEADLINE_TTS_CAP = 8  # seconds any one synthesis may take, even after first audio
+    DEADLINE_CONVERSION_CAP = 5  # seconds any one conversion may take
+    DEADLINE_LLM_CAP = 8  # seconds the LLM may still take after a deadline miss while the hold reply plays
+    DEADLINE_SEMANTIC_THRESHOLD = 0.5  # looser semantic-cache match accepted when the LLM misses the deadline
+    DEADLINE_HOLD_CLIP = os.getenv('DEADLINE_HOLD_CLIP', '')  # library clip for the last-resort hold reply
+    DEADLINE_HOLD_TEXT = "जी, एक सेकंड…"  # pre-rendered at startup when no hold clip is configured
+    DEADLINE_WORKERS = 20  # threads for bounded waits on uninterruptible work (conversion)
+    
+    # Latency Fillers (short acknowledgement while the router works; never the same one twice per call)
+    FILLER_ENABLED = os.getenv('FILLER_ENABLED', 'true').lower() == 'true'
+    FILLER_CATEGORY = "fillers"  # audio_snippets.json category (opt-in, once the clips exist); kept out of every router prompt and schema
+    FILLER_AFTER_MS = int(os.getenv('FILLER_AFTER_MS', '900'))  # endpoint → filler if no reply audio is ready
+    FILLER_LATENCY_SAMPLES = 1000  # perceived-latency samples kept for percentiles
+    
+    # Routing Tiers (comma-separated, first tier to answer wins: quick, intent, smart, cache, semantic, classifier, llm)
+    ROUTING_TIER_ORDER = os.getenv('ROUTING_TIERS', 'quick,intent,cache,semantic,classifier,llm').split(',')
+    LLM_ROUTER = os.getenv('LLM_ROUTER', 'openai')  # "openai" (router.py), "gemini" (router_gemini.py) or "hedged"
+    QUICK_RESPONSE_MAX_WORDS = 4  # longer utterances skip the quick-response tier
+    ROUTING_LATENCY_SAMPLES = 1000  # per-tier latency samples kept for percentiles
+    DECISION_CACHE_SIZE = 2048  # exact-match router decisions kept (LRU)
+    DECISION_CACHE_TTL = 1800  # seconds before a cached decision is re-asked
+    SEMANTIC_CACHE_SIZE = 2000  # rows in the semantic cache matrix (LRU overwrite when full)
+    SEMANTIC_CACHE_THRESHOLD = 0.65  # cosine similarity needed to reuse a decision (see tune_semantic_threshold.py)
+    SEMANTIC_CACHE_DUPLICATE = 0.98  # similarity at which a new decision refreshes an existing row
+    SEMANTIC_VECTOR_DIM = 2048  # hashed character n-gram buckets
+    INTENT_MODEL_PATH = os.getenv('INTENT_MODEL_PATH', 'models/intent_classifier.npz')  # from train_intent_classifier.py
+    INTENT_CLASSIFIER_THRESHOLD = None  # minimum confidence to answer (None = trainer's recommendation)
+    INTENT_VECTOR_DIM = 4096  # hashed character n-gram buckets for the classifier
+    CLIP_RETRIEVAL_TOP_K = 8  # clips shortlisted into the LLM prompt per turn (0 = list the whole library)
+    
+    # Streaming Playout (play each clip / TTS sentence as soon as the LLM stream resolves it)
+    LLM_STREAMING = os.getenv('LLM_STREAMING', 'true').lower() == 'true'
+    STREAM_MIN_SENTENCE_CHARS = 20  # shorter sentences are merged with the next before TTS
+    PLAYOUT_CLIP_GAP = 1.0  # seconds of silence after each clip of a chain
+    PLAYOUT_RENDER_WORKERS = 20  # shared TTS render threads across calls
+    PLAYOUT_RENDER_TIMEOUT = 15  # seconds to wait for one TTS sentence before skipping it
+    
+    # Hedged Routing (LLM_ROUTER=hedged: backup provider fired when the primary is slow)
+    HEDGE_PRIMARY = os.getenv('HEDGE_PRIMARY', 'openai')  # "openai", "gemini" or "smart"
+    HEDGE_BACKUP = os.getenv('HEDGE_BACKUP', 'gemini')
+    HEDGE_DELAY_MS = None  # fixed hedge delay (None = primary's recent HEDGE_PERCENTILE latency)
+    HEDGE_PERCENTILE = 0.95  # hedge the slowest 5% of primary calls
+    HEDGE_INITIAL_DELAY_MS = 1500  # hedge delay until HEDGE_MIN_SAMPLES primary latencies are known
+    HEDGE_MIN_DELAY_MS = 150  # never hedge sooner than this
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_TIMEOUT = 10  # seconds before giving up on both providers
+    HEDGE_WORKERS = 50
+    
+    # Circuit Breaker (per LLM backend; while open or saturated the llm tier answers locally)
+    BREAKER_WINDOW_SECONDS = 60  # rolling window of call outcomes
+    BREAKER_MIN_CALLS = 10  # calls in the window before rates can trip the breaker
+    BREAKER_ERROR_RATE = 0.5  # open when more than this share of calls fail
+    BREAKER_SLOW_CALL_MS = 3000  # a successful call slower than this counts as slow
+    BREAKER_SLOW_RATE = 0.5  # open when more than this share of calls are slow
+    BREAKER_OPEN_SECONDS = 20  # cool-down before probing the backend again
+    BREAKER_PROBE_CALLS = 1  # concurrent probe calls while half-open
+    BREAKER_MAX_IN_FLIGHT = 32  # concurrent LLM calls beyond this are shed to local tiers
+    BREAKER_EVENT_HISTORY = 50
+    BREAKER_CLASSIFIER_THRESHOLD = 0.4  # classifier confidence accepted while the LLM is unavailable
+    BREAKER_FALLBACK_TEXT = "माफ़ कीजिए, क्या आप अपना सवाल एक बार फिर से बता सकते हैं?"
+    
+    # Structured Router Output (JSON with an enum of library clip IDs)
+    ROUTER_STRUCTURED_OUTPUT = os.getenv('ROUTER_STRUCTURED_OUTPUT', 'true').lower() == 'true'
+    ROUTER_MAX_CHAIN_CLIPS = 4  # clips kept from one structured reply
+    ROUTER_MAX_TOKENS = 100  # completion cap for free-text replies ("a.mp3 + b.mp3" / "GENERATE: ...")
+    ROUTER_STRUCTURED_MAX_TOKENS = 300  # the JSON wrapper and a Hindi GENERATE sentence share this cap
+    
+    # Context Window (per-turn LLM message; static rules stay in the cached system prompt)
+    CONTEXT_TOKEN_BUDGET = 400  # tokens for the per-turn message before older turns are dropped
+    CONTEXT_RECENT_RECORDS = 4  # turn records kept verbatim (older ones are summarized)
+    CONTEXT_TURN_CHARS = 120  # longer generated replies are cut in the context
+    CONTEXT_SUMMARY_CLIPS = 6  # most recent earlier clips named in the summary
+    
+    # Clip Name Resolution (typos / stray extensions in router output)
+    CLIP_RESOLVER_MAX_EDIT_RATIO = 0.15  # edits allowed per character of the normalized name (min 1)
+    CLIP_RESOLVER_CANDIDATES = 5  # trigram-ranked candidates checked by edit distance
+    CLIP_RESOLVER_MEMO_SIZE = 5000  # distinct unknown names remembered
+    
+    # Outbound HTTP Pools (OpenAI, ElevenLabs, Twilio)
+    HTTP_POOL_DEFAULT_CONNECTIONS = 10  # keep-alive connections per provider unless sized by its caller
+    HTTP_POOL_TWILIO_CONNECTIONS = 8
+    HTTP_POOL_KEEPALIVE_EXPIRY = 120  # seconds an idle pooled connection is kept
+    HTTP_POOL_TIMEOUT = 30  # read/write timeout (provider SDKs may pass their own per request)
+    HTTP_POOL_CONNECT_TIMEOUT = 5
+    HTTP_POOL_LATENCY_WINDOW = 500  # recent latencies kept per host
+    HTTP_PREWARM = os.getenv('HTTP_PREWARM', 'true').lower() == 'true'
+    HTTP_PREWARM_CONNECTIONS = 2  # connections opened per provider at startup / after idle
+    HTTP_REWARM_IDLE_SECONDS = 45  # re-warm a provider idle this long (below typical server keep-alive)
+    HTTP_REWARM_CHECK_SECONDS = 10
     
     # Flask Settings
     FLASK_HOST = '0.0.0.0'
@@ -48,6 +173,10 @@ class Config:
     LOGS_FOLDER = "logs/"
     TEMP_FOLDER = "temp/"
     
+    # Session Store ("memory" = single process, "sqlite" = shared by all workers on a node)
+    SESSION_STORE = os.getenv('SESSION_STORE', 'memory')
+    SESSION_STORE_PATH = os.getenv('SESSION_STORE_PATH', 'logs/sessions.db')
+    
     # Call Campaign Settings
     MAX_CONCURRENT_CALLS = 50
     CALL_INTERVAL = 10  # seconds between outbound calls
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+KLARIQO CONTEXT WINDOW MODULE
+Builds the per-turn (user message) part of the LLM routing prompt under a
+token budget. Everything static lives in the routers' system prompts, which
+stay byte-identical across turns so provider-side prefix caching applies;
+this message carries only volatile state: the last few turns verbatim, older
+turns folded into a one-line summary next to the extracted slots, recently
+played clips, the clock and the retrieved clip candidates.
+"""
+
+import threading
+from config import Config
+from audio_manager import audio_manager
+from text_utils import estimate_tokens
+
+
+class ContextWindow:
+    """Compact, budgeted context message; records prompt tokens on the session"""
+
+    def __init__(self, budget=None, recent_records=None):
+        self.budget = budget or Config.CONTEXT_TOKEN_BUDGET
+        self.recent_records = recent_records or Config.CONTEXT_RECENT_RECORDS
+        self._categories = {}
+        self._categories_version = None
+        self._stats_lock = threading.Lock()
+        self.stats = {"turns": 0, "tokens": 0, "trimmed": 0, "over_budget": 0}
+
+    def _category_of(self, clip):
+        if self._categories_version != audio_manager.library_version:
+            self._categories = {
+                filename: category
+                for category, files in audio_manager.audio_snippets.items()
+                for filename in files
+            }
+            self._categories_version = audio_manager.library_version
+        return self._categories.get(clip)
+
+    def _format_record(self, record):
+        """One short line per turn record: P: text / N: [a.mp3 + b.mp3] / N: spoken text"""
+        speaker = "P" if record.speaker == "Parent" else "N"
+        if record.clips:
+            return f"{speaker}: [{' + '.join(record.clips)}]"
+        text = record.text
+        if len(text) > Config.CONTEXT_TURN_CHARS:
+            text = text[:Config.CONTEXT_TURN_CHARS].rstrip() + "…"
+        return f"{speaker}: {text}"
+
+    def _summarize(self, records):
+        """Older turns as slot-style state: how many, the latest clips played, their topics"""
+        if not records:
+            return None
+        clips, topics = [], []
+        for record in reversed(records):
+            for clip in record.clips:
+                if clip in clips or len(clips) >= Config.CONTEXT_SUMMARY_CLIPS:
+                    continue
+                clips.append(clip)
+                category = self._category_of(clip)
+                if category and category not in topics:
+                    topics.append(category)
+        parts = [f"{len(records)} earlier turns"]
+        if topics:
+            parts.append(f"topics {', '.join(topics)}")
+        if clips:
+            parts.append(f"played {', '.join(clips)}")
+        return "Earlier: " + "; ".join(parts)
+
+    def _slots(self, session):
+        known = [f"{name}={value}" for name, value in session.session_variables.items() if value is not None]
+        flags = [flag for flag, status in session.session_memory.items() if status]
+        line = f"Known: {', '.join(known) if known else 'nothing yet'}"
+        if flags:
+            line += f" | Done: {', '.join(flags)}"
+        return line
+
+    def build(self, session, user_input, candidates="", clock_line=None, system_tokens=0):
+        """
+        The user message for this turn
+
+        Sections are dropped to fit the budget in this order: the older-turn
+        summary, then the oldest verbatim turns (one record is always kept).
+        The parent's input, slots, recent clips and candidates always stay.
+        system_tokens (the static prompt) is only added to the recorded total.
+        """
+        records = session.recent_turns(Config.HISTORY_CAPACITY)
+        recent = records[-self.recent_records:]
+        summary = self._summarize(records[:-self.recent_records])
+        recent_clips = session.recent_clips(limit=3, window=6)
+
+        fixed_head = [self._slots(session)]
+        if recent_clips:
+            fixed_head.append(f"Don't repeat: {', '.join(recent_clips)}")
+        fixed_tail = []
+        if clock_line:
+            fixed_tail.append(clock_line)
+        if candidates:
+            fixed_tail.append(f"Candidates (most relevant first):\n{candidates}")
+        fixed_tail.append(f'Parent: "{user_input}"')
+
+        def render():
+            lines = []
+            if summary:
+                lines.append(summary)
+            if recent:
+                lines.append("Recent:\n" + "\n".join(self._format_record(record) for record in recent))
+            return "\n".join(lines + fixed_head + fixed_tail)
+
+        message = render()
+        tokens = estimate_tokens(message)
+        trimmed = False
+        while tokens > self.budget and (summary or len(recent) > 1):
+            if summary:
+                summary = None
+            else:
+                recent = recent[1:]
+            trimmed = True
+            message = render()
+            tokens = estimate_tokens(message)
+
+        session.prompt_tokens = system_tokens + tokens
+        with self._stats_lock:
+            self.stats["turns"] += 1
+            self.stats["tokens"] += tokens
+            self.stats["trimmed"] += trimmed
+            self.stats["over_budget"] += tokens > self.budget
+        return message
+
+    def get_stats(self):
+        """Mean context tokens per turn and how often the budget forced trimming"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["budget"] = self.budget
+        stats["mean_tokens"] = round(stats["tokens"] / stats["turns"], 1) if stats["turns"] else 0.0
+        return stats
+
+# Global context window (shared by the LLM routers)
+context_window = ContextWindow()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+KLARIQO DECISION CACHE MODULE
+Exact-match LRU + TTL cache of LLM router decisions, keyed on the normalized
+transcript plus the session state the router's answer depends on
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from config import Config
+from audio_manager import audio_manager
+from text_utils import normalize_transcript
+from router import get_school_status
+
+
+class CachedDecision:
+    """One stored router decision"""
+
+    __slots__ = ("response_type", "content", "latency_ms", "tokens", "stored_at", "hits")
+
+    def __init__(self, response_type, content, latency_ms, tokens):
+        self.response_type = response_type
+        self.content = content
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.stored_at = time.time()
+        self.hits = 0
+
+
+class DecisionCache:
+    """Thread-safe LRU with TTL; cleared whenever the audio library changes"""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or Config.DECISION_CACHE_SIZE
+        self.ttl = ttl or Config.DECISION_CACHE_TTL
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evicted": 0,
+                      "invalidations": 0, "saved_ms": 0, "saved_tokens": 0}
+
+        audio_manager.register_reload_listener(self.invalidate)
+
+    def make_key(self, transcript, session):
+        """Normalized transcript + filled slots + recently played clips + school open/closed"""
+        slots = tuple(sorted(
+            (slot, value) for slot, value in session.session_variables.items() if value is not None
+        ))
+        recent = tuple(session.recent_clips(limit=3, window=6))
+        return (normalize_transcript(transcript), slots, recent, get_school_status())
+
+    def get(self, key):
+        """Cached (response_type, content) for a key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            if now - entry.stored_at > self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.stats["hits"] += 1
+            self.stats["saved_ms"] += entry.latency_ms
+            self.stats["saved_tokens"] += entry.tokens
+            return entry.response_type, entry.content
+
+    def put(self, key, response_type, content, latency_ms=0, tokens=0):
+        """Store a decision if it is valid (known clips or non-empty generated text)"""
+        if not content:
+            return False
+        if response_type == "AUDIO" and not audio_manager.validate_audio_chain(content):
+            return False
+
+        with self._lock:
+            self._entries[key] = CachedDecision(response_type, content, latency_ms, tokens)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+        return True
+
+    def invalidate(self):
+        """Drop every entry (clip names or transcripts may have changed)"""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+        if dropped:
+            print(f"🧹 Decision cache invalidated: {dropped} entries dropped")
+
+    def get_stats(self):
+        """Hit rate plus LLM latency and tokens saved"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+# Global decision cache in front of the LLM router
+decision_cache = DecisionCache()
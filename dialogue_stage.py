@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+KLARIQO DIALOGUE STAGE MODULE
+Conversation stage as a compiled finite-state machine. SmartRouter declares
+its stages (responses plus "advance_on" clip triggers); this module compiles
+them into a per-stage transition table. Each session carries its current
+stage and advances it once per response event, so "which stage are we in"
+is a field read instead of a scan of the call's history. The stages' fixed
+TTS replies can be rendered once ahead of time and shared by every call.
+"""
+
+import time
+import threading
+from config import Config
+
+ADVANCE_KEY = "advance_on"  # stage entry: {clip filename: next stage}
+
+
+def is_clip_chain(content):
+    """A stage response is a clip chain if every part is a .mp3 name, else TTS text"""
+    parts = [part.strip() for part in content.split('+')]
+    return all(part.endswith('.mp3') for part in parts)
+
+
+class DialogueStageMachine:
+    """Transition table compiled from a declarative stage definition"""
+
+    def __init__(self):
+        self.initial = None
+        self.table = {}      # stage → {clip: next stage}
+        self.responses = {}  # stage → {response name: (response_type, content)}
+        self.rendered = {}   # TTS text → PCM bytes (pre-rendered stage replies)
+        self._lock = threading.Lock()
+        self.stats = {"advances": 0, "transitions": 0, "rendered_hits": 0}
+
+    def compile(self, stages, initial):
+        """Build the transition table; unknown target stages are a definition error"""
+        if initial not in stages:
+            raise ValueError(f"Initial stage '{initial}' is not defined")
+        table, responses = {}, {}
+        for stage, definition in stages.items():
+            triggers = dict(definition.get(ADVANCE_KEY, {}))
+            for clip, target in triggers.items():
+                if target not in stages:
+                    raise ValueError(f"Stage '{stage}' advances to undefined stage '{target}' on {clip}")
+            table[stage] = triggers
+            responses[stage] = {
+                name: ("AUDIO" if is_clip_chain(content) else "TTS", content)
+                for name, content in definition.items() if name != ADVANCE_KEY
+            }
+        self.table, self.responses, self.initial = table, responses, initial
+        edges = sum(len(triggers) for triggers in table.values())
+        print(f"🧭 Dialogue stage machine compiled: {len(table)} stages, {edges} transitions")
+
+    def current(self, session):
+        """The session's stage (a new call is in the initial stage)"""
+        return session.dialogue_stage or self.initial
+
+    def advance(self, stage, clips):
+        """Stage after a response that played these clips"""
+        stage = previous = stage or self.initial
+        for clip in clips:
+            stage = self.table.get(stage, {}).get(clip, stage)
+        with self._lock:
+            self.stats["advances"] += 1
+            self.stats["transitions"] += stage != previous
+        return stage
+
+    def response(self, stage, name):
+        """(response_type, content) a stage declares under name"""
+        return self.responses[stage][name]
+
+    def prewarm(self, render, extra_texts=()):
+        """Render every stage's TTS replies (and extra_texts) in the background with render(text) → PCM bytes"""
+        texts = {content for replies in self.responses.values()
+                 for response_type, content in replies.values() if response_type == "TTS"}
+        texts.update(extra_texts)
+
+        def run():
+            start = time.time()
+            rendered = 0
+            for text in texts:
+                if text in self.rendered:
+                    continue
+                try:
+                    pcm_data = render(text)
+                except Exception as e:
+                    print(f"⚠️ Stage reply pre-render failed: {e}")
+                    continue
+                if pcm_data and len(self.rendered) < Config.STAGE_PRERENDER_MAX:
+                    with self._lock:
+                        self.rendered[text] = pcm_data
+                    rendered += 1
+            print(f"🧭 Pre-rendered {rendered}/{len(texts)} stage replies in {int((time.time() - start) * 1000)}ms")
+
+        threading.Thread(target=run, name="stage-prerender", daemon=True).start()
+
+    def rendered_pcm(self, text):
+        """Pre-rendered PCM for a stage reply, or None"""
+        pcm_data = self.rendered.get(text)
+        if pcm_data:
+            with self._lock:
+                self.stats["rendered_hits"] += 1
+        return pcm_data
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({"stages": len(self.table), "initial": self.initial, "rendered_replies": len(self.rendered)})
+        return stats
+
+# Global dialogue stage machine (compiled by SmartRouter from its stage definitions)
+dialogue_stages = DialogueStageMachine()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+KLARIQO HEDGED ROUTER MODULE
+Sends each turn to a primary LLM provider and, if no valid answer has arrived
+within the primary's recent p95 latency, also to a backup provider. The first
+response that passes validation wins; the other request is cancelled if it has
+not started yet and its result is discarded otherwise.
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import Config
+from audio_manager import audio_manager
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = [100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000]
+
+FALLBACK_TEXT = "I want to make sure I give you the right information. Could you tell me what specific aspect you'd like to know more about?"
+
+
+def load_provider(name):
+    """Router instance for a provider name ("openai", "gemini" or "smart")"""
+    if name == "openai":
+        from router import response_router
+        return response_router
+    if name == "gemini":
+        from router_gemini import response_router_gemini
+        return response_router_gemini
+    if name == "smart":
+        from smart_router import smart_router
+        return smart_router
+    raise ValueError(f"Unknown routing provider '{name}'")
+
+
+class ProviderStats:
+    """Latency histogram and outcome counters for one provider"""
+
+    __slots__ = ("calls", "valid", "invalid", "errors", "wins", "discarded", "buckets", "latencies_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.valid = 0
+        self.invalid = 0
+        self.errors = 0
+        self.wins = 0
+        self.discarded = 0  # finished after the other provider had already won
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.latencies_ms = deque(maxlen=Config.ROUTING_LATENCY_SAMPLES)
+
+    def observe(self, latency_ms):
+        bucket = 0
+        while bucket < len(HISTOGRAM_BOUNDS_MS) and latency_ms > HISTOGRAM_BOUNDS_MS[bucket]:
+            bucket += 1
+        self.buckets[bucket] += 1
+        self.latencies_ms.append(latency_ms)
+
+    def percentile(self, fraction):
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def summary(self):
+        labels = [f"≤{bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+        return {
+            "calls": self.calls,
+            "valid": self.valid,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "wins": self.wins,
+            "discarded": self.discarded,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "histogram_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+class HedgedRouter:
+    """Primary + backup provider behind the ResponseRouter interface"""
+
+    def __init__(self, primary=None, backup=None, hedge_delay_ms=None, timeout=None):
+        # Providers may be names (loaded on first use) or router objects (e.g. local stubs)
+        self.specs = {"primary": primary or Config.HEDGE_PRIMARY, "backup": backup or Config.HEDGE_BACKUP}
+        self.providers = {}
+        self.hedge_delay_ms = hedge_delay_ms if hedge_delay_ms is not None else Config.HEDGE_DELAY_MS
+        self.timeout = timeout or Config.HEDGE_TIMEOUT
+        self.executor = ThreadPoolExecutor(max_workers=Config.HEDGE_WORKERS, thread_name_prefix="hedge")
+        self._last_call = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {"primary": ProviderStats(), "backup": ProviderStats()}
+        self.counters = {"turns": 0, "hedged": 0, "hedge_wins": 0, "no_valid": 0}
+
+    def _provider(self, role):
+        if role not in self.providers:
+            spec = self.specs[role]
+            self.providers[role] = load_provider(spec) if isinstance(spec, str) else spec
+        return self.providers[role]
+
+    def current_hedge_delay_ms(self):
+        """Fixed delay if configured, else the primary's recent p95 (HEDGE_PERCENTILE, bounded)"""
+        if self.hedge_delay_ms is not None:
+            return self.hedge_delay_ms
+        with self._stats_lock:
+            samples = len(self.stats["primary"].latencies_ms)
+            recent = self.stats["primary"].percentile(Config.HEDGE_PERCENTILE)
+        if samples < Config.HEDGE_MIN_SAMPLES:
+            return Config.HEDGE_INITIAL_DELAY_MS
+        return max(Config.HEDGE_MIN_DELAY_MS, recent)
+
+    def _is_valid(self, response_type, content):
+        if response_type == "TTS":
+            return bool(content)
+        if response_type == "AUDIO" and content:
+            return all(clip.strip() in audio_manager.clip_ids for clip in content.split('+'))
+        return False
+
+    def _call(self, role, user_input, session):
+        """Run one provider in a worker thread; its thread-local call info is read here too"""
+        router = self._provider(role)
+        start = time.perf_counter()
+        try:
+            response_type, content = router.get_school_response(user_input, session)
+        except Exception as e:
+            print(f"❌ Hedged {role} provider failed: {e}")
+            response_type, content = None, None
+        latency_ms = int((time.perf_counter() - start) * 1000)
+
+        # Routers that report call outcomes (LLMs) can fail into a safe TTS reply - that is not a valid answer
+        info = getattr(router, "last_call_info", None)
+        ok, _, tokens = info() if info else (response_type is not None, latency_ms, 0)
+        valid = ok and self._is_valid(response_type, content)
+
+        with self._stats_lock:
+            stats = self.stats[role]
+            stats.calls += 1
+            if response_type is None or not ok:
+                stats.errors += 1
+            elif valid:
+                stats.valid += 1
+                stats.observe(latency_ms)
+            else:
+                stats.invalid += 1
+        return role, response_type, content, valid, latency_ms, tokens
+
+    def get_school_response(self, user_input, session):
+        """First valid response of primary and (after the hedge delay) backup"""
+        self._last_call.ok = False
+        self._last_call.latency_ms = 0
+        self._last_call.tokens = 0
+
+        start = time.time()
+        deadline = start + self.timeout
+        hedge_delay = self.current_hedge_delay_ms() / 1000
+        pending = {self.executor.submit(self._call, "primary", user_input, session)}
+        hedged = False
+        fallback = None
+
+        while pending:
+            now = time.time()
+            if now >= deadline:
+                break
+            wait_for = deadline - now if hedged else max(0.0, min(deadline, start + hedge_delay) - now)
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            winner = None
+            for future in done:
+                role, response_type, content, valid, latency_ms, tokens = future.result()
+                if valid and winner is None:
+                    winner = (role, response_type, content, tokens)
+                elif response_type and fallback is None:
+                    fallback = (response_type, content)
+
+            if winner:
+                return self._finish(winner, pending, hedged, start)
+
+            # Primary is slow or gave an unusable answer: send the turn to the backup too
+            if not hedged and (not pending or time.time() >= start + hedge_delay):
+                hedged = True
+                pending.add(self.executor.submit(self._call, "backup", user_input, session))
+                print(f"🪁 Hedging to backup after {int((time.time() - start) * 1000)}ms")
+
+        for future in pending:
+            future.cancel()
+        with self._stats_lock:
+            self.counters["turns"] += 1
+            self.counters["hedged"] += hedged
+            self.counters["no_valid"] += 1
+        print(f"⚠️ No valid routed response within {int((time.time() - start) * 1000)}ms")
+        return fallback or ("TTS", FALLBACK_TEXT)
+
+    def _finish(self, winner, pending, hedged, start):
+        role, response_type, content, tokens = winner
+        elapsed_ms = int((time.time() - start) * 1000)
+
+        # Cancel the loser if it is still queued; if it is already running its result is ignored
+        for future in pending:
+            if not future.cancel():
+                future.add_done_callback(self._discard)
+
+        with self._stats_lock:
+            self.stats[role].wins += 1
+            self.counters["turns"] += 1
+            self.counters["hedged"] += hedged
+            self.counters["hedge_wins"] += role == "backup"
+
+        self._last_call.ok = True
+        self._last_call.latency_ms = elapsed_ms
+        self._last_call.tokens = tokens
+        if hedged:
+            print(f"🪁 Hedged turn won by {role} ({elapsed_ms}ms)")
+        return response_type, content
+
+    def _discard(self, future):
+        if future.cancelled():
+            return
+        role = future.result()[0]
+        with self._stats_lock:
+            self.stats[role].discarded += 1
+
+    def last_call_info(self):
+        """Outcome of this thread's latest hedged call: (succeeded, latency_ms, total_tokens of the winner)"""
+        return (getattr(self._last_call, "ok", False),
+                getattr(self._last_call, "latency_ms", 0),
+                getattr(self._last_call, "tokens", 0))
+
+    def get_stats(self):
+        """Hedge rate, hedge win rate and per-provider latency histograms"""
+        with self._stats_lock:
+            stats = dict(self.counters)
+            providers = {role: provider.summary() for role, provider in self.stats.items()}
+        stats["hedge_rate"] = round(stats["hedged"] / stats["turns"], 3) if stats["turns"] else 0.0
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 3) if stats["hedged"] else 0.0
+        stats["hedge_delay_ms"] = self.current_hedge_delay_ms()
+        stats["providers"] = {
+            role: dict(summary, name=self.specs[role] if isinstance(self.specs[role], str) else type(self.specs[role]).__name__)
+            for role, summary in providers.items()
+        }
+        return stats
+
+# Global hedged router (providers from HEDGE_PRIMARY / HEDGE_BACKUP, loaded on first use)
+hedged_router = HedgedRouter()
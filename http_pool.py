@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+KLARIQO HTTP POOL MODULE
+Shared outbound HTTP layer for the provider clients (OpenAI, ElevenLabs,
+Twilio): one keep-alive connection pool per provider, sized to that
+provider's concurrency, pre-warmed at startup and re-warmed after idle
+periods so a turn's first request does not pay for TCP/TLS setup. Every
+request is metered per host (new connections, TLS handshakes, reuse,
+errors, time to response headers).
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from config import Config
+
+# Base URLs pinged to open connections (any response keeps the connection alive)
+PROVIDER_URLS = {
+    "openai": "https://api.openai.com/v1/models",
+    "elevenlabs": "https://api.elevenlabs.io/v1/models",
+    "twilio": "https://api.twilio.com/2010-04-01",
+}
+
+
+class HostStats:
+    """Per-host request/connection counters and a window of recent latencies"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connects = 0
+        self.tls_handshakes = 0
+        self.prewarms = 0
+        self.last_used = 0.0
+        self.latencies = deque(maxlen=Config.HTTP_POOL_LATENCY_WINDOW)
+        self.connect_ms = deque(maxlen=Config.HTTP_POOL_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, ok, latency_ms, connects, tls, connect_ms, prewarm):
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+            self.connects += connects
+            self.tls_handshakes += tls
+            self.prewarms += prewarm
+            self.last_used = time.time()
+            if not prewarm:
+                self.latencies.append(latency_ms)
+            if connects and connect_ms is not None:
+                self.connect_ms.append(connect_ms)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            connect_ms = list(self.connect_ms)
+            stats = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "new_connections": self.connects,
+                "tls_handshakes": self.tls_handshakes,
+                "prewarm_requests": self.prewarms,
+                "reuse_rate": round(1 - self.connects / self.requests, 3) if self.requests else 0.0,
+                "idle_seconds": round(time.time() - self.last_used, 1) if self.last_used else None,
+            }
+        pick = lambda fraction: round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1)
+        stats["latency_ms"] = {"p50": pick(0.5), "p95": pick(0.95)} if latencies else {}
+        stats["mean_connect_ms"] = round(sum(connect_ms) / len(connect_ms), 1) if connect_ms else None
+        return stats
+
+
+class _Trace:
+    """httpcore trace hook: counts TCP connects and TLS handshakes made for one request"""
+
+    def __init__(self):
+        self.connects = 0
+        self.tls = 0
+        self.connect_ms = 0.0
+        self._started = 0.0
+
+    def __call__(self, event, info):
+        if event.endswith("connect_tcp.started"):
+            self._started = time.perf_counter()
+        elif event.endswith("connect_tcp.complete"):
+            self.connects += 1
+            self.connect_ms = (time.perf_counter() - self._started) * 1000
+        elif event.endswith("start_tls.complete"):
+            self.tls += 1
+            self.connect_ms = (time.perf_counter() - self._started) * 1000  # TCP + TLS
+
+
+class _MeteredTransport(httpx.HTTPTransport):
+    """httpx transport that records every request against its host's stats"""
+
+    def __init__(self, pool, **kwargs):
+        super().__init__(**kwargs)
+        self.http_pool = pool
+
+    def handle_request(self, request):
+        trace = _Trace()
+        request.extensions["trace"] = trace
+        prewarm = request.headers.get("x-klariqo-prewarm") == "1"
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = super().handle_request(request)
+            ok = response.status_code < 500 and response.status_code != 429
+            return response
+        finally:
+            self.http_pool.host(request.url.host).record(
+                ok, (time.perf_counter() - start) * 1000, trace.connects, trace.tls, trace.connect_ms, prewarm)
+
+    def pool_state(self):
+        """(open connections, idle connections) in this transport's pool"""
+        connections = list(self._pool.connections)
+        return len(connections), sum(1 for connection in connections if connection.is_idle())
+
+
+class HttpPool:
+    """Named provider clients over shared, metered keep-alive pools"""
+
+    def __init__(self):
+        self.hosts = {}
+        self.clients = {}      # name → (httpx.Client, transport, warm-up URL)
+        self.warmers = {}      # name → callable (non-HTTP transports, e.g. gRPC)
+        self.warmer_stats = {}
+        self._twilio = None
+        self._twilio_adapter = None
+        self._lock = threading.Lock()
+        self._started = False
+
+    def host(self, hostname):
+        with self._lock:
+            if hostname not in self.hosts:
+                self.hosts[hostname] = HostStats()
+            return self.hosts[hostname]
+
+    def httpx_client(self, name, concurrency=None, warm_url=None):
+        """
+        Shared httpx.Client for one provider (created on first use)
+
+        concurrency sizes the pool: that many keep-alive connections are
+        kept, with headroom for bursts up to twice as many.
+        """
+        with self._lock:
+            if name in self.clients:
+                return self.clients[name][0]
+
+        size = concurrency or Config.HTTP_POOL_DEFAULT_CONNECTIONS
+        transport = _MeteredTransport(
+            self,
+            limits=httpx.Limits(
+                max_connections=size * 2,
+                max_keepalive_connections=size,
+                keepalive_expiry=Config.HTTP_POOL_KEEPALIVE_EXPIRY,
+            ),
+            retries=1,  # connect failures only
+        )
+        client = httpx.Client(
+            transport=transport,
+            timeout=httpx.Timeout(Config.HTTP_POOL_TIMEOUT, connect=Config.HTTP_POOL_CONNECT_TIMEOUT),
+            follow_redirects=True,
+        )
+        with self._lock:
+            if name in self.clients:  # lost a creation race - use the winner's pool
+                client.close()
+                return self.clients[name][0]
+            self.clients[name] = (client, transport, warm_url or PROVIDER_URLS.get(name))
+        print(f"🔌 HTTP pool '{name}': {size} keep-alive connections (max {size * 2})")
+        return client
+
+    def twilio_client(self):
+        """Shared twilio.rest.Client on a pooled, metered requests session"""
+        if self._twilio:
+            return self._twilio
+        with self._lock:
+            if self._twilio:
+                return self._twilio
+            from twilio.rest import Client
+            from twilio.http.http_client import TwilioHttpClient
+            from requests.adapters import HTTPAdapter
+
+            pool = self
+
+            class MeteredAdapter(HTTPAdapter):
+                def send(self, request, **kwargs):
+                    hostname = httpx.URL(request.url).host
+                    connections_before = self._connections_opened(hostname)
+                    prewarm = request.headers.get("x-klariqo-prewarm") == "1"
+                    start = time.perf_counter()
+                    ok = False
+                    try:
+                        response = super().send(request, **kwargs)
+                        ok = response.status_code < 500 and response.status_code != 429
+                        return response
+                    finally:
+                        latency_ms = (time.perf_counter() - start) * 1000
+                        connects = self._connections_opened(hostname) - connections_before
+                        pool.host(hostname).record(ok, latency_ms, connects, connects, None, prewarm)
+
+                def _connections_opened(self, hostname):
+                    return sum(connection_pool.num_connections
+                               for key in self.poolmanager.pools.keys() if key.key_host == hostname
+                               for connection_pool in [self.poolmanager.pools.get(key)] if connection_pool)
+
+            http_client = TwilioHttpClient(pool_connections=True, timeout=Config.HTTP_POOL_TIMEOUT)
+            self._twilio_adapter = MeteredAdapter(
+                pool_connections=4, pool_maxsize=Config.HTTP_POOL_TWILIO_CONNECTIONS, max_retries=1)
+            http_client.session.mount("https://", self._twilio_adapter)
+            self._twilio = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN, http_client=http_client)
+        print(f"🔌 HTTP pool 'twilio': {Config.HTTP_POOL_TWILIO_CONNECTIONS} keep-alive connections")
+        return self._twilio
+
+    def register_warmer(self, name, warm):
+        """warm() opens/refreshes a provider connection that is not on these pools (e.g. Gemini's gRPC channel)"""
+        self.warmers[name] = warm
+        self.warmer_stats[name] = {"warms": 0, "failures": 0, "last_ms": None, "last_at": 0.0}
+
+    def _ping(self, name, connections):
+        """Open up to `connections` pooled connections to one provider with concurrent HEAD requests"""
+        headers = {"x-klariqo-prewarm": "1"}
+        if name == "twilio":
+            session = self._twilio.http_client.session
+            send = lambda: session.head(PROVIDER_URLS["twilio"], headers=headers, timeout=Config.HTTP_POOL_CONNECT_TIMEOUT)
+        else:
+            client, _, url = self.clients[name]
+            send = lambda: client.head(url, headers=headers)
+
+        def attempt(_):
+            try:
+                send()
+                return True
+            except Exception:
+                return False
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(attempt, range(connections)))
+
+    def _warm(self, name):
+        stats = self.warmer_stats[name]
+        start = time.perf_counter()
+        try:
+            self.warmers[name]()
+            stats["warms"] += 1
+            return True
+        except Exception as e:
+            stats["failures"] += 1
+            print(f"⚠️ Warm-up for {name} failed: {e}")
+            return False
+        finally:
+            stats["last_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            stats["last_at"] = time.time()
+
+    def _providers(self):
+        names = list(self.clients)
+        if self._twilio:
+            names.append("twilio")
+        return names
+
+    def _host_of(self, name):
+        return httpx.URL(PROVIDER_URLS["twilio"] if name == "twilio" else self.clients[name][2]).host
+
+    def prewarm(self, connections=None):
+        """Open connections (TCP + TLS) to every provider now; returns {name: connections warmed}"""
+        connections = connections or Config.HTTP_PREWARM_CONNECTIONS
+        warmed = {}
+        for name in self._providers():
+            warmed[name] = self._ping(name, connections)
+        for name in list(self.warmers):
+            warmed[name] = int(self._warm(name))
+        return warmed
+
+    def _rewarm_loop(self):
+        while True:
+            time.sleep(Config.HTTP_REWARM_CHECK_SECONDS)
+            try:
+                now = time.time()
+                for name in self._providers():
+                    host = self.hosts.get(self._host_of(name))
+                    if host and now - host.last_used >= Config.HTTP_REWARM_IDLE_SECONDS:
+                        self._ping(name, Config.HTTP_PREWARM_CONNECTIONS)
+                for name in list(self.warmers):
+                    if now - self.warmer_stats[name]["last_at"] >= Config.HTTP_REWARM_IDLE_SECONDS:
+                        self._warm(name)
+            except Exception as e:
+                print(f"⚠️ HTTP re-warm error: {e}")
+
+    def start(self):
+        """Pre-warm every provider, then keep idle pools warm in the background"""
+        if not Config.HTTP_PREWARM or self._started:
+            return
+        self._started = True
+
+        def run():
+            start = time.perf_counter()
+            warmed = self.prewarm()
+            summary = ", ".join(f"{name} {count}" for name, count in warmed.items())
+            print(f"🔥 Provider connections pre-warmed in {int((time.perf_counter() - start) * 1000)}ms: {summary}")
+            self._rewarm_loop()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_stats(self):
+        """Per-host request/connection metrics, pool occupancy and warmer results"""
+        with self._lock:
+            hosts = dict(self.hosts)
+            clients = dict(self.clients)
+        stats = {"hosts": {hostname: host.snapshot() for hostname, host in hosts.items()}, "pools": {}}
+        for name, (_, transport, _) in clients.items():
+            open_connections, idle = transport.pool_state()
+            stats["pools"][name] = {"open": open_connections, "idle": idle,
+                                    "max_keepalive": transport._pool._max_keepalive_connections}
+        if self._twilio_adapter:
+            stats["pools"]["twilio"] = {"host_pools": len(self._twilio_adapter.poolmanager.pools),
+                                        "max_keepalive": Config.HTTP_POOL_TWILIO_CONNECTIONS}
+        stats["warmers"] = {name: dict(values) for name, values in self.warmer_stats.items()}
+        return stats
+
+# Global HTTP pool (shared by every provider client)
+http_pool = HttpPool()
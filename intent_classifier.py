@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+KLARIQO INTENT CLASSIFIER MODULE
+Runtime side of the offline-trained clip-chain classifier: hashed character
+n-grams → linear softmax over the clip chains seen in the conversation logs.
+Answers only when confident; everything else defers to the LLM router.
+Train with: python train_intent_classifier.py
+"""
+
+import os
+import threading
+import numpy as np
+from config import Config
+from audio_manager import audio_manager
+from text_vectors import HashingVectorizer
+
+
+class IntentClassifier:
+    """Linear model stored as NumPy arrays (weights, bias, labels) in one .npz file"""
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or Config.INTENT_MODEL_PATH
+        self.weights = None      # (dim, classes) float32
+        self.bias = None         # (classes,) float32
+        self.labels = []         # class → clip chain
+        self.usable = None       # (classes,) bool - every clip of the chain is in the library
+        self.vectorizer = None
+        self.threshold = Config.INTENT_CLASSIFIER_THRESHOLD
+        self._lock = threading.Lock()
+        self.stats = {"predictions": 0, "confident": 0, "unusable": 0}
+
+        self.load()
+        audio_manager.register_reload_listener(self._check_labels)
+
+    @property
+    def loaded(self):
+        return self.weights is not None
+
+    def load(self):
+        """Load the trained arrays if the model file exists"""
+        if not os.path.exists(self.model_path):
+            print(f"🧮 No intent classifier at {self.model_path} (run train_intent_classifier.py)")
+            return False
+
+        try:
+            with np.load(self.model_path, allow_pickle=False) as model:
+                self.vectorizer = HashingVectorizer(
+                    dim=int(model["dim"]),
+                    ngram_range=tuple(int(n) for n in model["ngram_range"])
+                )
+                self.weights = model["weights"].astype(np.float32)
+                self.bias = model["bias"].astype(np.float32)
+                self.labels = [str(label) for label in model["labels"]]
+                # The trainer's recommended threshold unless the config overrides it
+                if Config.INTENT_CLASSIFIER_THRESHOLD is None:
+                    self.threshold = float(model["threshold"])
+        except Exception as e:
+            print(f"❌ Failed to load intent classifier: {e}")
+            self.weights = None
+            return False
+
+        self._check_labels()
+        print(f"🧮 Intent classifier loaded: {len(self.labels)} clip chains, threshold {self.threshold:.2f}")
+        return True
+
+    def _check_labels(self):
+        """Mask out chains whose clips are no longer in the audio library"""
+        if not self.loaded:
+            return
+        self.usable = np.array([
+            all(clip.strip() in audio_manager.clip_ids for clip in label.split('+'))
+            for label in self.labels
+        ], dtype=bool)
+
+    def _predict_class(self, transcript):
+        scores = self.vectorizer.transform(transcript) @ self.weights + self.bias
+        scores = np.exp(scores - scores.max())
+        best = int(np.argmax(scores))
+        return best, float(scores[best] / scores.sum())
+
+    def predict(self, transcript):
+        """(clip chain, confidence) of the most likely class, or (None, 0.0) without a model"""
+        if not self.loaded:
+            return None, 0.0
+        best, confidence = self._predict_class(transcript)
+        return self.labels[best], confidence
+
+    def classify(self, transcript):
+        """Clip chain when confident and playable, otherwise None (defer to the LLM)"""
+        if not self.loaded:
+            return None
+        best, confidence = self._predict_class(transcript)
+
+        with self._lock:
+            self.stats["predictions"] += 1
+            if confidence < self.threshold:
+                return None
+            if not self.usable[best]:
+                self.stats["unusable"] += 1
+                return None
+            self.stats["confident"] += 1
+
+        print(f"🧮 Classifier → {self.labels[best]} ({confidence:.2f})")
+        return self.labels[best]
+
+    def get_stats(self):
+        """Coverage of confident predictions"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["loaded"] = self.loaded
+        stats["classes"] = len(self.labels)
+        stats["threshold"] = self.threshold
+        stats["coverage"] = round(stats["confident"] / stats["predictions"], 3) if stats["predictions"] else 0.0
+        return stats
+
+# Global intent classifier (inactive until a model has been trained)
+intent_classifier = IntentClassifier()
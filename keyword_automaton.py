@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+KLARIQO KEYWORD AUTOMATON MODULE
+Aho-Corasick multi-pattern matcher: finds every keyword hit (with its span
+and payload) in one pass over the transcript instead of one scan per list
+"""
+
+from collections import deque, namedtuple
+
+# start/end are offsets into the lowercased text; payload is whatever add() was given
+KeywordMatch = namedtuple("KeywordMatch", ["start", "end", "phrase", "payload"])
+
+
+class KeywordAutomaton:
+    """Substring matcher over a fixed phrase set (same semantics as `phrase in text.lower()`)"""
+
+    def __init__(self):
+        self.phrases = []   # pattern index → (phrase, payload)
+        self._goto = [{}]   # state → {char: next state}
+        self._fail = [0]
+        self._output = [[]] # state → pattern indexes ending here (including via fail links)
+        self._delta = []    # state → {char: next state}, goto plus memoized fail-link walks
+        self._built = False
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def add(self, phrase, payload=None):
+        """Add a phrase (matched case-insensitively); call build() before matching"""
+        phrase = phrase.lower().strip()
+        if not phrase:
+            return
+
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append(len(self.phrases))
+        self.phrases.append((phrase, payload))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge suffix outputs"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        self._delta = [dict(transitions) for transitions in self._goto]
+        self._built = True
+        return self
+
+    def _transition(self, state, char):
+        """Follow failure links for a (state, char) pair not seen before and memoize it"""
+        current = state
+        while current and char not in self._goto[current]:
+            current = self._fail[current]
+        next_state = self._goto[current].get(char, 0)
+        self._delta[state][char] = next_state
+        return next_state
+
+    def find_all(self, text):
+        """Every phrase occurrence in text, ordered by end offset"""
+        if not self._built:
+            self.build()
+
+        # Transitions are memoized lazily, so steady-state matching is one dict lookup per char
+        delta = self._delta
+        output = self._output
+        phrases = self.phrases
+
+        matches = []
+        state = 0
+        for position, char in enumerate(text.lower()):
+            next_state = delta[state].get(char)
+            state = next_state if next_state is not None else self._transition(state, char)
+            if not output[state]:
+                continue
+            for index in output[state]:
+                phrase, payload = phrases[index]
+                end = position + 1
+                matches.append(KeywordMatch(end - len(phrase), end, phrase, payload))
+
+        return matches
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+KLARIQO LATENCY FILLER MODULE
+Masks routing time with a short acknowledgement ("जी…", "एक सेकंड"). If no
+reply audio is ready FILLER_AFTER_MS after the caller's speech was
+endpointed, the playout queue plays one clip from the library's filler
+category and the real reply follows it. A call never hears the same filler
+twice; once every filler has been used the turn just waits.
+
+Fillers are opt-in: record the clips (short "जी…" / "एक सेकंड" style
+acknowledgements in Nisha's voice), add them to audio_pcm/ and list them
+under a "fillers" category in audio_snippets.json. Until then the library
+has no filler category and turns are not masked.
+
+Per turn two latencies are recorded from the endpoint: time to any audio
+(what the caller perceives) and time to the answer itself.
+"""
+
+import time
+import threading
+from collections import deque
+from config import Config
+from audio_manager import audio_manager
+from logger import call_logger
+
+
+class TurnFiller:
+    """The filler offer for one turn: due at due_at, played at most once"""
+
+    __slots__ = ("session", "due_at", "clip")
+
+    def __init__(self, session, due_at):
+        self.session = session
+        self.due_at = due_at
+        self.clip = None  # filler that played this turn
+
+    def due_in(self):
+        """Seconds until the filler is due (0 = now)"""
+        return max(0.0, self.due_at - time.time())
+
+    def take(self):
+        """(clip, PCM) of a filler this call has not heard yet, or None"""
+        if self.clip is not None:
+            return None
+        picked = latency_fillers.pick(self.session)
+        if picked:
+            self.clip = picked[0]
+        return picked
+
+
+class LatencyFillers:
+    """Picks fillers per call and keeps the perceived-latency numbers"""
+
+    def __init__(self):
+        self.enabled = Config.FILLER_ENABLED
+        self._lock = threading.Lock()
+        self.first_audio_ms = deque(maxlen=Config.FILLER_LATENCY_SAMPLES)
+        self.answer_ms = deque(maxlen=Config.FILLER_LATENCY_SAMPLES)
+        self.stats = {"turns": 0, "filled": 0, "exhausted": 0, "masked_ms": 0}
+
+    def clips(self):
+        """Filler clips in library order"""
+        return list(audio_manager.get_filler_clips())
+
+    def start(self, session, endpoint_at=None):
+        """Filler offer for a turn endpointed at endpoint_at (None when fillers are off)"""
+        if not self.enabled or not self.clips():
+            return None
+        return TurnFiller(session, (endpoint_at or time.time()) + Config.FILLER_AFTER_MS / 1000)
+
+    def pick(self, session):
+        """Next unheard filler with audio for this call, marked as heard"""
+        for clip in self.clips():
+            if clip in session.fillers_played:
+                continue
+            pcm_data = audio_manager.memory_cache.get(clip)
+            if pcm_data:
+                session.fillers_played.append(clip)
+                return clip, pcm_data
+        with self._lock:
+            self.stats["exhausted"] += 1
+        return None
+
+    def record(self, call_sid, endpoint_at, playout, filler=None):
+        """Perceived latency of a finished turn: endpoint → any audio, endpoint → the answer"""
+        if playout.first_audio_at is None:
+            return
+        first_audio_ms = int((playout.first_audio_at - endpoint_at) * 1000)
+        answer_ms = int((playout.answer_at - endpoint_at) * 1000) if playout.answer_at else None
+        clip = filler.clip if filler else None
+
+        with self._lock:
+            self.stats["turns"] += 1
+            self.first_audio_ms.append(first_audio_ms)
+            if answer_ms is not None:
+                self.answer_ms.append(answer_ms)
+            if clip:
+                self.stats["filled"] += 1
+                if answer_ms is not None:
+                    self.stats["masked_ms"] += answer_ms - first_audio_ms
+
+        if clip:
+            print(f"🫧 Filler {clip} masked {answer_ms - first_audio_ms if answer_ms is not None else '?'}ms "
+                  f"(audio at {first_audio_ms}ms, answer at {answer_ms}ms)")
+        call_logger.log_perceived_latency(call_sid, first_audio_ms, answer_ms, clip)
+
+    def get_stats(self):
+        """Filler rate and endpoint → first audio / answer percentiles"""
+        with self._lock:
+            stats = dict(self.stats)
+            samples = {"first_audio_ms": sorted(self.first_audio_ms), "answer_ms": sorted(self.answer_ms)}
+
+        for name, ordered in samples.items():
+            def pick(p):
+                return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+            stats[name] = {"p50": pick(0.5), "p95": pick(0.95)} if ordered else {}
+        stats["filler_rate"] = round(stats["filled"] / stats["turns"], 3) if stats["turns"] else 0.0
+        stats["avg_masked_ms"] = int(stats["masked_ms"] / stats["filled"]) if stats["filled"] else 0
+        stats.update({"enabled": self.enabled, "after_ms": Config.FILLER_AFTER_MS, "clips": len(self.clips())})
+        return stats
+
+# Global latency filler picker and perceived-latency stats
+latency_fillers = LatencyFillers()
@@ -17,6 +17,9 @@ class CallLogger:
         self.logs_folder = Config.LOGS_FOLDER
         self.call_log_file = os.path.join(self.logs_folder, "call_logs.csv")
         self.conversation_log_file = os.path.join(self.logs_folder, "conversation_logs.csv")
+        self.near_miss_log_file = os.path.join(self.logs_folder, "clip_near_misses.csv")
+        self.deadline_log_file = os.path.join(self.logs_folder, "deadline_misses.csv")
+        self.latency_log_file = os.path.join(self.logs_folder, "perceived_latency.csv")
         
         # Ensure logs folder exists
         os.makedirs(self.logs_folder, exist_ok=True)
@@ -43,7 +46,7 @@ class CallLogger:
         # Conversation logs header  
         conversation_headers = [
             'timestamp', 'call_sid', 'speaker', 'message_type', 
-            'content', 'audio_files_used', 'response_time_ms'
+            'content', 'audio_files_used', 'response_time_ms', 'prompt_tokens'
         ]
         
         if not os.path.exists(self.conversation_log_file):
@@ -51,6 +54,23 @@ class CallLogger:
                 writer = csv.writer(f)
                 writer.writerow(conversation_headers)
             print(f"💬 Created conversation log file: {self.conversation_log_file}")
+        else:
+            self._upgrade_header(self.conversation_log_file, conversation_headers)
+    
+    def _upgrade_header(self, log_file, headers):
+        """Rewrite a log written before new columns were added (older rows get blanks)"""
+        with open(log_file, 'r', newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        if not rows or rows[0] == headers:
+            return
+        
+        width = len(headers)
+        with open(log_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for row in rows[1:]:
+                writer.writerow(row + [''] * (width - len(row)))
+        print(f"💬 Added columns to {log_file}: {', '.join(headers[len(rows[0]):])}")
     
     def log_call_start(self, call_sid, phone_number, call_direction, lead_data=None):
         """Log the start of a new call"""
@@ -75,7 +95,7 @@ class CallLogger:
         print(f"📞 Call started - {call_direction}: {call_sid}")
     
     def log_conversation_turn(self, call_sid, speaker, message_type, content, 
-                            audio_files_used=None, response_time_ms=None):
+                            audio_files_used=None, response_time_ms=None, prompt_tokens=None):
         """
         Log a single conversation turn
         
@@ -86,6 +106,7 @@ class CallLogger:
             content: The actual message content
             audio_files_used: List of audio files played (if any)
             response_time_ms: Response generation time in milliseconds
+            prompt_tokens: Prompt tokens of the LLM call behind a response (if any)
         """
         timestamp = datetime.now().isoformat()
         
@@ -102,7 +123,7 @@ class CallLogger:
             writer = csv.writer(f)
             writer.writerow([
                 timestamp, call_sid, speaker, message_type,
-                content, audio_files_str, response_time_ms or ""
+                content, audio_files_str, response_time_ms or "", prompt_tokens or ""
             ])
         
         # Update active call tracking
@@ -160,7 +181,7 @@ class CallLogger:
             response_time_ms=response_time_ms
         )
     
-    def log_nisha_audio_response(self, call_sid, audio_files, response_time_ms=None):
+    def log_nisha_audio_response(self, call_sid, audio_files, response_time_ms=None, prompt_tokens=None):
         """Log Nisha's audio file response"""
         # Parse audio files (handle chaining with +)
         audio_list = [f.strip() for f in audio_files.split('+')]
@@ -168,16 +189,87 @@ class CallLogger:
         # Log the response
         self.log_conversation_turn(
             call_sid, "Nisha", "audio", f"<audio: {audio_files}>",
-            audio_files_used=audio_list, response_time_ms=response_time_ms
+            audio_files_used=audio_list, response_time_ms=response_time_ms,
+            prompt_tokens=prompt_tokens
         )
     
-    def log_nisha_tts_response(self, call_sid, tts_text, response_time_ms=None):
+    def log_nisha_tts_response(self, call_sid, tts_text, response_time_ms=None, prompt_tokens=None):
         """Log Nisha's TTS response"""
         self.log_conversation_turn(
             call_sid, "Nisha", "tts", f"<TTS: {tts_text}>",
-            response_time_ms=response_time_ms
+            response_time_ms=response_time_ms, prompt_tokens=prompt_tokens
         )
     
+    def log_clip_near_miss(self, raw_name, resolved_clip, method, distance=None):
+        """Log a router clip name that needed fuzzy resolution (or could not be resolved)"""
+        try:
+            is_new = not os.path.exists(self.near_miss_log_file)
+            with open(self.near_miss_log_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if is_new:
+                    writer.writerow(['timestamp', 'raw_name', 'resolved_clip', 'method', 'edit_distance'])
+                writer.writerow([datetime.now().isoformat(), raw_name, resolved_clip or '', method,
+                                 distance if distance is not None else ''])
+        except Exception as e:
+            print(f"❌ Error logging clip near miss: {e}")
+    
+    def log_deadline_miss(self, call_sid, stage, action, budget_ms, elapsed_ms):
+        """Log a turn stage that ran out of its deadline and the fallback it took"""
+        try:
+            is_new = not os.path.exists(self.deadline_log_file)
+            with open(self.deadline_log_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if is_new:
+                    writer.writerow(['timestamp', 'call_sid', 'stage', 'action', 'budget_ms', 'elapsed_ms'])
+                writer.writerow([datetime.now().isoformat(), call_sid, stage, action, budget_ms, elapsed_ms])
+        except Exception as e:
+            print(f"❌ Error logging deadline miss: {e}")
+    
+    def log_perceived_latency(self, call_sid, first_audio_ms, answer_ms, filler_clip=None):
+        """Log endpoint → first audio and endpoint → answer for one turn (and the filler in between)"""
+        try:
+            is_new = not os.path.exists(self.latency_log_file)
+            with open(self.latency_log_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if is_new:
+                    writer.writerow(['timestamp', 'call_sid', 'first_audio_ms', 'answer_ms', 'filler_clip'])
+                writer.writerow([datetime.now().isoformat(), call_sid, first_audio_ms,
+                                 answer_ms if answer_ms is not None else '', filler_clip or ''])
+        except Exception as e:
+            print(f"❌ Error logging perceived latency: {e}")
+    
+    def load_answered_turns(self, log_path=None):
+        """
+        Pair every parent transcript with the reply Nisha gave next on that call
+        
+        Returns [(call_sid, transcript, response_type, content)] in log order, where
+        response_type is "AUDIO" (content = "a.mp3 + b.mp3") or "TTS" (content = text).
+        Used by the offline tuning/training tools.
+        """
+        log_path = log_path or self.conversation_log_file
+        pending = {}  # call_sid → transcript waiting for a reply
+        turns = []
+        
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                call_sid = row['call_sid']
+                if row['speaker'] == 'Parent' and row['message_type'] == 'transcript':
+                    pending[call_sid] = row['content'].strip()
+                elif row['speaker'] == 'Nisha' and call_sid in pending:
+                    transcript = pending.pop(call_sid)
+                    if not transcript:
+                        continue
+                    if row['message_type'] == 'audio':
+                        clips = [f.strip() for f in row['audio_files_used'].split(',') if f.strip()]
+                        turns.append((call_sid, transcript, "AUDIO", " + ".join(clips)))
+                    else:
+                        text = row['content']
+                        if text.startswith("<TTS:") and text.endswith(">"):
+                            text = text[5:-1].strip()
+                        turns.append((call_sid, transcript, "TTS", text))
+        
+        return turns
+    
     def get_call_stats(self, days=7):
         """Get call statistics for the last N days"""
         if not os.path.exists(self.call_log_file):
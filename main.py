@@ -26,11 +26,19 @@ from deepgram import (
 
 # Import our modular components
 from config import Config
-from session import session_manager
-from router import response_router
+from session import session_manager, TurnState
+from turn_deadline import turn_deadlines, hold_response
+from speculation import speculative_router
+from routing_pipeline import routing_pipeline
 from tts_engine import tts_engine
 from audio_manager import audio_manager
 from logger import call_logger
+from playout import PlayoutQueue
+from clip_resolver import clip_resolver
+from http_pool import http_pool
+from prefetch import turn_prefetcher
+from dialogue_stage import dialogue_stages
+from latency_filler import latency_fillers
 
 # Import route blueprints
 from routes.inbound import inbound_bp
@@ -94,6 +102,7 @@ def handle_exotel_incoming():
     # Create session
     session = session_manager.create_session(call_sid, "inbound")
     session.session_memory["intro_played"] = True
+    session_manager.save_session(session)
     
     # Log call start
     call_logger.log_call_start(call_sid, from_number, "inbound")
@@ -148,6 +157,13 @@ def exotel_debug():
     return {
         "status": "Exotel Working - Direct audio streaming",
         "active_sessions": session_manager.get_active_count(),
+        "session_stats": session_manager.get_stats(),
+        "turn_latencies": session_manager.get_turn_latencies(),
+        "speculation_stats": speculative_router.get_stats(),
+        "prefetch_stats": turn_prefetcher.get_stats(),
+        "latency_fillers": latency_fillers.get_stats(),
+        "routing_stats": routing_pipeline.get_stats(),
+        "http_pool": http_pool.get_stats(),
         "cached_audio_files": len(audio_manager.cached_files),
         "endpoints": {
             "incoming": "/exotel/voice",
@@ -265,6 +281,44 @@ def send_audio_exotel_direct(ws, pcm_data, stream_sid):
         import traceback
         traceback.print_exc()
 
+def render_tts_pcm(text, deadline=None):
+    """
+    Generate TTS and convert the MP3 from ElevenLabs to PCM for Exotel
+
+    With a turn deadline (the item that makes the turn's first audio) synthesis
+    and conversion only get the time that is left; a miss skips the sentence.
+    Without one only the per-stage caps apply.
+    """
+    if deadline is None:
+        tts_audio_data = tts_engine.generate_audio(text, save_temp=False, timeout=Config.DEADLINE_TTS_CAP)
+        pcm_data = convert_mp3_to_pcm_for_tts(tts_audio_data) if tts_audio_data else None
+    else:
+        timeout = deadline.timeout(Config.DEADLINE_TTS_CAP, reserve_ms=Config.DEADLINE_CONVERSION_RESERVE_MS)
+        if timeout is not None and timeout <= 0:
+            deadline.miss("tts", "skipped")
+            return None
+        tts_audio_data = tts_engine.generate_audio(text, save_temp=False, timeout=timeout)
+        if not tts_audio_data:
+            if deadline.expired(Config.DEADLINE_CONVERSION_RESERVE_MS):
+                deadline.miss("tts", "skipped")
+            return None
+        # librosa cannot be interrupted - the wait for it is bounded instead
+        pcm_data = deadline.run("conversion", convert_mp3_to_pcm_for_tts, tts_audio_data,
+                                cap=Config.DEADLINE_CONVERSION_CAP)
+    if tts_audio_data and not pcm_data:
+        print("❌ TTS MP3 to PCM conversion failed")
+    return pcm_data
+
+def hold_audio_pcm():
+    """PCM for the "one moment" hold reply (library clip, or its pre-rendered text), if available"""
+    response_type, content = hold_response()
+    if response_type == "AUDIO":
+        return audio_manager.memory_cache.get(content)
+    return dialogue_stages.rendered.get(content)
+
+# Likely next TTS replies render ahead with the same pipeline
+turn_prefetcher.register_renderer(render_tts_pcm)
+
 def process_and_respond_exotel_final(transcript, call_sid, ws, stream_sid):
     """Process input and respond with direct audio serving"""
     try:
@@ -274,55 +328,101 @@ def process_and_respond_exotel_final(transcript, call_sid, ws, stream_sid):
         
         start_time = time.time()
         
+        # One time budget from endpoint to first audio, shared by routing, TTS and playout
+        deadline = turn_deadlines.start(call_sid, session.turn_timestamps.get(TurnState.ENDPOINTED))
+        
+        # Short "जी…" if the reply is not ready soon after the endpoint (the caller would hear silence)
+        filler = latency_fillers.start(session, deadline.started_at)
+        
         # Log parent's input
         call_logger.log_parent_input(call_sid, transcript)
         
-        # Get AI response
-        response_type, content = response_router.get_school_response(transcript, session)
+        # Audio plays in order on its own thread; TTS sentences render while earlier ones play
+        playout = PlayoutQueue(lambda pcm_data: send_audio_exotel_direct(ws, pcm_data, stream_sid), label=call_sid,
+                               deadline=deadline, hold_pcm=hold_audio_pcm(), filler=filler)
+        session.playout = playout  # caller speech from here on stops it (barge-in); the turn worker clears it
+        streamed = []
         
-        # Calculate response time
-        response_time_ms = int((time.time() - start_time) * 1000)
+        def start_speaking():
+            # A barge-in may already have sent the turn back to LISTENING
+            if session.turn_state == TurnState.ROUTING:
+                session.transition(TurnState.SPEAKING)
         
-        # Add to history
-        session.add_to_history("Parent", transcript)
-        session.add_to_history("Nisha", f"<{response_type}: {content}>")
+        def queue_clip(audio_file):
+            # Library name (.mp3 key) for typos, stray extensions or casing in router output
+            cache_key = clip_resolver.resolve(audio_file) or audio_file
+            
+            if cache_key in audio_manager.memory_cache:
+                playout.put_pcm(audio_manager.memory_cache[cache_key], gap_after=Config.PLAYOUT_CLIP_GAP, name=cache_key)
+            else:
+                print(f"❌ PCM audio file not in cache: {cache_key} (original: {audio_file})")
         
-        # Clean logging
-        print(f"📞 User: {transcript}")
-        print(f"🤖 AI: {content} ({response_time_ms}ms)")
+        def queue_tts(text):
+            prerendered = dialogue_stages.rendered_pcm(text)
+            if prerendered:
+                playout.put_pcm(prerendered, name="TTS (stage reply)")
+                return
+            prefetched = turn_prefetcher.take(session, text)
+            if prefetched:
+                playout.put_future(prefetched, name="TTS (prefetched)")
+            else:
+                # Only the first item is held to the turn deadline - later sentences render while it plays
+                playout.put_render(render_tts_pcm, text, deadline if not playout.queued else None, name="TTS")
         
-        if response_type == "AUDIO":
-            # Send PCM audio files directly
-            audio_files = [f.strip() for f in content.split('+')]
+        def on_clip(audio_file):
+            start_speaking()
+            streamed.append(audio_file)
+            queue_clip(audio_file)
+        
+        def on_text(text):
+            start_speaking()
+            streamed.append(text)
+            queue_tts(text)
+        
+        try:
+            # Get AI response (an LLM answer streams into the playout queue as it arrives)
+            response_type, content = speculative_router.resolve(transcript, session, on_clip, on_text, deadline)
             
-            for audio_file in audio_files:
-                # Ensure we use .mp3 extension for cache lookup (audio manager uses .mp3 keys)
-                cache_key = audio_file.replace('.pcm', '.mp3') if audio_file.endswith('.pcm') else audio_file
-                
-                if cache_key in audio_manager.memory_cache:
-                    pcm_data = audio_manager.memory_cache[cache_key]
-                    
-                    # Send PCM data directly to Exotel
-                    send_audio_exotel_direct(ws, pcm_data, stream_sid)
-                    time.sleep(1.0)
-                else:
-                    print(f"❌ PCM audio file not in cache: {cache_key} (original: {audio_file})")
-                    
-            call_logger.log_nisha_audio_response(call_sid, content)
+            if playout.cancelled.is_set() and playout.answer_at is None:
+                # Caller kept talking before the reply started - their next turn carries this text
+                print(f"↩️ Reply dropped, caller still speaking: {transcript}")
+                return
+            
+            # Calculate response time
+            response_time_ms = int((time.time() - start_time) * 1000)
+            
+            # Add to history
+            session.record_parent_turn(transcript)
+            session.record_response(response_type, content)
+            
+            # Clean logging
+            print(f"📞 User: {transcript}")
+            print(f"🤖 AI: {content} ({response_time_ms}ms{', streamed' if streamed else ''})")
             
+            start_speaking()
+            
+            # Cached / deterministic answers (and fallbacks) arrive whole
+            if not streamed:
+                if response_type == "AUDIO":
+                    for audio_file in (f.strip() for f in content.split('+')):
+                        queue_clip(audio_file)
+                elif response_type == "TTS":
+                    queue_tts(content)
+        finally:
+            playout.close()
+        
+        # Start on the likely next reply while this one plays and the parent answers
+        turn_prefetcher.observe(session, response_type, content)
+        
+        playout.wait()
+        latency_fillers.record(call_sid, deadline.started_at, playout, filler)
+        
+        if response_type == "AUDIO":
+            call_logger.log_nisha_audio_response(call_sid, content, prompt_tokens=session.prompt_tokens)
         elif response_type == "TTS":
-            # Generate TTS and convert MP3 to PCM for Exotel
-            tts_audio_data = tts_engine.generate_audio(content, save_temp=False)
-            if tts_audio_data:
-                # Convert MP3 from ElevenLabs to PCM for Exotel
-                pcm_data = convert_mp3_to_pcm_for_tts(tts_audio_data)
-                if pcm_data:
-                    send_audio_exotel_direct(ws, pcm_data, stream_sid)
-                else:
-                    print("❌ TTS MP3 to PCM conversion failed")
-                    
-            call_logger.log_nisha_tts_response(call_sid, content)
+            call_logger.log_nisha_tts_response(call_sid, content, prompt_tokens=session.prompt_tokens)
         
+        session_manager.save_session(session)
         print(f"✅ Response sent")
         
     except Exception as e:
@@ -340,8 +440,9 @@ def exotel_media_stream(ws, call_sid):
     if not session:
         session = session_manager.create_session(call_sid, "inbound")
     
-    session.twilio_ws = ws
+    session.attach_stream(ws)
     session.stream_sid = None
+    session.touch()
     
     def start_deepgram():
         """Initialize Deepgram connection"""
@@ -372,17 +473,11 @@ def exotel_media_stream(ws, call_sid):
     deepgram_thread.start()
     time.sleep(0.5)
     
-    def transcript_checker():
-        """Monitor for completed transcripts"""
-        while True:
-            time.sleep(0.05)
-            if session.check_for_completion():
-                process_and_respond_exotel_final(session.completed_transcript, call_sid, ws, session.stream_sid)
-                session.reset_for_next_input()
+    def handle_turn(transcript):
+        """Route and play one endpointed turn (runs on the session's turn worker)"""
+        process_and_respond_exotel_final(transcript, call_sid, ws, session.stream_sid)
     
-    checker_thread = threading.Thread(target=transcript_checker)
-    checker_thread.daemon = True
-    checker_thread.start()
+    session.start_turn_worker(handle_turn, speculative_router)
     
     try:
         while True:
@@ -392,6 +487,7 @@ def exotel_media_stream(ws, call_sid):
                 
             data = json.loads(message)
             event_type = data.get('event')
+            session.touch()
             
             if event_type == 'connected':
                 print(f"🔌 Exotel connected: {call_sid}")
@@ -399,6 +495,7 @@ def exotel_media_stream(ws, call_sid):
             elif event_type == 'start':
                 session.stream_sid = data.get('stream_sid')
                 print(f"🎤 Stream started: {session.stream_sid}")
+                turn_prefetcher.observe(session, None, None)  # Predict the first reply
                 
             elif event_type == 'media':
                 if session.dg_connection:
@@ -418,6 +515,9 @@ def exotel_media_stream(ws, call_sid):
         print(f"❌ WebSocket error: {e}")
         
     finally:
+        session.stop_turn_worker()
+        turn_prefetcher.release(session)
+        session.twilio_ws = None  # Stream gone - sweeper treats the session as orphaned once idle
         if session.dg_connection:
             session.dg_connection.finish()
             session.dg_connection = None
@@ -431,7 +531,8 @@ def media_stream(ws, call_sid):
     if not session:
         return
     
-    session.twilio_ws = ws
+    session.attach_stream(ws)
+    session.touch()
     
     def start_deepgram():
         """Initialize Deepgram connection for this session"""
@@ -462,18 +563,12 @@ def media_stream(ws, call_sid):
     deepgram_thread.start()
     time.sleep(0.5)
     
-    def transcript_checker():
-        """Monitor for completed transcripts"""
-        while True:
-            time.sleep(0.05)
-            if session.check_for_completion():
-                redirect_to_processing(session.completed_transcript, call_sid)
-                break
+    def handle_turn(transcript):
+        """Prepare the response and hand the call over to the continue webhook"""
+        # Stop this worker once redirected - the next stream starts a fresh one
+        return not redirect_to_processing(transcript, call_sid)
     
-    # Start transcript checker
-    checker_thread = threading.Thread(target=transcript_checker)
-    checker_thread.daemon = True
-    checker_thread.start()
+    session.start_turn_worker(handle_turn, speculative_router)
     
     try:
         # Handle WebSocket messages from Twilio
@@ -483,6 +578,7 @@ def media_stream(ws, call_sid):
                 break
                 
             data = json.loads(message)
+            session.touch()
             
             if data.get('event') == 'media':
                 # Forward audio to Deepgram
@@ -505,16 +601,18 @@ def media_stream(ws, call_sid):
         
     finally:
         # Cleanup session
+        session.stop_turn_worker()
+        session.twilio_ws = None
         if session.dg_connection:
             session.dg_connection.finish()
             session.dg_connection = None
 
 def redirect_to_processing(transcript, call_sid):
-    """Process user input and prepare response for Twilio"""
+    """Process user input and prepare response for Twilio (returns True once redirected)"""
     try:
         session = session_manager.get_session(call_sid)
         if not session:
-            return
+            return False
         
         start_time = time.time()
         
@@ -522,7 +620,7 @@ def redirect_to_processing(transcript, call_sid):
         call_logger.log_parent_input(call_sid, transcript)
         
         # Get AI response
-        response_type, content = response_router.get_school_response(transcript, session)
+        response_type, content = speculative_router.resolve(transcript, session)
         
         # Calculate response time
         response_time_ms = int((time.time() - start_time) * 1000)
@@ -532,13 +630,11 @@ def redirect_to_processing(transcript, call_sid):
             temp_filename = tts_engine.generate_audio(content, save_temp=True)
             if not temp_filename:
                 print(f"❌ TTS generation failed for: {content}")
-                return
+                return False
         
         # Prepare session for TwiML generation
-        session.next_response_type = response_type
-        session.next_response_content = content
-        session.next_transcript = transcript
-        session.ready_for_twiml = True
+        session.prepare_response(response_type, content, transcript)
+        session_manager.save_session(session)
         
         # Clean logging
         direction_emoji = "📞" if session.call_direction == "inbound" else "🏫"
@@ -553,8 +649,7 @@ def redirect_to_processing(transcript, call_sid):
         # Redirect call to continue endpoint
         global current_ngrok_url
         if current_ngrok_url:
-            from twilio.rest import Client
-            twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+            twilio_client = http_pool.twilio_client()
             
             if session.call_direction == "outbound":
                 continue_url = f"{current_ngrok_url}/outbound/twilio/continue/{call_sid}"
@@ -562,9 +657,13 @@ def redirect_to_processing(transcript, call_sid):
                 continue_url = f"{current_ngrok_url}/twilio/continue/{call_sid}"
                 
             twilio_client.calls(call_sid).update(url=continue_url, method='POST')
+            return True
+        
+        return False
             
     except Exception as e:
         print(f"❌ Processing error for {call_sid}: {e}")
+        return False
 
 @app.route("/audio_pcm/<filename>")
 def serve_audio(filename):
@@ -709,6 +808,12 @@ if __name__ == "__main__":
     else:
         print("⚠️ Audio cache issues detected")
     
+    # Open provider connections before the first call needs them
+    http_pool.start()
+    
+    # Fixed stage replies (SmartRouter), the deadline hold and the breaker fallback render once, shared by every call
+    dialogue_stages.prewarm(render_tts_pcm, extra_texts=[Config.DEADLINE_HOLD_TEXT, Config.BREAKER_FALLBACK_TEXT])
+    
     # Start ngrok
     public_url = start_ngrok()
     current_ngrok_url = public_url
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+KLARIQO NEXT-TURN PREDICTOR MODULE
+First-order Markov model over Nisha's responses, built offline from the
+conversation logs by build_transition_model.py: given the response just
+played, the likely next responses (clip chains and GENERATE texts) with
+their probabilities. A response is looked up by its full chain first, then
+by its last clip (usually the question the parent is answering).
+"""
+
+import os
+import json
+import threading
+from config import Config
+
+START = "START"  # state before Nisha's first logged response on a call
+
+
+def normalize_text(text):
+    """Generated text as a prediction key: whitespace collapsed"""
+    return " ".join(text.split())
+
+
+def state_keys(response_type, content):
+    """Model states for a response, most specific first"""
+    if not response_type:
+        return [START]
+    if response_type == "AUDIO":
+        clips = [clip.strip() for clip in content.split('+') if clip.strip()]
+        if not clips:
+            return [START]
+        return [f"chain:{' + '.join(clips)}", f"clip:{clips[-1]}"]
+    return ["GENERATE"]
+
+
+class NextTurnPredictor:
+    """Looks up the transition table saved by build_transition_model.py"""
+
+    def __init__(self, model_path=None):
+        self.model_path = model_path or Config.TRANSITION_MODEL_PATH
+        self.transitions = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """(Re)load the transition table; returns False if there is none yet"""
+        if not os.path.exists(self.model_path):
+            print(f"🧭 No transition model at {self.model_path} (run build_transition_model.py)")
+            return False
+        with open(self.model_path, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+        transitions = {
+            state: [tuple(prediction[:3]) for prediction in entry["next"]]
+            for state, entry in model["transitions"].items()
+            if entry["total"] >= Config.PREDICTOR_MIN_STATE_COUNT
+        }
+        with self._lock:
+            self.transitions = transitions
+        print(f"🧭 Transition model loaded: {len(transitions)} states from {model.get('calls', '?')} calls")
+        return True
+
+    @property
+    def available(self):
+        return bool(self.transitions)
+
+    def predict(self, response_type, content, limit=None):
+        """[(response_type, content, probability)] likely to follow this response, most likely first"""
+        transitions = self.transitions
+        for key in state_keys(response_type, content):
+            predictions = transitions.get(key)
+            if predictions:
+                return predictions[:limit] if limit else list(predictions)
+        return []
+
+# Global next-turn predictor (transition table from the conversation logs)
+next_turn_predictor = NextTurnPredictor()
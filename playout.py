@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+KLARIQO PLAYOUT QUEUE MODULE
+Ordered per-turn audio playout: items can be queued before their audio exists
+(TTS still rendering) and are played strictly in order as each one is ready,
+so synthesis of the next sentence overlaps playback of the current one
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from config import Config
+
+# Shared TTS/convert workers for every call's playout queue
+_render_executor = ThreadPoolExecutor(max_workers=Config.PLAYOUT_RENDER_WORKERS, thread_name_prefix="playout-render")
+
+_CLOSE = object()
+
+
+class PlayoutQueue:
+    """
+    Plays queued PCM in order on a background thread via send_pcm(pcm_bytes)
+
+    With a TurnFiller, a filler clip plays if nothing is ready when it is
+    due and the reply follows it. With a TurnDeadline, waiting for the reply
+    is bounded by it: on a miss hold_pcm (a short "one moment") plays while
+    the real audio is still coming, and the deadline is met at the first
+    non-filler audio either way.
+    """
+
+    def __init__(self, send_pcm, label="", deadline=None, hold_pcm=None, filler=None):
+        self.send_pcm = send_pcm
+        self.label = label
+        self.deadline = deadline
+        self.hold_pcm = hold_pcm
+        self.filler = filler
+        self.items = queue.Queue()
+        self.cancelled = threading.Event()
+        self.started_at = time.time()
+        self.first_audio_at = None  # any audio, a filler included
+        self.answer_at = None  # first audio of the reply itself
+        self.queued = 0
+        self.played = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name=f"playout-{label}", daemon=True)
+        self._thread.start()
+
+    def put_pcm(self, pcm_data, gap_after=0.0, name=""):
+        """Queue audio that is already rendered (pre-recorded clip)"""
+        future = Future()
+        future.set_result(pcm_data)
+        self.put_future(future, gap_after, name)
+
+    def put_render(self, render, *args, gap_after=0.0, name=""):
+        """Queue audio that render(*args) → PCM bytes produces; rendering starts now"""
+        self.put_future(_render_executor.submit(render, *args), gap_after, name)
+
+    def put_future(self, future, gap_after=0.0, name=""):
+        """Queue audio already rendering elsewhere (a Future resolving to PCM bytes)"""
+        self.queued += 1
+        self.items.put((future, gap_after, name))
+
+    def close(self):
+        """No more items for this turn"""
+        self.items.put(_CLOSE)
+
+    def cancel(self):
+        """Stop after the item currently playing (barge-in)"""
+        self.cancelled.set()
+        self.close()
+
+    def wait(self, timeout=None):
+        """Block until everything queued has played (or the queue was cancelled)"""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _masked(self, wait, timeout):
+        """wait() until the filler is due; if nothing is ready by then the filler plays (once per turn)"""
+        filler, self.filler = self.filler, None
+        if filler is None:
+            return wait(timeout)
+        due_in = filler.due_in()
+        if timeout is not None and timeout <= due_in:
+            return wait(timeout)
+        started = time.time()
+        try:
+            return wait(due_in)
+        except (queue.Empty, TimeoutError):
+            picked = filler.take()
+            if picked and not self.cancelled.is_set():
+                clip, pcm_data = picked
+                self._play(pcm_data, 0.0, clip, kind="filler")
+        if timeout is not None:
+            timeout = max(0.0, timeout - (time.time() - started))
+        return wait(timeout)
+
+    def _bounded(self, wait, stage, timeout):
+        """wait(timeout); before the reply a due filler plays, and the wait ends at the turn deadline (hold audio)"""
+        if self.filler is not None and self.answer_at is None and not self.cancelled.is_set():
+            wait = lambda timeout, wait=wait: self._masked(wait, timeout)
+        if self.deadline is not None and self.deadline.met_at is None:
+            try:
+                return wait(self.deadline.timeout(timeout))
+            except (queue.Empty, TimeoutError):
+                self.deadline.miss(stage, "hold" if self.hold_pcm else "waiting")
+                if self.hold_pcm and not self.cancelled.is_set():
+                    self._play(self.hold_pcm, 0.0, "hold", kind="hold")
+        return wait(timeout)
+
+    def _play(self, pcm_data, gap_after, name, kind="answer"):
+        now = time.time()
+        if self.first_audio_at is None:
+            self.first_audio_at = now
+            print(f"🔊 First audio after {int((now - self.started_at) * 1000)}ms"
+                  f"{f' ({name})' if name else ''}")
+        if kind != "filler" and self.deadline is not None:
+            self.deadline.meet()
+        if kind == "answer" and self.answer_at is None:
+            self.answer_at = now
+            if now != self.first_audio_at:
+                print(f"🔊 Reply audio after {int((now - self.started_at) * 1000)}ms")
+        self.send_pcm(pcm_data)
+        self.played += 1
+        if gap_after:
+            time.sleep(gap_after)
+
+    def _run(self):
+        while True:
+            item = self._bounded(lambda timeout: self.items.get(timeout=timeout), "first_audio", None)
+            if item is _CLOSE or self.cancelled.is_set():
+                break
+
+            future, gap_after, name = item
+            try:
+                pcm_data = self._bounded(lambda timeout: future.result(timeout=timeout), "playout",
+                                         Config.PLAYOUT_RENDER_TIMEOUT)
+            except Exception as e:
+                pcm_data = None
+                print(f"❌ Playout render failed{f' for {name}' if name else ''}: {e}")
+
+            if not pcm_data:
+                self.failed += 1
+                continue
+            if self.cancelled.is_set():
+                break
+            self._play(pcm_data, gap_after, name)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+KLARIQO PREFETCH MODULE
+Renders the likely next generated (TTS) replies while the parent is still
+talking. After each response the next-turn predictor names the likely
+follow-ups; GENERATE texts above PREFETCH_MIN_PROBABILITY are synthesized
+on a small worker pool and parked on the session. When the turn's reply
+turns out to be one of them, playout takes the finished (or in-flight)
+render instead of starting a new one. Renders nobody used are counted as
+waste.
+
+Clip chains need no prefetch: every library clip is held as PCM in
+audio_manager.memory_cache from startup. Their predictions are still scored
+so the model's accuracy shows up next to the prefetch numbers.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from next_turn_predictor import next_turn_predictor, normalize_text
+
+
+class PrefetchedRender:
+    """One speculative TTS render"""
+
+    __slots__ = ("text", "probability", "future", "started_at", "finished_at")
+
+    def __init__(self, text, probability):
+        self.text = text
+        self.probability = probability
+        self.future = None
+        self.started_at = time.time()
+        self.finished_at = None
+
+
+class SessionPrefetch:
+    """Per-call prefetch state: the predictions made after the last response and their renders"""
+
+    __slots__ = ("predicted", "renders")
+
+    def __init__(self):
+        self.predicted = []  # [(response_type, content)] for the coming turn
+        self.renders = {}    # normalized text → PrefetchedRender
+
+
+class TurnPrefetcher:
+    """Predicts the next reply after every response and pre-renders likely TTS"""
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.enabled = Config.PREFETCH_ENABLED
+        self.render = None
+        self.executor = ThreadPoolExecutor(max_workers=Config.PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "turns": 0, "predicted_turns": 0, "prediction_hits": 0,
+            "renders": 0, "hits": 0, "wasted": 0, "cancelled": 0, "wasted_render_ms": 0, "saved_ms": 0,
+        }
+
+    def register_renderer(self, render):
+        """render(text) → PCM bytes, the same function playout uses for TTS"""
+        self.render = render
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _run(self, render, entry):
+        try:
+            return render(entry.text)
+        finally:
+            entry.finished_at = time.time()
+
+    def take(self, session, text):
+        """Future with PCM for this TTS text if it was prefetched (it is then used up), else None"""
+        state = session.prefetch
+        if state is None:
+            return None
+        entry = state.renders.pop(normalize_text(text), None)
+        if entry is None:
+            return None
+
+        # Time the turn did not spend rendering: all of it if done, else what was already underway
+        saved_ms = ((entry.finished_at or time.time()) - entry.started_at) * 1000
+        self._count("hits")
+        self._count("saved_ms", int(saved_ms))
+        print(f"🔥 Prefetched TTS used ({'ready' if entry.finished_at else 'in flight'}, p={entry.probability})")
+        return entry.future
+
+    def _settle(self, state, response_type, content):
+        """Score the previous predictions against the response that actually came, drop unused renders"""
+        if state.predicted:
+            self._count("predicted_turns")
+            if response_type == "TTS":
+                content = normalize_text(content)
+            self._count("prediction_hits", int((response_type, content) in state.predicted))
+
+        for entry in state.renders.values():
+            if entry.future.cancel():
+                self._count("cancelled")
+                continue
+            self._count("wasted")
+            if entry.finished_at:
+                self._count("wasted_render_ms", int((entry.finished_at - entry.started_at) * 1000))
+        state.renders = {}
+        state.predicted = []
+
+    def observe(self, session, response_type, content):
+        """
+        Called once a turn's response is final
+
+        Settles the predictions made for this turn, then predicts the next
+        one and starts rendering the likely generated replies.
+        """
+        if not self.enabled:
+            return
+        self._count("turns")
+
+        state = session.prefetch
+        if state is None:
+            state = session.prefetch = SessionPrefetch()
+        self._settle(state, response_type, content)
+
+        predictions = self.predictor.predict(response_type, content, limit=Config.PREDICTOR_TOP_K)
+        state.predicted = [(kind, value) for kind, value, _ in predictions]
+        if self.render is None:
+            return
+
+        for kind, value, probability in predictions:
+            if len(state.renders) >= Config.PREFETCH_MAX_RENDERS:
+                break
+            if kind != "TTS" or probability < Config.PREFETCH_MIN_PROBABILITY:
+                continue
+            entry = PrefetchedRender(value, probability)
+            entry.future = self.executor.submit(self._run, self.render, entry)
+            state.renders[value] = entry
+            self._count("renders")
+
+    def release(self, session):
+        """Call ended: count whatever was still parked as waste"""
+        state = session.prefetch
+        if state is not None:
+            state.predicted = []
+            self._settle(state, None, None)
+            session.prefetch = None
+
+    def get_stats(self):
+        """Prediction accuracy, prefetch hit rate and wasted render work"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["model_loaded"] = self.predictor.available
+        stats["prediction_accuracy"] = (
+            round(stats["prediction_hits"] / stats["predicted_turns"], 3) if stats["predicted_turns"] else 0.0)
+        stats["render_hit_rate"] = round(stats["hits"] / stats["renders"], 3) if stats["renders"] else 0.0
+        return stats
+
+# Global turn prefetcher driven by the next-turn predictor
+turn_prefetcher = TurnPrefetcher(next_turn_predictor)
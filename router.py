@@ -4,80 +4,58 @@ KLARIQO RESPONSE ROUTER MODULE
 Clean GPT-based response selection with reliable TTS handling
 """
 
+import threading
+from datetime import datetime
 from openai import OpenAI
 from config import Config
 from audio_manager import audio_manager
+from clip_index import filter_repeats
+from stream_parser import StreamedTurn
+from clip_resolver import clip_resolver
+from clip_schema import clip_schema, PROMPT_NOTE
+from slot_extractor import slot_extractor
+from clip_retriever import clip_retriever
+from context_window import context_window
+from text_utils import estimate_tokens
+from http_pool import http_pool
+
+# Initialize OpenAI client (pooled keep-alive connections, one per concurrent LLM call)
+openai_client = OpenAI(
+    api_key=Config.OPENAI_API_KEY,
+    http_client=http_pool.httpx_client("openai", Config.BREAKER_MAX_IN_FLIGHT),
+)
+
+# School hours used for the open/closed status in the prompt
+SCHOOL_OPEN_HOUR = 8  # 8 AM
+SCHOOL_CLOSE_HOUR = 15  # 3 PM
+
+
+def get_school_status(now=None):
+    """'Open' during school hours on weekdays, otherwise 'Closed'"""
+    now = now or datetime.now()
+    is_school_open = SCHOOL_OPEN_HOUR <= now.hour < SCHOOL_CLOSE_HOUR
+    is_weekend = now.strftime("%A") in ["Saturday", "Sunday"]
+    return 'Open' if is_school_open and not is_weekend else 'Closed'
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
 
 class ResponseRouter:
     """Handles AI-powered response selection with reliable GPT processing"""
     
     def __init__(self):
-        self.base_prompt = self._build_base_prompt()
+        self.base_prompt = self._build_base_prompt()  # identical on every call so the provider can cache it
+        self.base_prompt_tokens = estimate_tokens(self.base_prompt)
+        self._last_call = threading.local()  # per-thread outcome of the latest LLM call
         print("🤖 Response Router initialized: GPT-only mode (reliable & fast)")
     
-    def _extract_session_variables(self, user_input, session):
-        """Extract and update session variables from user input"""
-        user_lower = user_input.lower()
-        
-        # Extract admission type
-        if any(word in user_lower for word in ["first time", "firsttime", "pehli bar", "naya admission"]):
-            session.update_session_variable("admission_type", "firsttime")
-        elif any(word in user_lower for word in ["transfer", "dusre school se", "change school"]):
-            session.update_session_variable("admission_type", "transfer")
-        
-        # Extract class information
-        class_mappings = {
-            "kg1": "KG1", "kg 1": "KG1", "nursery": "KG1", "pre kg": "KG1",
-            "kg2": "KG2", "kg 2": "KG2", "ukg": "KG2",
-            "1st class": "Class 1", "class 1": "Class 1", "first class": "Class 1", "पहली क्लास": "Class 1",
-            "2nd class": "Class 2", "class 2": "Class 2", "second class": "Class 2", "दूसरी क्लास": "Class 2",
-            "3rd class": "Class 3", "class 3": "Class 3", "third class": "Class 3", "तीसरी क्लास": "Class 3",
-            "4th class": "Class 4", "class 4": "Class 4", "fourth class": "Class 4", "चौथी क्लास": "Class 4",
-            "5th class": "Class 5", "class 5": "Class 5", "fifth class": "Class 5", "पांचवी क्लास": "Class 5"
-        }
-        
-        for key, value in class_mappings.items():
-            if key in user_lower:
-                session.update_session_variable("admission_class", value)
-                break
-        
-        # Extract location for bus route
-        location_indicators = ["area", "location", "jagah", "रहते हैं", "से आना है", "pick up"]
-        if any(indicator in user_lower for indicator in location_indicators):
-            # Extract the location (simplified - could be enhanced with NLP)
-            words = user_input.split()
-            for i, word in enumerate(words):
-                if any(indicator in word.lower() for indicator in location_indicators):
-                    if i > 0:
-                        potential_location = words[i-1]
-                        session.update_session_variable("student_location", potential_location)
-                    break
-        
-        # Extract age information
-        import re
-        age_match = re.search(r'(\d+)\s*(?:years?|साल|वर्ष)', user_lower)
-        if age_match:
-            age = int(age_match.group(1))
-            session.update_session_variable("student_age", age)
-        
-        # Extract inquiry focus
-        if any(word in user_lower for word in ["fees", "fee", "फीस", "cost", "charges"]):
-            session.update_session_variable("inquiry_focus", "fees")
-        elif any(word in user_lower for word in ["transport", "bus", "बस", "pickup"]):
-            session.update_session_variable("inquiry_focus", "transport")
-        elif any(word in user_lower for word in ["activity", "activities", "sports", "खेल"]):
-            session.update_session_variable("inquiry_focus", "activities")
-        elif any(word in user_lower for word in ["admission", "एडमिशन", "दाखिला"]):
-            session.update_session_variable("inquiry_focus", "admission")
-    
     def _build_base_prompt(self):
         """Build the base prompt for GPT response selection"""
         
-        # Get available files for dynamic selection
-        available_files = self._get_available_files_by_category()
+        # Get available files for dynamic selection (per-turn shortlist when retrieval is on)
+        if Config.CLIP_RETRIEVAL_TOP_K:
+            available_files = ("Relevant files for each query are listed under Candidates in the user message.\n"
+                                "Only choose from those candidates or the files named in the rules above.")
+        else:
+            available_files = self._get_available_files_by_category()
         
         prompt = f"""You are Nisha's audio file selector — a polite, helpful voice assistant at AVS International School.
         Your job is to respond to parent queries with the right audio file snippet(s) from the school's library.
@@ -150,7 +128,27 @@ Following up on admission	nisha_introduction_outbound.mp3 + admission_last_date.
 Announcing scholarship availability	nisha_introduction_outbound.mp3 + scholarships_n_discounts.mp3
 
 📋 AVAILABLE AUDIO FILES:
-{available_files}"""
+{available_files}
+
+🧠 EACH MESSAGE GIVES YOU:
+Earlier / Recent: what was said and played so far (P = parent, N = Nisha)
+Known: session variables gathered so far | Done: topics already covered
+Don't repeat: files played recently
+Candidates: files relevant to this query
+Now: current date, time and whether the school is open
+Parent: what the parent just said
+
+🎯 INTELLIGENT SELECTION RULES:
+- If admission_type is known, use specific admission_process_firsttime.mp3 or admission_process_transfer.mp3
+- If admission_class is known and user asks about fees, use fees_ask_class.mp3 then mention specific fees for that class
+- If student_location is provided and user asks about transport, use bus_fees.mp3 with location context
+- If student_age is known, use admission_age_eligibility.mp3 for age-related queries
+- School hours are 8:00 AM - 3:00 PM, Monday to Friday
+- If user asks about visiting today and school is closed, use GENERATE to explain current status
+- If user asks about timings, consider current time and day for context"""
+        
+        if Config.ROUTER_STRUCTURED_OUTPUT:
+            prompt += PROMPT_NOTE
         
         return prompt
     
@@ -158,7 +156,7 @@ Announcing scholarship availability	nisha_introduction_outbound.mp3 + scholarshi
         """Get formatted list of available files by category (excluding intro files)"""
         categories = []
         for category, files in audio_manager.audio_snippets.items():
-            if category != "quick_responses" and files:
+            if category not in ("quick_responses", Config.FILLER_CATEGORY) and files:
                 # Filter out intro files from the available files list
                 filtered_files = {k: v for k, v in files.items() if not k.startswith('intro_klariqo')}
                 if filtered_files:
@@ -168,99 +166,40 @@ Announcing scholarship availability	nisha_introduction_outbound.mp3 + scholarshi
     
     # Remove the _get_alternatives method completely since no more alternate files
     
-    def _get_recent_files(self, session, limit=3):
-        """Get recently played audio files to avoid repetition"""
-        recent_files = []
-        
-        # Look through recent conversation history for audio responses
-        if hasattr(session, 'conversation_history'):
-            for entry in session.conversation_history[-6:]:  # Last 6 entries
-                if "Nisha:" in entry and "<audio:" in entry:
-                    # Extract filenames from "<audio: file1.mp3 + file2.mp3>"
-                    import re
-                    files = re.findall(r'<audio: ([^>]+)>', entry)
-                    if files:
-                        audio_chain = files[0]
-                        file_list = [f.strip() for f in audio_chain.split('+')]
-                        recent_files.extend(file_list)
-        
-        # Return last N unique files
-        seen = set()
-        unique_recent = []
-        for f in reversed(recent_files):
-            if f not in seen and len(unique_recent) < limit:
-                unique_recent.append(f)
-                seen.add(f)
-        
-        return unique_recent[:limit]
-    
-    def _get_recent_conversation(self, session, limit=2):
-        """Get recent conversation context"""
-        if not hasattr(session, 'conversation_history'):
-            return "None"
-        
-        recent = session.conversation_history[-(limit*2):]  # Last N exchanges
-        return " | ".join(recent) if recent else "None"
-    
     def _build_context_prompt(self, session, user_input):
-        """Build context prompt with dynamic session variables"""
+        """Compact per-turn context (the static rules live in the system prompt)"""
         
         # Extract and update session variables from user input
-        self._extract_session_variables(user_input, session)
-        
-        # Get recent conversation history
-        recent_files = self._get_recent_files(session, limit=3)
-        recent_conversation = self._get_recent_conversation(session, limit=2)
+        slot_extractor.update_session(session, user_input)
         
-        # Get current session context
-        session_context = session.get_session_context()
+        # Shortlist of clips relevant to this utterance instead of the whole library
+        candidates = ""
+        if Config.CLIP_RETRIEVAL_TOP_K:
+            candidates = clip_retriever.format_candidates(user_input, session)
         
-        # Get current date, day, and time for context-aware responses
-        from datetime import datetime
+        # Current date, day and time for context-aware responses (e.g. "Monday 15 December 2024 02:30 PM")
         now = datetime.now()
-        current_date = now.strftime("%d %B %Y")  # e.g., "15 December 2024"
-        current_day = now.strftime("%A")  # e.g., "Sunday"
-        current_time = now.strftime("%I:%M %p")  # e.g., "02:30 PM"
-        current_hour = now.hour  # 24-hour format for logic
+        clock_line = f"Now: {now.strftime('%A %d %B %Y %I:%M %p')} (school {get_school_status(now)})"
         
-        # School timing logic
-        school_open_hour = 8  # 8 AM
-        school_close_hour = 15  # 3 PM
-        is_school_open = school_open_hour <= current_hour < school_close_hour
-        is_weekend = current_day in ["Saturday", "Sunday"]
-        
-        context_prompt = f"""
-🧠 CONVERSATION MEMORY:
-Recently played files (DON'T repeat): {', '.join(recent_files)}
-Recent conversation: {recent_conversation}
-
-📅 CURRENT DATE & TIME CONTEXT:
-Date: {current_date} ({current_day})
-Time: {current_time}
-School Status: {'Open' if is_school_open and not is_weekend else 'Closed'}
-- School hours: 8:00 AM - 3:00 PM (Monday to Friday)
-- Weekend: {current_day} is {'weekend' if is_weekend else 'weekday'}
-
-📋 CURRENT SESSION VARIABLES:
-{session_context}
-
-📝 CURRENT USER INPUT: "{user_input}"
-
-🎯 INTELLIGENT SELECTION RULES:
-- If admission_type is known, use specific admission_process_firsttime.mp3 or admission_process_transfer.mp3
-- If admission_class is known and user asks about fees, use fees_ask_class.mp3 then mention specific fees for that class
-- If student_location is provided and user asks about transport, use bus_fees.mp3 with location context
-- If student_age is known, use admission_age_eligibility.mp3 for age-related queries
-- If user asks about visiting today and school is closed, use GENERATE to explain current status
-- If user asks about timings, consider current time and day for context
-
-Apply the rules from your system prompt. Choose appropriate files or GENERATE response."""
-        
-        return context_prompt
+        return context_window.build(session, user_input, candidates=candidates,
+                                    clock_line=clock_line, system_tokens=self.base_prompt_tokens)
+    
+    def _completion_options(self):
+        """Sampling options shared by the streamed and non-streamed calls"""
+        options = {"model": "gpt-4.1-mini", "temperature": 0.1, "max_tokens": Config.ROUTER_MAX_TOKENS, "timeout": 10}
+        if Config.ROUTER_STRUCTURED_OUTPUT:
+            options["max_tokens"] = Config.ROUTER_STRUCTURED_MAX_TOKENS
+            # JSON constrained to the library's clip IDs - no free-text cleanup or guessing
+            options["response_format"] = clip_schema.openai_response_format()
+        return options
     
     def get_school_response(self, user_input, session):
         """Get appropriate response for school conversation - RELIABLE GPT-ONLY MODE"""
         
+        self._last_call.ok = False
+        self._last_call.latency_ms = 0
+        self._last_call.tokens = 0
+        
         try:
             import time
             start = time.time()
@@ -271,19 +210,29 @@ Apply the rules from your system prompt. Choose appropriate files or GENERATE re
                 {"role": "user", "content": self._build_context_prompt(session, user_input)}
             ]
             
-            # Call OpenAI GPT-4.1-mini for response
-            response = openai_client.chat.completions.create(
-                model="gpt-4.1-mini",
-                messages=messages,
-                temperature=0.1,  # Very low for consistency
-                max_tokens=100,   # Allow longer responses for chaining
-                timeout=10        # 10 second timeout
-            )
+            # Call OpenAI GPT-4.1-mini for response (temperature 0.1, capped tokens, 10s timeout)
+            response = openai_client.chat.completions.create(messages=messages, **self._completion_options())
             
             openai_response = response.choices[0].message.content.strip()
-            openai_response = openai_response.replace('"', '').replace("'", "")
             
             response_time = int((time.time() - start) * 1000)
+            structured = clip_schema.parse(openai_response) if Config.ROUTER_STRUCTURED_OUTPUT else None
+            if Config.ROUTER_STRUCTURED_OUTPUT and structured is None and openai_response.startswith('{'):
+                # Truncated or malformed JSON is a failed call, not a clip chain to guess from
+                raise ValueError(f"unparseable structured reply: {openai_response[:80]}")
+            
+            self._last_call.ok = True
+            self._last_call.latency_ms = response_time
+            self._last_call.tokens = response.usage.total_tokens if response.usage else 0
+            
+            if structured:
+                response_type, content = structured
+                print(f"🎯 GPT → {'TTS' if response_type == 'TTS' else 'Audio'}: {content} ({response_time}ms)")
+                if response_type == "TTS":
+                    return response_type, content
+                return filter_repeats("AUDIO", content, session)
+            
+            openai_response = openai_response.replace('"', '').replace("'", "")
             
             # Check if it's a custom generation request
             if openai_response.startswith("GENERATE:"):
@@ -292,13 +241,75 @@ Apply the rules from your system prompt. Choose appropriate files or GENERATE re
                 return "TTS", text_to_generate
             else:
                 print(f"🎯 GPT → Audio: {openai_response} ({response_time}ms)")
-                return "AUDIO", openai_response
+                return filter_repeats("AUDIO", clip_resolver.resolve_chain(openai_response), session)
                 
         except Exception as e:
             # Fallback to safe response
             print(f"❌ GPT error: {e}")
             return "TTS", "I want to make sure I give you the right information. Could you tell me what specific aspect you'd like to know more about?"
     
+    def stream_school_response(self, user_input, session, on_clip, on_text):
+        """
+        Streamed get_school_response: each clip (or TTS sentence) is handed to
+        on_clip/on_text as soon as the completion resolves it, so playback can
+        start before the model finishes. Returns what was streamed; if nothing
+        was, the returned response still has to be played by the caller.
+        """
+        
+        self._last_call.ok = False
+        self._last_call.latency_ms = 0
+        self._last_call.tokens = 0
+        streamed = StreamedTurn(session, on_clip, on_text)
+        
+        try:
+            import time
+            start = time.time()
+            
+            messages = [
+                {"role": "system", "content": self.base_prompt},
+                {"role": "user", "content": self._build_context_prompt(session, user_input)}
+            ]
+            
+            stream = openai_client.chat.completions.create(
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},  # usage arrives on the final chunk
+                **self._completion_options()
+            )
+            
+            tokens = 0
+            for chunk in stream:
+                if chunk.usage:
+                    tokens = chunk.usage.total_tokens
+                if chunk.choices:
+                    streamed.feed(chunk.choices[0].delta.content)
+            streamed.finish()
+            failure = streamed.failure()
+            if failure:
+                raise ValueError(failure)
+            
+            response_time = int((time.time() - start) * 1000)
+            self._last_call.ok = True
+            self._last_call.latency_ms = response_time
+            self._last_call.tokens = tokens
+            
+        except Exception as e:
+            print(f"❌ GPT stream error: {e}")
+            if not streamed.streamed:
+                return "TTS", "I want to make sure I give you the right information. Could you tell me what specific aspect you'd like to know more about?"
+            response_time = int((time.time() - start) * 1000)
+        
+        response_type, content = streamed.result()
+        print(f"🎯 GPT ⇢ {'TTS' if response_type == 'TTS' else 'Audio'}: {content} "
+              f"(first {streamed.first_event_ms}ms, done {response_time}ms)")
+        return response_type, content
+    
+    def last_call_info(self):
+        """Outcome of this thread's latest LLM call: (succeeded, latency_ms, total_tokens)"""
+        return (getattr(self._last_call, "ok", False),
+                getattr(self._last_call, "latency_ms", 0),
+                getattr(self._last_call, "tokens", 0))
+    
     def validate_response(self, response_content):
         """Validate that the response contains valid audio files"""
         if not response_content or response_content.startswith("GENERATE:"):
@@ -4,9 +4,18 @@ KLARIQO GEMINI ROUTER MODULE
 Fast response selection using Google Gemini Flash
 """
 
+import threading
 import google.generativeai as genai
 from config import Config
 from audio_manager import audio_manager
+from clip_index import filter_repeats
+from stream_parser import StreamedTurn
+from clip_resolver import clip_resolver
+from clip_schema import clip_schema, PROMPT_NOTE
+from slot_extractor import slot_extractor
+from context_window import context_window
+from text_utils import estimate_tokens
+from http_pool import http_pool
 
 # Initialize Gemini client
 genai.configure(api_key=Config.GEMINI_API_KEY)
@@ -16,7 +25,12 @@ class ResponseRouterGemini:
     
     def __init__(self):
         self.model = genai.GenerativeModel('gemini-1.5-flash')
-        self.base_prompt = self._build_base_prompt()
+        self.schema_supported = True  # cleared if the installed SDK rejects response_schema
+        self.base_prompt = self._build_base_prompt()  # identical on every call so the provider can cache it
+        self.base_prompt_tokens = estimate_tokens(self.base_prompt)
+        self._last_call = threading.local()  # per-thread outcome of the latest LLM call
+        # Gemini talks gRPC, not the shared HTTP pools - keep its channel warm with a token count
+        http_pool.register_warmer("gemini", lambda: self.model.count_tokens("नमस्ते"))
         print("💎 Gemini Flash Router initialized: FAST mode (150-250ms responses)")
     
     def _build_base_prompt(self):
@@ -77,7 +91,22 @@ User acts surprised about AI reveal → shocked_after_agent_reveal_response.mp3
 
 User wants to end conversation → goodbye1.mp3
 
-🚫 FORBIDDEN: Never suggest intro_klariqo files - intro is already done!"""
+🚫 FORBIDDEN: Never suggest intro_klariqo files - intro is already done!
+
+🧠 EACH MESSAGE GIVES YOU:
+Earlier / Recent: what was said and played so far (P = parent, N = Nisha)
+Known: session variables gathered so far | Done: topics already covered
+Don't repeat: files played recently
+Parent: what the parent just said
+
+🎯 INTELLIGENT SELECTION RULES:
+- If admission_type is known, use specific admission_process_firsttime.mp3 or admission_process_transfer.mp3
+- If admission_class is known and user asks about fees, use fees_ask_class.mp3 then mention specific fees for that class
+- If student_location is provided and user asks about transport, use bus_fees.mp3 with location context
+- If student_age is known, use admission_age_eligibility.mp3 for age-related queries"""
+        
+        if Config.ROUTER_STRUCTURED_OUTPUT:
+            prompt += PROMPT_NOTE
         
         return prompt
     
@@ -85,7 +114,7 @@ User wants to end conversation → goodbye1.mp3
         """Get formatted list of available files by category (excluding intro files)"""
         categories = []
         for category, files in audio_manager.audio_snippets.items():
-            if category != "quick_responses" and files:
+            if category not in ("quick_responses", Config.FILLER_CATEGORY) and files:
                 # Filter out intro files from the available files list
                 filtered_files = {k: v for k, v in files.items() if not k.startswith('intro_klariqo')}
                 if filtered_files:
@@ -93,136 +122,40 @@ User wants to end conversation → goodbye1.mp3
                     categories.append(f"{category}: {file_list}")
         return "\n".join(categories)
     
-    def _get_recent_files(self, session, limit=3):
-        """Get recently played audio files to avoid repetition"""
-        recent_files = []
-        
-        # Look through recent conversation history for audio responses
-        if hasattr(session, 'conversation_history'):
-            for entry in session.conversation_history[-6:]:  # Last 6 entries
-                if "Nisha:" in entry and "<audio:" in entry:
-                    # Extract filenames from "<audio: file1.mp3 + file2.mp3>"
-                    import re
-                    files = re.findall(r'<audio: ([^>]+)>', entry)
-                    if files:
-                        audio_chain = files[0]
-                        file_list = [f.strip() for f in audio_chain.split('+')]
-                        recent_files.extend(file_list)
-        
-        # Return last N unique files
-        seen = set()
-        unique_recent = []
-        for f in reversed(recent_files):
-            if f not in seen and len(unique_recent) < limit:
-                unique_recent.append(f)
-                seen.add(f)
-        
-        return unique_recent[:limit]
-    
-    def _get_recent_conversation(self, session, limit=2):
-        """Get recent conversation context"""
-        if not hasattr(session, 'conversation_history'):
-            return "None"
-        
-        recent = session.conversation_history[-(limit*2):]  # Last N exchanges
-        return " | ".join(recent) if recent else "None"
-    
     def _build_context_prompt(self, session, user_input):
-        """Build context prompt with dynamic session variables"""
+        """Compact per-turn context (the static rules live in the base prompt)"""
         
         # Extract and update session variables from user input
-        self._extract_session_variables(user_input, session)
-        
-        # Get recent conversation history
-        recent_files = self._get_recent_files(session, limit=3)
-        recent_conversation = self._get_recent_conversation(session, limit=2)
-        
-        # Get current session context
-        session_context = session.get_session_context()
+        slot_extractor.update_session(session, user_input)
         
-        context_prompt = f"""
-🧠 CONVERSATION MEMORY:
-Recently played files (DON'T repeat): {', '.join(recent_files)}
-Recent conversation: {recent_conversation}
-
-📋 CURRENT SESSION VARIABLES:
-{session_context}
-
-📝 CURRENT USER INPUT: "{user_input}"
-
-🎯 INTELLIGENT SELECTION RULES:
-- If admission_type is known, use specific admission_process_firsttime.mp3 or admission_process_transfer.mp3
-- If admission_class is known and user asks about fees, use fees_ask_class.mp3 then mention specific fees for that class
-- If student_location is provided and user asks about transport, use bus_fees.mp3 with location context
-- If student_age is known, use admission_age_eligibility.mp3 for age-related queries
-
-Apply the rules from your system prompt. Choose appropriate files or GENERATE response."""
-        
-        return context_prompt
+        return context_window.build(session, user_input, system_tokens=self.base_prompt_tokens)
+    
+    def _generation_config(self):
+        """Sampling options shared by the streamed and non-streamed calls"""
+        options = {"temperature": 0.1, "max_output_tokens": Config.ROUTER_MAX_TOKENS, "top_p": 0.8, "top_k": 20}
+        if Config.ROUTER_STRUCTURED_OUTPUT:
+            options["max_output_tokens"] = Config.ROUTER_STRUCTURED_MAX_TOKENS
+        if Config.ROUTER_STRUCTURED_OUTPUT and self.schema_supported:
+            try:
+                # JSON constrained to the library's clip IDs
+                return genai.types.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=clip_schema.gemini_schema(),
+                    **options
+                )
+            except TypeError:
+                # Older google-generativeai: JSON is still requested through the prompt
+                self.schema_supported = False
+                print("⚠️ google-generativeai has no response_schema support, JSON output is prompt-only")
+        return genai.types.GenerationConfig(**options)
     
-    def _extract_session_variables(self, user_input, session):
-        """Extract and update session variables from user input"""
-        user_lower = user_input.lower()
-        
-        # Extract admission type
-        if any(word in user_lower for word in ["first time", "firsttime", "pehli bar", "naya admission"]):
-            session.update_session_variable("admission_type", "firsttime")
-        elif any(word in user_lower for word in ["transfer", "dusre school se", "change school"]):
-            session.update_session_variable("admission_type", "transfer")
-        
-        # Extract class information
-        class_mappings = {
-            "kg1": "KG1", "kg 1": "KG1", "nursery": "KG1", "pre kg": "KG1",
-            "kg2": "KG2", "kg 2": "KG2", "ukg": "KG2",
-            "1st class": "Class 1", "class 1": "Class 1", "first class": "Class 1", "पहली क्लास": "Class 1",
-            "2nd class": "Class 2", "class 2": "Class 2", "second class": "Class 2", "दूसरी क्लास": "Class 2",
-            "3rd class": "Class 3", "class 3": "Class 3", "third class": "Class 3", "तीसरी क्लास": "Class 3",
-            "4th class": "Class 4", "class 4": "Class 4", "fourth class": "Class 4", "चौथी क्लास": "Class 4",
-            "5th class": "Class 5", "class 5": "Class 5", "fifth class": "Class 5", "पांचवी क्लास": "Class 5"
-        }
-        
-        for class_key, class_value in class_mappings.items():
-            if class_key in user_lower:
-                session.update_session_variable("admission_class", class_value)
-                break
-        
-        # Extract location information
-        location_keywords = ["location", "area", "locality", "address", "where", "कहाँ", "जगह"]
-        if any(keyword in user_lower for keyword in location_keywords):
-            # Simple extraction - could be enhanced with NLP
-            words = user_input.split()
-            for i, word in enumerate(words):
-                if word.lower() in location_keywords and i + 1 < len(words):
-                    location = words[i + 1]
-                    session.update_session_variable("student_location", location)
-                    break
-        
-        # Extract age information
-        import re
-        age_pattern = r'(\d+)\s*(?:years?|saal|उम्र)'
-        age_match = re.search(age_pattern, user_lower)
-        if age_match:
-            age = age_match.group(1)
-            session.update_session_variable("student_age", age)
-        
-        # Extract inquiry focus
-        focus_keywords = {
-            "fees": ["fees", "fee", "charges", "cost", "price", "फीस"],
-            "admission": ["admission", "admit", "enroll", "admission", "प्रवेश"],
-            "transport": ["transport", "bus", "vehicle", "pickup", "drop", "परिवहन"],
-            "activities": ["activities", "sports", "games", "extra", "activities", "गतिविधियां"],
-            "timings": ["timing", "time", "schedule", "hours", "समय"],
-            "security": ["security", "safety", "protection", "सुरक्षा"]
-        }
-        
-        for focus, keywords in focus_keywords.items():
-            if any(keyword in user_lower for keyword in keywords):
-                session.update_session_variable("inquiry_focus", focus)
-                break
-
     def get_school_response(self, user_input, session):
         """Get appropriate response for school conversation - GEMINI FLASH MODE"""
         
+        self._last_call.ok = False
+        self._last_call.latency_ms = 0
+        self._last_call.tokens = 0
+        
         try:
             import time
             start = time.time()
@@ -230,24 +163,34 @@ Apply the rules from your system prompt. Choose appropriate files or GENERATE re
             # Build the full prompt for Gemini
             full_prompt = f"{self.base_prompt}\n\n{self._build_context_prompt(session, user_input)}"
             
-            # Configure generation parameters
-            generation_config = genai.types.GenerationConfig(
-                temperature=0.1,  # Very low for consistency
-                max_output_tokens=100,  # Limit response length
-                top_p=0.8,
-                top_k=20
-            )
-            
-            # Call Google Gemini Flash
+            # Call Google Gemini Flash (temperature 0.1, capped output tokens)
             response = self.model.generate_content(
                 full_prompt,
-                generation_config=generation_config
+                generation_config=self._generation_config()
             )
             
             gemini_response = response.text.strip()
-            gemini_response = gemini_response.replace('"', '').replace("'", "")
             
             response_time = int((time.time() - start) * 1000)
+            structured = clip_schema.parse(gemini_response) if Config.ROUTER_STRUCTURED_OUTPUT else None
+            if Config.ROUTER_STRUCTURED_OUTPUT and structured is None and gemini_response.startswith('{'):
+                # Truncated or malformed JSON is a failed call, not a clip chain to guess from
+                raise ValueError(f"unparseable structured reply: {gemini_response[:80]}")
+            
+            usage = getattr(response, "usage_metadata", None)
+            self._last_call.ok = True
+            self._last_call.latency_ms = response_time
+            self._last_call.tokens = getattr(usage, "total_token_count", 0) if usage else 0
+            
+            if structured:
+                response_type, content = structured
+                print(f"💎 Gemini → {'TTS' if response_type == 'TTS' else 'Audio'}: {content} ({response_time}ms)")
+                if response_type == "TTS":
+                    return response_type, content
+                # Prompt-only JSON (old SDK) is not enum-constrained
+                return filter_repeats("AUDIO", clip_resolver.resolve_chain(content), session)
+            
+            gemini_response = gemini_response.replace('"', '').replace("'", "")
             
             # Check if it's a custom generation request
             if gemini_response.startswith("GENERATE:"):
@@ -256,13 +199,66 @@ Apply the rules from your system prompt. Choose appropriate files or GENERATE re
                 return "TTS", text_to_generate
             else:
                 print(f"💎 Gemini → Audio: {gemini_response} ({response_time}ms)")
-                return "AUDIO", gemini_response
+                return filter_repeats("AUDIO", clip_resolver.resolve_chain(gemini_response), session)
                 
         except Exception as e:
             # Fallback to safe response
             print(f"❌ Gemini error: {e}")
             return "TTS", "I want to make sure I give you the right information. Could you tell me what specific aspect you'd like to know more about?"
     
+    def stream_school_response(self, user_input, session, on_clip, on_text):
+        """
+        Streamed get_school_response: clips / TTS sentences go to on_clip/on_text
+        as soon as they are resolved. Returns what was streamed; if nothing was,
+        the returned response still has to be played by the caller.
+        """
+        
+        self._last_call.ok = False
+        self._last_call.latency_ms = 0
+        self._last_call.tokens = 0
+        streamed = StreamedTurn(session, on_clip, on_text)
+        
+        try:
+            import time
+            start = time.time()
+            
+            full_prompt = f"{self.base_prompt}\n\n{self._build_context_prompt(session, user_input)}"
+            response = self.model.generate_content(
+                full_prompt,
+                generation_config=self._generation_config(),
+                stream=True
+            )
+            for chunk in response:
+                if chunk.parts:
+                    streamed.feed(chunk.text)
+            streamed.finish()
+            failure = streamed.failure()
+            if failure:
+                raise ValueError(failure)
+            
+            response_time = int((time.time() - start) * 1000)
+            usage = getattr(response, "usage_metadata", None)
+            self._last_call.ok = True
+            self._last_call.latency_ms = response_time
+            self._last_call.tokens = getattr(usage, "total_token_count", 0) if usage else 0
+            
+        except Exception as e:
+            print(f"❌ Gemini stream error: {e}")
+            if not streamed.streamed:
+                return "TTS", "I want to make sure I give you the right information. Could you tell me what specific aspect you'd like to know more about?"
+            response_time = int((time.time() - start) * 1000)
+        
+        response_type, content = streamed.result()
+        print(f"💎 Gemini ⇢ {'TTS' if response_type == 'TTS' else 'Audio'}: {content} "
+              f"(first {streamed.first_event_ms}ms, done {response_time}ms)")
+        return response_type, content
+    
+    def last_call_info(self):
+        """Outcome of this thread's latest LLM call: (succeeded, latency_ms, total_tokens)"""
+        return (getattr(self._last_call, "ok", False),
+                getattr(self._last_call, "latency_ms", 0),
+                getattr(self._last_call, "tokens", 0))
+    
     def validate_response(self, response_content):
         """Validate that the response contains valid audio files"""
         if not response_content or response_content.startswith("GENERATE:"):
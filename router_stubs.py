@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+KLARIQO ROUTER STUBS MODULE
+Local stand-ins for the LLM routers with injectable latency and failures, for
+exercising the hedged router and benchmarks without network calls
+"""
+
+import time
+import random
+import threading
+
+
+class StubRouter:
+    """
+    Answers every turn with a fixed response after a simulated delay
+
+    latency_ms is a number or a callable returning one per call (e.g. a sampler
+    with a slow tail). error_rate / invalid_rate make that share of calls fail
+    (safe TTS reply, last_call_info not ok) or name a clip outside the library.
+    """
+
+    def __init__(self, name, latency_ms=300, response=("AUDIO", "ji_bilkul.mp3"),
+                 error_rate=0.0, invalid_rate=0.0, seed=None):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.response = response
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._last_call = threading.local()
+        self.calls = 0
+
+    def _draw(self):
+        with self._random_lock:
+            self.calls += 1
+            latency = self.latency_ms(self.random) if callable(self.latency_ms) else self.latency_ms
+            return latency, self.random.random()
+
+    def get_school_response(self, user_input, session):
+        latency, roll = self._draw()
+        time.sleep(latency / 1000)
+
+        self._last_call.latency_ms = int(latency)
+        self._last_call.tokens = 0
+        if roll < self.error_rate:
+            self._last_call.ok = False
+            return "TTS", "I want to make sure I give you the right information."
+        self._last_call.ok = True
+        if roll < self.error_rate + self.invalid_rate:
+            return "AUDIO", f"{self.name}_made_up_clip.mp3"
+        return self.response
+
+    def last_call_info(self):
+        return (getattr(self._last_call, "ok", False),
+                getattr(self._last_call, "latency_ms", 0),
+                getattr(self._last_call, "tokens", 0))
+
+
+def tail_latency(median_ms, tail_ms, tail_rate):
+    """Latency sampler: lognormal-ish around median_ms, with tail_rate of calls taking ~tail_ms"""
+    def sample(rng):
+        if rng.random() < tail_rate:
+            return tail_ms * rng.uniform(0.8, 1.2)
+        return median_ms * rng.lognormvariate(0, 0.25)
+    return sample
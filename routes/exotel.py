@@ -11,10 +11,13 @@ import base64
 import audioop
 from flask import Blueprint, request, Response
 from session import session_manager
-from router import response_router  # Using your main router
+from speculation import speculative_router  # Main router with speculative routing
+from routing_pipeline import routing_pipeline
 from audio_manager import audio_manager
 from logger import call_logger
 from tts_engine import tts_engine
+from http_pool import http_pool
+from latency_filler import latency_fillers
 
 exotel_bp = Blueprint('exotel', __name__)
 
@@ -35,6 +38,7 @@ def handle_exotel_incoming():
     # Create session for this call
     session = session_manager.create_session(call_sid, "inbound")
     session.session_memory["intro_played"] = True
+    session_manager.save_session(session)
     
     # Log call start
     call_logger.log_call_start(call_sid, from_number, "inbound")
@@ -83,7 +87,7 @@ def continue_exotel_call(call_sid):
     print(f"   DisconnectedBy: {disconnected_by}")
     
     # Check if we have a prepared response
-    if hasattr(session, 'ready_for_twiml') and session.ready_for_twiml:
+    if session.ready_for_twiml:
         
         response_type = session.next_response_type
         content = session.next_response_content
@@ -102,7 +106,7 @@ def continue_exotel_call(call_sid):
                 play_elements.append(f"<Play>{audio_url}</Play>")
             
             # Log the response
-            call_logger.log_nisha_audio_response(call_sid, content)
+            call_logger.log_nisha_audio_response(call_sid, content, prompt_tokens=session.prompt_tokens)
             
             # FIXED: Use correct Exotel XML format
             exotel_response = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -117,7 +121,7 @@ def continue_exotel_call(call_sid):
             
             if tts_url:
                 # Log the TTS response
-                call_logger.log_nisha_tts_response(call_sid, content)
+                call_logger.log_nisha_tts_response(call_sid, content, prompt_tokens=session.prompt_tokens)
                 
                 exotel_response = f"""<?xml version="1.0" encoding="UTF-8"?>
 <Response>
@@ -133,6 +137,7 @@ def continue_exotel_call(call_sid):
         
         # Reset session state
         session.reset_for_next_input()
+        session_manager.save_session(session)
         
         return exotel_response, 200, {'Content-Type': 'application/xml'}
     
@@ -179,7 +184,7 @@ def handle_exotel_websocket(ws, call_sid):
         print(f"❌ No session found for Exotel call {call_sid}")
         return
     
-    session.twilio_ws = ws  # Reuse same WebSocket reference
+    session.attach_stream(ws)  # Reuse same WebSocket reference
     
     def start_deepgram():
         """Initialize Deepgram connection for Exotel session"""
@@ -217,18 +222,11 @@ def handle_exotel_websocket(ws, call_sid):
     deepgram_thread.start()
     time.sleep(0.5)  # Give Deepgram time to connect
     
-    def transcript_checker():
-        """Monitor for completed transcripts"""
-        while True:
-            time.sleep(0.05)  # Check every 50ms
-            if session.check_for_completion():
-                process_exotel_user_input(session.completed_transcript, call_sid)
-                break
+    def handle_turn(transcript):
+        """Prepare the response; Exotel fetches it via /exotel/continue when Voicebot ends"""
+        return not process_exotel_user_input(transcript, call_sid)
     
-    # Start transcript checker
-    checker_thread = threading.Thread(target=transcript_checker)
-    checker_thread.daemon = True
-    checker_thread.start()
+    session.start_turn_worker(handle_turn, speculative_router)
     
     try:
         # Handle WebSocket messages from Exotel
@@ -239,6 +237,7 @@ def handle_exotel_websocket(ws, call_sid):
                 
             data = json.loads(message)
             event_type = data.get('event')
+            session.touch()
             
             # FIXED: Handle Exotel-specific event types
             if event_type == 'connected':
@@ -274,17 +273,19 @@ def handle_exotel_websocket(ws, call_sid):
         
     finally:
         # Cleanup session
+        session.stop_turn_worker()
+        session.twilio_ws = None
         if session.dg_connection:
             session.dg_connection.finish()
             session.dg_connection = None
         print(f"🧹 Cleaned up Exotel session: {call_sid}")
 
 def process_exotel_user_input(transcript, call_sid):
-    """Process user input for Exotel calls"""
+    """Process user input for Exotel calls (returns True once a response is prepared)"""
     try:
         session = session_manager.get_session(call_sid)
         if not session:
-            return
+            return False
         
         start_time = time.time()
         
@@ -292,7 +293,7 @@ def process_exotel_user_input(transcript, call_sid):
         call_logger.log_parent_input(call_sid, transcript)
         
         # Get AI response using your existing router
-        response_type, content = response_router.get_school_response(transcript, session)
+        response_type, content = speculative_router.resolve(transcript, session)
         
         # Calculate response time
         response_time_ms = int((time.time() - start_time) * 1000)
@@ -302,19 +303,17 @@ def process_exotel_user_input(transcript, call_sid):
             temp_filename = tts_engine.generate_audio(content, save_temp=True)
             if not temp_filename:
                 print(f"❌ TTS generation failed for: {content}")
-                return
+                return False
             else:
                 print(f"✅ TTS generated: {temp_filename}")
         
         # Prepare session for response
-        session.next_response_type = response_type
-        session.next_response_content = content
-        session.next_transcript = transcript
-        session.ready_for_twiml = True
+        session.prepare_response(response_type, content, transcript)
         
         # Add to conversation history
-        session.add_to_history("Parent", transcript)
-        session.add_to_history("Nisha", f"<{response_type}: {content}>")
+        session.record_parent_turn(transcript)
+        session.record_response(response_type, content)
+        session_manager.save_session(session)
         
         # Clean logging
         print(f"📞 User: {transcript}")
@@ -324,9 +323,11 @@ def process_exotel_user_input(transcript, call_sid):
             print(f"📞 TTS Response: {content} ({response_time_ms}ms)")
         
         # The session is now ready - Exotel will call /exotel/continue when Voicebot ends
+        return True
         
     except Exception as e:
         print(f"❌ Exotel processing error for {call_sid}: {e}")
+        return False
 
 @exotel_bp.route("/exotel/debug", methods=['GET'])
 def exotel_debug():
@@ -335,6 +336,11 @@ def exotel_debug():
     return {
         "status": "Exotel WebStreaming Ready",
         "active_sessions": session_manager.get_active_count(),
+        "session_stats": session_manager.get_stats(),
+        "turn_latencies": session_manager.get_turn_latencies(),
+        "routing_stats": routing_pipeline.get_stats(),
+        "http_pool": http_pool.get_stats(),
+        "latency_fillers": latency_fillers.get_stats(),
         "cached_audio_files": len(audio_manager.cached_files),
         "endpoints": {
             "incoming": "/exotel/voice",
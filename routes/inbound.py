@@ -45,6 +45,7 @@ def handle_incoming_call():
     
     # Mark intro as played in session memory
     session.session_memory["intro_played"] = True
+    session_manager.save_session(session)
     
     # Play intro audio
     intro_url = f"{request.url_root}audio_pcm/{selected_intro}"
@@ -67,7 +68,7 @@ def continue_inbound_conversation(call_sid):
     
     try:
         session = session_manager.get_session(call_sid)
-        if not session or not hasattr(session, 'ready_for_twiml'):
+        if not session or not session.ready_for_twiml:
             print(f"❌ No session or not ready: {call_sid}")
             response = VoiceResponse()
             response.say("Processing error")
@@ -80,8 +81,8 @@ def continue_inbound_conversation(call_sid):
         transcript = session.next_transcript
         
         # Add to conversation history
-        session.add_to_history("Parent", transcript)
-        session.add_to_history("Nisha", content)
+        session.record_parent_turn(transcript)
+        session.record_response(response_type, content)
         
         # Build TwiML response
         twiml_response = VoiceResponse()
@@ -97,7 +98,7 @@ def continue_inbound_conversation(call_sid):
                     twiml_response.play(audio_url)
                 
                 # Log audio response
-                call_logger.log_nisha_audio_response(call_sid, content)
+                call_logger.log_nisha_audio_response(call_sid, content, prompt_tokens=session.prompt_tokens)
             else:
                 # Fallback if files don't exist
                 twiml_response.say("I'm having trouble with my audio files.")
@@ -110,7 +111,7 @@ def continue_inbound_conversation(call_sid):
             tts_url = tts_engine.generate_audio_url(content, request.url_root)
             if tts_url:
                 twiml_response.play(tts_url)
-                call_logger.log_nisha_tts_response(call_sid, content)
+                call_logger.log_nisha_tts_response(call_sid, content, prompt_tokens=session.prompt_tokens)
             else:
                 twiml_response.say("Sorry, I'm having trouble generating audio.")
                 call_logger.log_nisha_tts_response(call_sid, "TTS generation failed")
@@ -126,6 +127,7 @@ def continue_inbound_conversation(call_sid):
         else:
             # Reset session for next input
             session.reset_for_next_input()
+            session_manager.save_session(session)
             
             # Continue streaming
             connect = Connect()
@@ -14,17 +14,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from flask import Blueprint, request
 from twilio.twiml.voice_response import VoiceResponse, Connect, Stream
-from twilio.rest import Client
 
 from config import Config
 from session import session_manager
 from logger import call_logger
+from http_pool import http_pool
 
 # Create blueprint for outbound routes
 outbound_bp = Blueprint('outbound', __name__)
 
-# Initialize Twilio client
-twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+# Twilio client (shared, pooled connections)
+twilio_client = http_pool.twilio_client()
 
 @outbound_bp.route("/twilio/outbound/<parent_id>", methods=['GET', 'POST'])
 def handle_outbound_call(parent_id):
@@ -66,6 +66,7 @@ def handle_outbound_call(parent_id):
     # Use outbound intro for school calling parents
     selected_intro = "nisha_introduction_outbound.mp3"
     session.session_memory["intro_played"] = True
+    session_manager.save_session(session)
     
     # Play intro audio
     intro_url = f"{request.url_root}audio_pcm/{selected_intro}"
@@ -90,7 +91,7 @@ def continue_outbound_conversation(call_sid):
     
     try:
         session = session_manager.get_session(call_sid)
-        if not session or not hasattr(session, 'ready_for_twiml'):
+        if not session or not session.ready_for_twiml:
             print(f"❌ No session or not ready: {call_sid}")
             response = VoiceResponse()
             response.say("Processing error")
@@ -103,8 +104,8 @@ def continue_outbound_conversation(call_sid):
         transcript = session.next_transcript
         
         # Add to conversation history
-        session.add_to_history("Parent", transcript)
-        session.add_to_history("Nisha", content)
+        session.record_parent_turn(transcript)
+        session.record_response(response_type, content)
         
         # Build TwiML response
         twiml_response = VoiceResponse()
@@ -122,7 +123,7 @@ def continue_outbound_conversation(call_sid):
                     twiml_response.play(audio_url)
                 
                 # Log audio response
-                call_logger.log_nisha_audio_response(call_sid, content)
+                call_logger.log_nisha_audio_response(call_sid, content, prompt_tokens=session.prompt_tokens)
             else:
                 # Fallback if files don't exist
                 twiml_response.say("I'm having trouble with my audio files.")
@@ -135,7 +136,7 @@ def continue_outbound_conversation(call_sid):
             tts_url = tts_engine.generate_audio_url(content, request.url_root)
             if tts_url:
                 twiml_response.play(tts_url)
-                call_logger.log_nisha_tts_response(call_sid, content)
+                call_logger.log_nisha_tts_response(call_sid, content, prompt_tokens=session.prompt_tokens)
             else:
                 twiml_response.say("Sorry, I'm having trouble generating audio.")
                 call_logger.log_nisha_tts_response(call_sid, "TTS generation failed")
@@ -151,6 +152,7 @@ def continue_outbound_conversation(call_sid):
         else:
             # Reset session for next input
             session.reset_for_next_input()
+            session_manager.save_session(session)
             
             # Continue streaming
             connect = Connect()
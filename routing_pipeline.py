@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+KLARIQO ROUTING PIPELINE MODULE
+Tiered response selection: cheap deterministic tiers (quick responses,
+keyword intents, exact and semantic cached decisions, the trained classifier)
+answer first and only unmatched turns reach the LLM router
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import Config
+from audio_manager import audio_manager
+from clip_index import filter_repeats
+from slot_extractor import slot_extractor
+from smart_router import smart_router
+from router import response_router
+from decision_cache import decision_cache
+from semantic_cache import semantic_cache
+from intent_classifier import intent_classifier
+from circuit_breaker import circuit_breakers
+from clip_resolver import clip_resolver
+from context_window import context_window
+from turn_deadline import turn_deadlines
+
+
+class TierStats:
+    """Hit counts and a bounded latency sample for one tier"""
+
+    __slots__ = ("calls", "hits", "repeats", "invalid", "errors", "latencies_ms")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.repeats = 0
+        self.invalid = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=Config.ROUTING_LATENCY_SAMPLES)
+
+    def summary(self):
+        samples = sorted(self.latencies_ms)
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 3) if samples else 0.0
+
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "repeats": self.repeats,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / self.calls, 3) if self.calls else 0.0,
+            "avg_ms": round(sum(samples) / len(samples), 3) if samples else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+
+class StreamGate:
+    """Forwards streamed clips/sentences until the turn gives up on the LLM call"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.emitted = False
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def callbacks(self):
+        if not self.stream:
+            return None
+        on_clip, on_text = self.stream
+        return (lambda clip: self._forward(on_clip, clip), lambda text: self._forward(on_text, text))
+
+    def _forward(self, callback, value):
+        with self._lock:
+            if self.closed:
+                return
+            self.emitted = True
+        callback(value)
+
+    def close(self):
+        """Stop forwarding; False if the caller is already hearing this call's output"""
+        with self._lock:
+            if self.emitted:
+                return False
+            self.closed = True
+            return True
+
+
+class RoutingPipeline:
+    """
+    Runs routing tiers in Config.ROUTING_TIER_ORDER until one answers
+
+    A tier is route(transcript, session, turn) → (response_type, content), or
+    (None, None) to pass. `turn` is a scratch dict shared by the tiers of one
+    routing call (e.g. the keyword scan, so the transcript is scanned once).
+    """
+
+    def __init__(self, tier_order=None):
+        self.tiers = {}
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+        self.register_tier("quick", self._quick_tier)
+        self.register_tier("intent", self._intent_tier)
+        self.register_tier("smart", self._smart_tier)
+        self.register_tier("cache", self._cache_tier)
+        self.register_tier("semantic", self._semantic_tier)
+        self.register_tier("classifier", self._classifier_tier)
+        self.register_tier("llm", self._llm_tier)
+
+        self.llm_router = self._load_llm_router(Config.LLM_ROUTER)
+        self.breaker = circuit_breakers.get(Config.LLM_ROUTER)
+        self.degraded = {"open": 0, "shed": 0}
+        # LLM calls run here when a turn deadline bounds the wait (more than the breaker's cap are shed anyway)
+        self.llm_executor = ThreadPoolExecutor(max_workers=Config.BREAKER_MAX_IN_FLIGHT, thread_name_prefix="llm")
+        self.set_tier_order(tier_order or Config.ROUTING_TIER_ORDER)
+
+    def _load_llm_router(self, name):
+        """LLM backend for the llm tier ("openai", "gemini" or "hedged")"""
+        if name == "gemini":
+            from router_gemini import response_router_gemini
+            return response_router_gemini
+        if name == "hedged":
+            from hedged_router import hedged_router
+            return hedged_router
+        if name != "openai":
+            print(f"⚠️ Unknown LLM router '{name}', using OpenAI")
+        return response_router
+
+    def register_tier(self, name, route):
+        """Add (or replace) a named tier; it only runs once listed in the tier order"""
+        self.tiers[name] = route
+        with self._stats_lock:
+            self.stats.setdefault(name, TierStats())
+
+    def set_tier_order(self, tier_order):
+        """Choose which tiers run and in what order (unknown names are skipped)"""
+        order = []
+        for name in tier_order:
+            name = name.strip()
+            if name in self.tiers:
+                order.append(name)
+            elif name:
+                print(f"⚠️ Unknown routing tier '{name}' ignored")
+        self.tier_order = order
+        print(f"🪜 Routing tiers: {' → '.join(order) or 'none'}")
+
+    def _matches(self, transcript, turn):
+        if "matches" not in turn:
+            turn["matches"] = smart_router.scan(transcript)
+        return turn["matches"]
+
+    def _quick_tier(self, transcript, session, turn):
+        """Fillers/acknowledgements ("hello?", "ok") from the library's quick_responses"""
+        if len(transcript.split()) > Config.QUICK_RESPONSE_MAX_WORDS:
+            return None, None
+        filename = smart_router.get_quick_response(transcript, self._matches(transcript, turn))
+        return ("AUDIO", filename) if filename else (None, None)
+
+    def _intent_tier(self, transcript, session, turn):
+        """High-priority keyword intents (pricing, demo, ...)"""
+        return smart_router.detect_specific_intent(transcript, self._matches(transcript, turn))
+
+    def _smart_tier(self, transcript, session, turn):
+        """Full linear flow + negative logic (always answers, no LLM)"""
+        return smart_router.get_school_response(transcript, session)
+
+    def _cache_key(self, transcript, session, turn):
+        if "cache_key" not in turn:
+            # Slots are part of the key, so fill them from this transcript first
+            slot_extractor.update_session(session, transcript)
+            turn["cache_key"] = decision_cache.make_key(transcript, session)
+        return turn["cache_key"]
+
+    def _cache_tier(self, transcript, session, turn):
+        """Earlier LLM decision for the same transcript and session state"""
+        cached = decision_cache.get(self._cache_key(transcript, session, turn))
+        return cached if cached else (None, None)
+
+    def _vector(self, transcript, turn):
+        if "vector" not in turn:
+            turn["vector"] = semantic_cache.vectorizer.transform(transcript)
+        return turn["vector"]
+
+    def _semantic_tier(self, transcript, session, turn):
+        """LLM decision for a close paraphrase asked in the same session state"""
+        slot_extractor.update_session(session, transcript)
+        cached = semantic_cache.lookup(transcript, session, self._vector(transcript, turn))
+        return cached if cached else (None, None)
+
+    def _classifier_tier(self, transcript, session, turn):
+        """Offline-trained clip-chain classifier, only when confident"""
+        chain = intent_classifier.classify(transcript)
+        return ("AUDIO", chain) if chain else (None, None)
+
+    def _llm_tier(self, transcript, session, turn):
+        """LLM clip selection (always answers); successful decisions feed the caches"""
+        cache_key = self._cache_key(transcript, session, turn) if "cache" in self.tier_order else None
+
+        # Not enough of the turn deadline left to wait for the LLM and still render the reply
+        deadline = turn.get("deadline")
+        late = deadline is not None and deadline.expired(Config.DEADLINE_RESPONSE_RESERVE_MS)
+        if late:
+            cached = self._deadline_cached(transcript, session, turn)
+            if cached:
+                deadline.miss("routing", "cached")
+                return cached
+
+        # Tripped or saturated backend: answer locally instead of queueing behind it
+        allowed, reason, probe = self.breaker.acquire()
+        if not allowed:
+            return self._degraded_response(transcript, session, reason)
+
+        if deadline is None:
+            return self._call_llm(transcript, session, turn, cache_key, turn.get("stream"), probe)
+
+        # The call keeps running if abandoned - it still releases the breaker and feeds the caches
+        gate = StreamGate(turn.get("stream"))
+        future = self.llm_executor.submit(self._call_llm, transcript, session, turn, cache_key, gate.callbacks(), probe)
+        if late:
+            return self._late_llm_response(transcript, session, turn, "routing", future, gate)
+        try:
+            return future.result(timeout=deadline.timeout(reserve_ms=Config.DEADLINE_RESPONSE_RESERVE_MS))
+        except TimeoutError:
+            pass
+
+        cached = self._deadline_cached(transcript, session, turn)
+        if cached and gate.close():
+            deadline.miss("llm", "cached")
+            return cached
+        return self._late_llm_response(transcript, session, turn, "llm", future, gate)
+
+    def _call_llm(self, transcript, session, turn, cache_key, stream, probe=None):
+        """One breaker-admitted LLM router call"""
+        start = time.perf_counter()
+        succeeded = False
+        try:
+            if stream and hasattr(self.llm_router, "stream_school_response"):
+                response_type, content = self.llm_router.stream_school_response(transcript, session, *stream)
+            else:
+                response_type, content = self.llm_router.get_school_response(transcript, session)
+            succeeded, latency_ms, tokens = self.llm_router.last_call_info()
+        finally:
+            self.breaker.release(succeeded, (time.perf_counter() - start) * 1000, probe)
+
+        if succeeded:
+            if cache_key is not None:
+                decision_cache.put(cache_key, response_type, content, latency_ms, tokens)
+            if "semantic" in self.tier_order:
+                semantic_cache.store(transcript, session, response_type, content, latency_ms, tokens,
+                                     vector=self._vector(transcript, turn))
+        return response_type, content
+
+    def _degraded_response(self, transcript, session, reason):
+        """Local answer while the LLM is unavailable: the classifier's best guess, else the Hindi ask-again reply"""
+        with self._stats_lock:
+            self.degraded[reason] += 1
+
+        label, confidence = intent_classifier.predict(transcript)
+        if label and confidence >= Config.BREAKER_CLASSIFIER_THRESHOLD and self._in_library(label):
+            response_type, content = filter_repeats("AUDIO", label, session)
+            if response_type == "AUDIO":
+                slot_extractor.update_session(session, transcript)
+                print(f"🧯 LLM {reason} → classifier: {content} ({confidence:.2f})")
+                return response_type, content
+
+        # Not the smart router flow - its replies are English sales pitches written for another clip library
+        response_type, content = "TTS", Config.BREAKER_FALLBACK_TEXT
+        slot_extractor.update_session(session, transcript)
+        print(f"🧯 LLM {reason} → fallback: {content}")
+        return response_type, content
+
+    def _deadline_cached(self, transcript, session, turn):
+        """Looser semantic-cache match for a turn out of time, or None"""
+        if "semantic" not in self.tier_order:
+            return None
+        cached = semantic_cache.lookup(transcript, session, self._vector(transcript, turn),
+                                       threshold=Config.DEADLINE_SEMANTIC_THRESHOLD)
+        if not cached or (cached[0] == "AUDIO" and not self._in_library(cached[1])):
+            return None
+        slot_extractor.update_session(session, transcript)
+        return filter_repeats(*cached, session)
+
+    def _late_llm_response(self, transcript, session, turn, stage, future, gate):
+        """
+        The turn deadline ran out at `stage` with no cached answer
+
+        The playout holds the line ("जी, एक सेकंड…") while the LLM call gets up
+        to DEADLINE_LLM_CAP more seconds; past that the caller is asked to say
+        it again. The hold reply is never the turn's answer.
+        """
+        deadline = turn["deadline"]
+        deadline.miss(stage, "waiting")
+        try:
+            return future.result(timeout=Config.DEADLINE_LLM_CAP)
+        except TimeoutError:
+            if not gate.close():
+                return future.result()  # Already streaming to the caller - let it finish
+        slot_extractor.update_session(session, transcript)
+        deadline.miss("llm_cap", "fallback")
+        return "TTS", Config.BREAKER_FALLBACK_TEXT
+
+    def _in_library(self, content):
+        return all(clip.strip() in audio_manager.clip_ids for clip in content.split('+'))
+
+    def _record(self, name, hit, elapsed_ms, repeat=False, invalid=False, error=False):
+        with self._stats_lock:
+            stats = self.stats[name]
+            stats.calls += 1
+            stats.hits += hit
+            stats.repeats += repeat
+            stats.invalid += invalid
+            stats.errors += error
+            stats.latencies_ms.append(elapsed_ms)
+
+    def get_school_response(self, transcript, session, on_clip=None, on_text=None, deadline=None):
+        """
+        Route one endpointed transcript through the tiers
+
+        With on_clip/on_text callbacks the LLM tier streams: clips and TTS
+        sentences reach the callbacks while the completion is still arriving
+        (deterministic tiers answer in full and never call them). With a
+        TurnDeadline the LLM wait is bounded and a local answer is used on a miss.
+        """
+        turn = {"deadline": deadline}
+        session.prompt_tokens = 0  # set by the LLM router's context window if the llm tier runs
+        if on_clip and on_text and Config.LLM_STREAMING:
+            turn["stream"] = (on_clip, on_text)
+
+        for name in self.tier_order:
+            start = time.perf_counter()
+            try:
+                response_type, content = self.tiers[name](transcript, session, turn)
+            except Exception as e:
+                self._record(name, False, (time.perf_counter() - start) * 1000, error=True)
+                print(f"❌ Routing tier '{name}' failed: {e}")
+                continue
+
+            if not response_type:
+                self._record(name, False, (time.perf_counter() - start) * 1000)
+                continue
+
+            if name != "llm":
+                # The LLM router filters repeats and extracts slots itself
+                if response_type == "AUDIO" and not self._in_library(content):
+                    # e.g. SmartRouter patterns written for a different clip library
+                    self._record(name, False, (time.perf_counter() - start) * 1000, invalid=True)
+                    continue
+                filtered = filter_repeats(response_type, content, session)
+                if response_type == "AUDIO" and filtered[0] != "AUDIO":
+                    # Every clip was a repeat - let a later tier pick something fresh
+                    self._record(name, False, (time.perf_counter() - start) * 1000, repeat=True)
+                    continue
+                response_type, content = filtered
+                slot_extractor.update_session(session, transcript)
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._record(name, True, elapsed_ms)
+            if name != "llm":
+                print(f"🪜 Tier '{name}' answered in {elapsed_ms:.2f}ms")
+            return response_type, content
+
+        # No tier answered (e.g. a deployment without the LLM tier and nothing matched) -
+        # not the smart router flow, its replies are English sales pitches for another library
+        print("⚠️ No routing tier answered, asking the caller to repeat")
+        slot_extractor.update_session(session, transcript)
+        return "TTS", Config.BREAKER_FALLBACK_TEXT
+
+    def get_stats(self):
+        """Per-tier hit rates and latencies in tier order"""
+        with self._stats_lock:
+            tiers = {name: self.stats[name].summary() for name in self.tier_order}
+            degraded = dict(self.degraded)
+        return {"tier_order": list(self.tier_order), "tiers": tiers,
+                "decision_cache": decision_cache.get_stats(),
+                "semantic_cache": semantic_cache.get_stats(),
+                "intent_classifier": intent_classifier.get_stats(),
+                "llm_router": self.llm_router.get_stats() if hasattr(self.llm_router, "get_stats") else None,
+                "degraded": degraded,
+                "circuit_breakers": circuit_breakers.get_stats(),
+                "clip_resolver": clip_resolver.get_stats(),
+                "context_window": context_window.get_stats(),
+                "deadlines": turn_deadlines.get_stats()}
+
+# Global routing pipeline (deterministic tiers ahead of the LLM router)
+routing_pipeline = RoutingPipeline()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+KLARIQO SEMANTIC CACHE MODULE
+Answers paraphrases of earlier turns ("fees kya hai" / "kitni fees lagti hai")
+with the cached LLM decision, using cosine similarity over hashed n-gram vectors
+"""
+
+import time
+import zlib
+import threading
+import numpy as np
+from config import Config
+from audio_manager import audio_manager
+from router import get_school_status
+from text_vectors import HashingVectorizer
+
+
+class SemanticCache:
+    """
+    Fixed-capacity float32 matrix of transcript vectors with their decisions
+
+    Lookups only consider rows from the same session-state bucket (filled slots
+    + school open/closed), so "fees?" for Class 2 never answers Class 5. When
+    full, the least recently used row is overwritten.
+    """
+
+    def __init__(self, capacity=None, threshold=None, vectorizer=None):
+        self.capacity = capacity or Config.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold or Config.SEMANTIC_CACHE_THRESHOLD
+        self.vectorizer = vectorizer or HashingVectorizer()
+
+        self.vectors = np.zeros((self.capacity, self.vectorizer.dim), dtype=np.float32)
+        self.buckets = np.full(self.capacity, -1, dtype=np.int64)
+        self.last_used = np.zeros(self.capacity, dtype=np.float64)
+        self.decisions = [None] * self.capacity  # row → (response_type, content, latency_ms, tokens, transcript)
+        self.size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "replaced": 0, "evicted": 0,
+                      "invalidations": 0, "saved_ms": 0, "saved_tokens": 0, "hit_similarity_sum": 0.0}
+
+        audio_manager.register_reload_listener(self.invalidate)
+
+    def bucket(self, session):
+        """Stable integer for the routing-relevant session state"""
+        slots = sorted(
+            (slot, str(value)) for slot, value in session.session_variables.items() if value is not None
+        )
+        return zlib.crc32(repr((slots, get_school_status())).encode('utf-8'))
+
+    def _best_row(self, vector, bucket):
+        """(row, similarity) of the closest entry in the bucket, or (None, 0.0); caller holds the lock"""
+        if not self.size:
+            return None, 0.0
+        similarities = self.vectors[:self.size] @ vector
+        similarities[self.buckets[:self.size] != bucket] = -1.0
+        row = int(np.argmax(similarities))
+        return row, float(similarities[row])
+
+    def lookup(self, transcript, session, vector=None, threshold=None):
+        """Cached (response_type, content) for a close enough earlier transcript, or None"""
+        threshold = self.threshold if threshold is None else threshold
+        if vector is None:
+            vector = self.vectorizer.transform(transcript)
+        bucket = self.bucket(session)
+
+        with self._lock:
+            row, similarity = self._best_row(vector, bucket)
+            if row is None or similarity < threshold:
+                self.stats["misses"] += 1
+                return None
+
+            response_type, content, latency_ms, tokens, cached_transcript = self.decisions[row]
+            self.last_used[row] = time.time()
+            self.stats["hits"] += 1
+            self.stats["saved_ms"] += latency_ms
+            self.stats["saved_tokens"] += tokens
+            self.stats["hit_similarity_sum"] += similarity
+
+        print(f"🧲 Semantic cache hit ({similarity:.2f}): '{transcript}' ≈ '{cached_transcript}'")
+        return response_type, content
+
+    def store(self, transcript, session, response_type, content, latency_ms=0, tokens=0, vector=None):
+        """Remember a valid router decision for this transcript and session state"""
+        if not content or not transcript.strip():
+            return False
+        if response_type == "AUDIO" and not audio_manager.validate_audio_chain(content):
+            return False
+        if vector is None:
+            vector = self.vectorizer.transform(transcript)
+        bucket = self.bucket(session)
+
+        with self._lock:
+            row, similarity = self._best_row(vector, bucket)
+            if row is not None and similarity >= Config.SEMANTIC_CACHE_DUPLICATE:
+                self.stats["replaced"] += 1  # Same question again - refresh instead of a new row
+            elif self.size < self.capacity:
+                row = self.size
+                self.size += 1
+            else:
+                row = int(np.argmin(self.last_used))
+                self.stats["evicted"] += 1
+
+            self.vectors[row] = vector
+            self.buckets[row] = bucket
+            self.last_used[row] = time.time()
+            self.decisions[row] = (response_type, content, latency_ms, tokens, transcript)
+            self.stats["stores"] += 1
+        return True
+
+    def invalidate(self):
+        """Forget every entry (clip names or transcripts may have changed)"""
+        with self._lock:
+            dropped = self.size
+            self.size = 0
+            self.buckets.fill(-1)
+            self.decisions = [None] * self.capacity
+            self.stats["invalidations"] += 1
+        if dropped:
+            print(f"🧹 Semantic cache invalidated: {dropped} entries dropped")
+
+    def get_stats(self):
+        """Hit rate, mean hit similarity and LLM latency/tokens saved"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = self.size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        similarity_sum = stats.pop("hit_similarity_sum")
+        stats["mean_hit_similarity"] = round(similarity_sum / stats["hits"], 3) if stats["hits"] else 0.0
+        stats["threshold"] = self.threshold
+        stats["matrix_mb"] = round(self.vectors.nbytes / (1024 * 1024), 1)
+        return stats
+
+# Global semantic cache in front of the LLM routers
+semantic_cache = SemanticCache()
@@ -5,42 +5,267 @@ Handles call session states for both inbound and outbound calls
 """
 
 import time
+import queue
+import threading
+from collections import deque
 from config import Config
+from logger import call_logger
+from clip_index import PlayedClipIndex
+from dialogue_stage import dialogue_stages
+from session_store import create_session_store
+from slot_extractor import slot_extractor
+
+
+class TurnState:
+    """Per-call turn states and the edges allowed between them"""
+    
+    LISTENING = "LISTENING"    # Accumulating caller speech
+    ENDPOINTED = "ENDPOINTED"  # Silence threshold hit, transcript frozen
+    ROUTING = "ROUTING"        # Router is choosing a response
+    SPEAKING = "SPEAKING"      # Response is playing (or waiting for TwiML fetch)
+    
+    # Forward edges plus cancel edges back to LISTENING
+    TRANSITIONS = {
+        LISTENING: (ENDPOINTED,),
+        ENDPOINTED: (ROUTING, LISTENING),
+        ROUTING: (SPEAKING, LISTENING),
+        SPEAKING: (LISTENING,),
+    }
+
+
+class TurnRecord:
+    """One conversation turn - formatted to text only when a prompt or export needs it"""
+    
+    __slots__ = ("speaker", "kind", "clips", "text", "timestamp", "turn")
+    
+    SPEECH = "speech"  # Parent transcript
+    AUDIO = "AUDIO"    # Pre-recorded clip chain
+    TTS = "TTS"        # Generated speech
+    TEXT = "text"      # Free-form note
+    
+    def __init__(self, speaker, kind, text="", clips=(), timestamp=None, turn=0):
+        self.speaker = speaker
+        self.kind = kind
+        self.text = text
+        self.clips = tuple(clips)
+        self.timestamp = timestamp or time.time()
+        self.turn = turn
+    
+    def body(self):
+        """Message body as it used to be stored in history strings"""
+        if self.kind == self.AUDIO:
+            return f"<AUDIO: {' + '.join(self.clips)}>"
+        if self.kind == self.TTS:
+            return f"<TTS: {self.text}>"
+        return self.text
+    
+    def format(self):
+        """Format as "[HH:MM:SS] Speaker: body" """
+        stamp = time.strftime("%H:%M:%S", time.localtime(self.timestamp))
+        return f"[{stamp}] {self.speaker}: {self.body()}"
+    
+    def __repr__(self):
+        return f"TurnRecord({self.format()!r})"
+
 
 class StreamingSession:
     """Manages individual call session state and memory"""
     
+    __slots__ = (
+        "call_sid", "call_direction", "lead_data", "created_at", "last_seen",
+        "session_memory", "session_variables", "history", "accumulated_text",
+        "last_activity_time", "silence_threshold", "turn_state", "turn_timestamps",
+        "turn_count", "last_turn_latencies", "completed_transcript", "_turn_lock",
+        "events", "_turn_worker", "_turn_worker_stop", "dg_connection", "twilio_ws",
+        "stream_sid", "next_response_type", "next_response_content", "next_transcript",
+        "played_clips", "state_version", "interim_text", "interim_changed_at",
+        "speculation", "speculation_count", "speculation_stats", "slot_scan_text",
+        "prompt_tokens", "prefetch", "dialogue_stage", "fillers_played",
+        "streamed_here", "playout"
+    )
+    
     def __init__(self, call_sid, call_direction="inbound", lead_data=None):
         self.call_sid = call_sid
         self.call_direction = call_direction  # "inbound" or "outbound"
         self.lead_data = lead_data or {}  # School info for outbound calls
         
+        # Liveness tracking for TTL eviction
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+        
         # Session memory - tracks what has been discussed
         self.session_memory = Config.SESSION_FLAGS_TEMPLATE.copy()
         
         # Dynamic session variables - tracks specific information gathered during conversation
         self.session_variables = Config.SESSION_VARIABLES_TEMPLATE.copy()
         
-        # Conversation tracking
-        self.conversation_history = []
+        # Conversation tracking - fixed-capacity ring of TurnRecords
+        self.history = deque(maxlen=Config.HISTORY_CAPACITY)
+        self.played_clips = PlayedClipIndex()
+        self.dialogue_stage = None  # None = the stage machine's initial stage
+        self.fillers_played = []  # latency fillers already heard on this call (never repeated)
         self.accumulated_text = ""
         self.last_activity_time = None
         self.silence_threshold = Config.SILENCE_THRESHOLD
         
-        # Processing state
-        self.is_processing = False
+        # Interim (not yet final) transcript and speculative routing state
+        self.interim_text = ""
+        self.interim_changed_at = 0.0
+        self.speculation = None
+        self.speculation_count = 0
+        self.speculation_stats = {}
+        self.slot_scan_text = ""  # Partial transcript already scanned for slots
+        
+        # Turn state machine - every transition is timestamped for per-stage latency
+        self.turn_state = TurnState.LISTENING
+        self.turn_timestamps = {TurnState.LISTENING: time.time()}
+        self.turn_count = 0
+        self.last_turn_latencies = {}
         self.completed_transcript = None
-        self.transcript_ready = False
+        self._turn_lock = threading.Lock()
+        
+        # Single work queue - Deepgram callbacks only enqueue, the turn worker consumes
+        # (created on first use so idle sessions don't carry queue/condition objects)
+        self.events = None
+        self._turn_worker = None
+        self._turn_worker_stop = None
         
         # Connection objects
         self.dg_connection = None  # Deepgram WebSocket
         self.twilio_ws = None      # Twilio WebSocket
+        self.streamed_here = False  # this process held the call's media stream (owns its shared state)
+        self.stream_sid = None     # Exotel stream ID
         
         # Response preparation
         self.next_response_type = None
         self.next_response_content = None  
         self.next_transcript = None
-        self.ready_for_twiml = False
+        self.playout = None  # PlayoutQueue of the reply being streamed to the caller (barge-in stops it)
+        
+        # Bumped on every write to the shared session store
+        self.state_version = 0
+        
+        # Prompt tokens of the LLM call behind the current turn's response (0 = answered locally)
+        self.prompt_tokens = 0
+        
+        # Next-turn TTS prefetch state (created by the prefetcher on first use)
+        self.prefetch = None
+    
+    def to_state(self):
+        """Serializable session state (live connections and threads are left out)"""
+        played = self.played_clips
+        return {
+            "version": self.state_version,
+            "call_sid": self.call_sid,
+            "call_direction": self.call_direction,
+            "lead_data": self.lead_data,
+            "created_at": self.created_at,
+            "last_seen": self.last_seen,
+            "session_memory": self.session_memory,
+            "session_variables": self.session_variables,
+            "history": [
+                [r.speaker, r.kind, r.text, list(r.clips), r.timestamp, r.turn]
+                for r in self.history
+            ],
+            "played_clips": [played.bits, played.play_counts, played.last_played_turn],
+            "dialogue_stage": self.dialogue_stage,
+            "fillers_played": self.fillers_played,
+            "turn_state": self.turn_state,
+            "turn_count": self.turn_count,
+            "next_response": [self.next_response_type, self.next_response_content, self.next_transcript]
+        }
+    
+    def apply_state(self, state):
+        """Overwrite serializable fields from a stored state (live connections untouched)"""
+        self.state_version = state["version"]
+        self.call_direction = state["call_direction"]
+        self.lead_data = state["lead_data"]
+        self.created_at = state["created_at"]
+        self.last_seen = max(self.last_seen, state["last_seen"])
+        self.session_memory = state["session_memory"]
+        self.session_variables = state["session_variables"]
+        
+        self.history.clear()
+        for speaker, kind, text, clips, timestamp, turn in state["history"]:
+            self.history.append(TurnRecord(speaker, kind, text=text, clips=clips, timestamp=timestamp, turn=turn))
+        
+        bits, play_counts, last_played_turn = state["played_clips"]
+        self.played_clips.bits = bits
+        # JSON turns int keys into strings
+        self.played_clips.play_counts = {int(k): v for k, v in play_counts.items()}
+        self.played_clips.last_played_turn = {int(k): v for k, v in last_played_turn.items()}
+        self.dialogue_stage = state.get("dialogue_stage")
+        self.fillers_played = state.get("fillers_played", [])
+        
+        self.turn_state = state["turn_state"]
+        self.turn_count = state["turn_count"]
+        self.next_response_type, self.next_response_content, self.next_transcript = state["next_response"]
+    
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a session (without live connections) from stored state"""
+        session = cls(state["call_sid"], state["call_direction"], state["lead_data"])
+        session.apply_state(state)
+        return session
+    
+    @property
+    def is_processing(self):
+        """True while a response is being routed or played"""
+        return self.turn_state in (TurnState.ROUTING, TurnState.SPEAKING)
+    
+    @property
+    def transcript_ready(self):
+        """True once the caller's utterance has been endpointed"""
+        return self.turn_state == TurnState.ENDPOINTED
+    
+    @property
+    def ready_for_twiml(self):
+        """True when a prepared response is waiting for the TwiML/passthru fetch"""
+        return self.turn_state == TurnState.SPEAKING and self.next_response_type is not None
+    
+    def transition(self, new_state):
+        """Move the turn to a new state, recording when it happened"""
+        with self._turn_lock:
+            if new_state not in TurnState.TRANSITIONS[self.turn_state]:
+                print(f"⚠️ Invalid turn transition for {self.call_sid}: {self.turn_state} → {new_state}")
+                return False
+            
+            now = time.time()
+            if new_state == TurnState.LISTENING:
+                self.last_turn_latencies = self._compute_turn_latencies(now)
+                self.turn_timestamps = {}
+            
+            self.turn_state = new_state
+            self.turn_timestamps[new_state] = now
+            return True
+    
+    def _compute_turn_latencies(self, now):
+        """Per-stage latency (ms) for the turn that is ending"""
+        stamps = self.turn_timestamps
+        
+        def span(start, end):
+            if start in stamps and end in stamps:
+                return int((stamps[end] - stamps[start]) * 1000)
+            return None
+        
+        stamps["turn_end"] = now
+        latencies = {
+            "endpointing_ms": span("speech_end", TurnState.ENDPOINTED),
+            "routing_ms": span(TurnState.ROUTING, TurnState.SPEAKING),
+            "speaking_ms": span(TurnState.SPEAKING, "turn_end"),
+            "response_ms": span(TurnState.ENDPOINTED, TurnState.SPEAKING),
+            "barge_in_ms": span(TurnState.SPEAKING, "barge_in"),
+            "cancelled": TurnState.SPEAKING not in stamps
+        }
+        return latencies
+    
+    def get_turn_latencies(self):
+        """Get per-stage latencies of the most recently completed turn"""
+        return dict(self.last_turn_latencies)
+    
+    def touch(self):
+        """Record activity on this call (media, webhooks, transcripts)"""
+        self.last_seen = time.time()
     
     def on_deepgram_open(self, *args, **kwargs):
         """Handle Deepgram connection opening"""
@@ -48,24 +273,53 @@ class StreamingSession:
         pass
     
     def on_deepgram_message(self, *args, **kwargs):
-        """Process incoming speech transcription from Deepgram"""
-        if self.is_processing:
-            return
-            
+        """Queue incoming speech transcription from Deepgram for the turn worker"""
         result = kwargs.get('result')
         if result is None:
             return
             
         sentence = result.channel.alternatives[0].transcript
-        is_final = result.is_final
-        
         if sentence.strip():
-            self.last_activity_time = time.time()
+            self.touch()
+            received_at = time.time()
+            # Ahead of the transcript, so the worker ends the turn before the new words accumulate
+            if self.playout is not None and self.is_processing and len(sentence.split()) >= Config.BARGE_IN_MIN_WORDS:
+                self.barge_in(sentence, received_at)
+            self._event_queue().put(("transcript", sentence, result.is_final, received_at))
+    
+    def _event_queue(self):
+        """Get the turn event queue, creating it on first use"""
+        if self.events is None:
+            with self._turn_lock:
+                if self.events is None:
+                    self.events = queue.Queue()
+        return self.events
+    
+    def _apply_event(self, event):
+        """Apply a queued event to the turn (runs on the turn worker only)"""
+        kind = event[0]
+        
+        if kind == "barge_in":
+            self._end_barged_turn(*event[1:])
+        elif kind == "transcript":
+            _, sentence, is_final, received_at = event
+            self.last_activity_time = received_at
             if is_final:
                 if self.accumulated_text:
                     self.accumulated_text += " " + sentence
                 else:
                     self.accumulated_text = sentence
+                self.interim_text = ""
+                self.interim_changed_at = received_at
+            elif sentence != self.interim_text:
+                self.interim_text = sentence
+                self.interim_changed_at = received_at
+    
+    def partial_transcript(self):
+        """Finalized text so far plus the current interim hypothesis"""
+        if self.accumulated_text and self.interim_text:
+            return f"{self.accumulated_text} {self.interim_text}"
+        return self.accumulated_text or self.interim_text
     
     def on_deepgram_error(self, *args, **kwargs):
         """Handle Deepgram connection errors"""
@@ -74,22 +328,178 @@ class StreamingSession:
     
     def check_for_completion(self):
         """Check if user has finished speaking based on silence threshold"""
-        if (self.accumulated_text and 
+        if (self.turn_state == TurnState.LISTENING and
+            self.accumulated_text and 
             self.last_activity_time and 
-            time.time() - self.last_activity_time >= self.silence_threshold and
-            not self.is_processing):
+            time.time() - self.last_activity_time >= self.silence_threshold):
             
             self.completed_transcript = self.accumulated_text
-            self.transcript_ready = True
+            self.turn_timestamps["speech_end"] = self.last_activity_time
             self.accumulated_text = ""
+            self.interim_text = ""
+            self.slot_scan_text = ""
             self.last_activity_time = None
-            return True
+            return self.transition(TurnState.ENDPOINTED)
         return False
     
+    def prepare_response(self, response_type, content, transcript):
+        """Store a routed response for the TwiML/passthru fetch and start speaking"""
+        self.next_response_type = response_type
+        self.next_response_content = content
+        self.next_transcript = transcript
+        return self.transition(TurnState.SPEAKING)
+    
+    def cancel_turn(self, reason=""):
+        """Cancel edge - abandon the current turn and go back to listening"""
+        if self.turn_state == TurnState.LISTENING:
+            return False
+        if reason:
+            print(f"↩️ Turn cancelled for {self.call_sid}: {reason}")
+        self.completed_transcript = None
+        return self.transition(TurnState.LISTENING)
+    
+    def barge_in(self, sentence="", received_at=None):
+        """
+        Caller spoke over the reply (Deepgram thread): stop its playout now and
+        leave ending the turn to the worker via a queued event
+        """
+        if not Config.BARGE_IN_ENABLED:
+            return False
+        playout = self.playout
+        if playout is None or playout.cancelled.is_set():
+            return False
+        playout.cancel()
+        self._event_queue().put(("barge_in", playout, sentence, received_at or time.time()))
+        return True
+    
+    def _end_barged_turn(self, playout, sentence, received_at):
+        """Drop the turn a barge-in interrupted (runs on the turn worker only)"""
+        if self.turn_state == TurnState.LISTENING:
+            return
+        if playout.answer_at is None and self.completed_transcript:
+            # The reply never started - the caller was still talking, so the next turn continues this one
+            self.accumulated_text = f"{self.completed_transcript} {self.accumulated_text}".strip()
+        self.next_response_type = None
+        self.turn_timestamps["barge_in"] = received_at
+        self.cancel_turn(f"barge-in ({sentence})" if sentence else "barge-in")
+    
+    def start_turn_worker(self, handler, speculator=None):
+        """
+        Start the single per-call worker that drains the event queue and drives turns
+        
+        handler(transcript) is called in ROUTING state. It should move the turn to
+        SPEAKING once a response is ready; returning False stops the worker and
+        leaves the turn in its current state (e.g. waiting for a TwiML fetch).
+        speculator.observe(session) is called while LISTENING so routing can start
+        on stable partial transcripts.
+        """
+        self.stop_turn_worker()
+        
+        # Events from a previous stream belong to a closed Deepgram connection
+        events = self._event_queue()
+        while not events.empty():
+            try:
+                events.get_nowait()
+            except queue.Empty:
+                break
+        self.accumulated_text = ""
+        self.interim_text = ""
+        self.last_activity_time = None
+        
+        self._turn_worker_stop = threading.Event()
+        self._turn_worker = threading.Thread(
+            target=self._run_turn_worker,
+            args=(handler, self._turn_worker_stop, speculator),
+            daemon=True
+        )
+        self._turn_worker.start()
+    
+    def stop_turn_worker(self):
+        """Stop the turn worker (safe to call from any thread)"""
+        if self._turn_worker_stop is None:
+            return
+        self._turn_worker_stop.set()
+        self.events.put(("stop",))
+        self._turn_worker = None
+    
+    def _run_turn_worker(self, handler, stop_event, speculator):
+        """Turn worker loop: LISTENING → ENDPOINTED → ROUTING → SPEAKING → LISTENING"""
+        while not stop_event.is_set():
+            try:
+                event = self.events.get(timeout=0.05)
+            except queue.Empty:
+                event = None
+            
+            if event is not None:
+                if event[0] == "stop":
+                    break
+                self._apply_event(event)
+                
+                # Fill slots from interim text so they're known before end-of-turn
+                if self.turn_state == TurnState.LISTENING:
+                    slot_extractor.update_incremental(self, self.partial_transcript())
+            
+            if not self.check_for_completion():
+                if speculator and self.turn_state == TurnState.LISTENING:
+                    speculator.observe(self)
+                continue
+            
+            self.transition(TurnState.ROUTING)
+            self.turn_count += 1
+            keep_listening = True
+            try:
+                keep_listening = handler(self.completed_transcript)
+            except Exception as e:
+                print(f"❌ Turn handler error for {self.call_sid}: {e}")
+            
+            playout, self.playout = self.playout, None
+            if keep_listening is False:
+                break
+            if playout is not None and playout.cancelled.is_set():
+                continue  # barged in - its queued event ends the turn
+            self.reset_for_next_input()
+    
     def add_to_history(self, speaker, message):
-        """Add message to conversation history"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.conversation_history.append(f"[{timestamp}] {speaker}: {message}")
+        """Add a free-form message to conversation history"""
+        self.history.append(TurnRecord(speaker, TurnRecord.TEXT, text=message, turn=self.turn_count))
+    
+    def record_parent_turn(self, transcript):
+        """Add the parent's transcript to conversation history"""
+        self.history.append(TurnRecord("Parent", TurnRecord.SPEECH, text=transcript, turn=self.turn_count))
+    
+    def record_response(self, response_type, content):
+        """Add Nisha's response ("AUDIO" clip chain or "TTS" text) to conversation history"""
+        if response_type == "AUDIO":
+            clips = [f.strip() for f in content.split('+') if f.strip()]
+            record = TurnRecord("Nisha", TurnRecord.AUDIO, clips=clips, turn=self.turn_count)
+            self.played_clips.mark_chain(clips, self.turn_count)
+            self.dialogue_stage = dialogue_stages.advance(self.dialogue_stage, clips)
+        else:
+            record = TurnRecord("Nisha", TurnRecord.TTS, text=content, turn=self.turn_count)
+        self.history.append(record)
+    
+    @property
+    def conversation_history(self):
+        """Conversation history formatted as "[HH:MM:SS] Speaker: message" strings"""
+        return [record.format() for record in self.history]
+    
+    def recent_turns(self, limit):
+        """Get the last N turn records (oldest first)"""
+        if limit <= 0:
+            return []
+        start = max(0, len(self.history) - limit)
+        return [self.history[i] for i in range(start, len(self.history))]
+    
+    def recent_clips(self, limit=3, window=6):
+        """Most recent unique clips played within the last `window` records (newest first)"""
+        seen = []
+        for record in reversed(self.recent_turns(window)):
+            for clip in reversed(record.clips):
+                if clip not in seen:
+                    seen.append(clip)
+                    if len(seen) >= limit:
+                        return seen
+        return seen
     
     def update_session_variable(self, variable_name, value):
         """Update a specific session variable"""
@@ -140,17 +550,26 @@ class StreamingSession:
         return context
     
     def reset_for_next_input(self):
-        """Reset session state for next user input"""
-        self.accumulated_text = ""
-        self.last_activity_time = None
-        self.is_processing = False
+        """Finish the current turn and go back to listening for the next input"""
         self.completed_transcript = None
-        self.transcript_ready = False
-        self.ready_for_twiml = False
+        self.next_response_type = None
+        if self.turn_state != TurnState.LISTENING:
+            self.transition(TurnState.LISTENING)
+    
+    def attach_stream(self, ws):
+        """The call's media stream is served by this process"""
+        self.twilio_ws = ws
+        self.streamed_here = True
     
     def cleanup(self):
         """Clean up session resources"""
+        if self.speculation_stats.get("attempts"):
+            stats = self.speculation_stats
+            print(f"🔮 Speculation {self.call_sid}: {stats.get('hits', 0)}/{stats['attempts']} hits, "
+                  f"saved {stats.get('saved_ms', 0)}ms")
+        
         try:
+            self.stop_turn_worker()
             if self.dg_connection:
                 self.dg_connection.finish()
                 self.dg_connection = None
@@ -159,16 +578,64 @@ class StreamingSession:
 
 
 class SessionManager:
-    """Manages multiple concurrent call sessions"""
+    """Manages multiple concurrent call sessions with TTL eviction"""
     
-    def __init__(self):
-        self.active_sessions = {}
+    def __init__(self, store=None):
+        # Shared serializable state; the shards below are this process's write-through cache
+        self.store = store or create_session_store()
+        
+        # Sessions are spread over shards so concurrent calls don't contend on one lock
+        self._shard_count = max(1, Config.SESSION_LOCK_SHARDS)
+        self._shards = [{} for _ in range(self._shard_count)]
+        self._shard_locks = [threading.Lock() for _ in range(self._shard_count)]
         self.active_outbound_calls = {}
+        
+        # Eviction settings
+        self.idle_ttl = Config.SESSION_IDLE_TTL
+        self.orphan_ttl = Config.SESSION_ORPHAN_TTL
+        self.max_age = Config.SESSION_MAX_AGE
+        self.sweep_interval = Config.SESSION_SWEEP_INTERVAL
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+        
+        # Counters
+        self._stats_lock = threading.Lock()
+        self.sessions_created = 0
+        self.sessions_removed = 0
+        self.evictions = {"idle": 0, "orphaned": 0, "max_age": 0}
+        self.copies_dropped = 0  # read-through copies of calls streaming on other workers
+    
+    def _shard_index(self, call_sid):
+        return hash(call_sid) % self._shard_count
+    
+    @property
+    def active_sessions(self):
+        """Snapshot of all active sessions keyed by call SID"""
+        snapshot = {}
+        for i in range(self._shard_count):
+            with self._shard_locks[i]:
+                snapshot.update(self._shards[i])
+        return snapshot
     
     def create_session(self, call_sid, call_direction="inbound", lead_data=None):
         """Create new session for incoming call"""
         session = StreamingSession(call_sid, call_direction, lead_data)
-        self.active_sessions[call_sid] = session
+        
+        i = self._shard_index(call_sid)
+        with self._shard_locks[i]:
+            replaced = self._shards[i].get(call_sid)
+            self._shards[i][call_sid] = session
+        
+        # A second create for the same call must not leak the first session's ASR connection
+        if replaced is not None:
+            replaced.cleanup()
+        
+        self.save_session(session)
+        
+        with self._stats_lock:
+            self.sessions_created += 1
+        
+        self._ensure_sweeper()
         
         # Only show session creation for debugging if needed
         # direction_emoji = "📞" if call_direction == "inbound" else "🏫"
@@ -177,22 +644,73 @@ class SessionManager:
         return session
     
     def get_session(self, call_sid):
-        """Get existing session by call SID"""
-        return self.active_sessions.get(call_sid)
+        """Get existing session by call SID (counts as activity)"""
+        i = self._shard_index(call_sid)
+        with self._shard_locks[i]:
+            session = self._shards[i].get(call_sid)
+        
+        # Sessions streaming on this process are authoritative locally - no round-trip.
+        # Otherwise another worker may have advanced the call, so read through.
+        if session is None or session.twilio_ws is None:
+            session = self._refresh_from_store(call_sid, session)
+        
+        if session:
+            session.touch()
+        return session
+    
+    def _refresh_from_store(self, call_sid, session):
+        """Load or refresh a session from the shared store"""
+        try:
+            state = self.store.load(call_sid)
+        except Exception as e:
+            print(f"⚠️ Session store read failed for {call_sid}: {e}")
+            return session
+        
+        if state is None:
+            return session
+        
+        if session is None:
+            session = StreamingSession.from_state(state)
+            i = self._shard_index(call_sid)
+            with self._shard_locks[i]:
+                session = self._shards[i].setdefault(call_sid, session)
+            self._ensure_sweeper()
+        elif state["version"] > session.state_version:
+            session.apply_state(state)
+        
+        return session
+    
+    def save_session(self, session):
+        """Write-through the session's serializable state to the shared store"""
+        session.state_version += 1
+        try:
+            self.store.save(session.call_sid, session.to_state())
+        except Exception as e:
+            print(f"⚠️ Session store write failed for {session.call_sid}: {e}")
     
     def remove_session(self, call_sid):
         """Remove and cleanup session"""
-        session = self.active_sessions.pop(call_sid, None)
+        i = self._shard_index(call_sid)
+        with self._shard_locks[i]:
+            session = self._shards[i].pop(call_sid, None)
+        
         if session:
             session.cleanup()
+            with self._stats_lock:
+                self.sessions_removed += 1
             # Removed cleanup log for cleaner output
         
+        try:
+            self.store.delete(call_sid)
+        except Exception as e:
+            print(f"⚠️ Session store delete failed for {call_sid}: {e}")
+        
         # Also remove from outbound tracking if exists
         self.active_outbound_calls.pop(call_sid, None)
     
     def get_active_count(self):
         """Get count of active sessions"""
-        return len(self.active_sessions)
+        return sum(len(shard) for shard in self._shards)
     
     def track_outbound_call(self, call_sid, lead_data):
         """Track outbound call metadata"""
@@ -201,6 +719,116 @@ class SessionManager:
             'start_time': time.time(),
             'status': 'calling'
         }
+    
+    def _owns(self, session):
+        """
+        Whether this process may end the call's shared state: it served the
+        media stream, or the store is process-local anyway. Other sessions are
+        read-through copies of a call another worker may still be streaming.
+        """
+        return session.streamed_here or self.store.name == "memory"
+    
+    def _eviction_reason(self, session, now):
+        """Return why a session should be evicted, or None to keep it"""
+        if now - session.created_at >= self.max_age:
+            return "max_age"
+        
+        idle_for = now - session.last_seen
+        if session.twilio_ws is None and idle_for >= self.orphan_ttl:
+            return "orphaned"
+        if idle_for >= self.idle_ttl:
+            return "idle"
+        return None
+    
+    def sweep(self, now=None):
+        """Evict idle and orphaned sessions, returns the number evicted"""
+        now = now or time.time()
+        victims = []
+        
+        for i in range(self._shard_count):
+            with self._shard_locks[i]:
+                shard = self._shards[i]
+                for call_sid, session in list(shard.items()):
+                    reason = self._eviction_reason(session, now)
+                    if reason:
+                        del shard[call_sid]
+                        victims.append((call_sid, session, reason))
+        
+        # Close ASR connections and log outside the shard locks
+        evicted = 0
+        for call_sid, session, reason in victims:
+            session.cleanup()
+            if not self._owns(session):
+                # Only the local cache entry goes - the call may still be live on its own worker
+                with self._stats_lock:
+                    self.copies_dropped += 1
+                continue
+            
+            try:
+                self.store.delete(call_sid)
+            except Exception as e:
+                # e.g. a locked SQLite file - the row is purged once it passes max_age
+                print(f"⚠️ Could not delete stored session {call_sid}: {e}")
+            self.active_outbound_calls.pop(call_sid, None)
+            call_logger.log_call_end(call_sid, f"evicted_{reason}")
+            print(f"🧹 Evicted {reason} session: {call_sid} (idle {int(now - session.last_seen)}s)")
+            evicted += 1
+            
+            with self._stats_lock:
+                self.evictions[reason] += 1
+        
+        # Shared-store entries of a worker that died: no live call goes unwritten for max_age
+        try:
+            self.store.purge(now - self.max_age)
+        except Exception as e:
+            print(f"⚠️ Session store purge failed: {e}")
+        
+        # Outbound tracking entries for calls that never connected
+        for call_sid, info in list(self.active_outbound_calls.items()):
+            if now - info['start_time'] >= self.max_age:
+                self.active_outbound_calls.pop(call_sid, None)
+        
+        return evicted
+    
+    def _ensure_sweeper(self):
+        """Start the background sweeper thread once"""
+        with self._sweeper_lock:
+            if self._sweeper and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(target=self._sweep_loop, daemon=True)
+            self._sweeper.start()
+    
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Session sweep error: {e}")
+    
+    def get_turn_latencies(self):
+        """Per-stage latencies of each active call's last completed turn"""
+        return {
+            call_sid: session.get_turn_latencies()
+            for call_sid, session in self.active_sessions.items()
+            if session.last_turn_latencies
+        }
+    
+    def get_stats(self):
+        """Get session counts and eviction statistics"""
+        with self._stats_lock:
+            return {
+                "active_sessions": self.get_active_count(),
+                "sessions_created": self.sessions_created,
+                "sessions_removed": self.sessions_removed,
+                "evictions": dict(self.evictions),
+                "evictions_total": sum(self.evictions.values()),
+                "copies_dropped": self.copies_dropped,
+                "outbound_calls_tracked": len(self.active_outbound_calls),
+                "lock_shards": self._shard_count,
+                "store_backend": self.store.name,
+                "stored_sessions": self.store.count()
+            }
 
 # Global session manager instance
 session_manager = SessionManager()
\ No newline at end of file
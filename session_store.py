@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+KLARIQO SESSION STORE MODULE
+Pluggable backends for serializable session state so webhooks and media
+streams for one call can land on different worker processes or nodes
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from config import Config
+
+
+class SessionStore:
+    """Interface for shared session state (plain JSON-serializable dicts)"""
+
+    name = "base"
+
+    def load(self, call_sid):
+        """Get the stored state dict for a call, or None"""
+        raise NotImplementedError
+
+    def save(self, call_sid, state):
+        """Store the state dict for a call"""
+        raise NotImplementedError
+
+    def delete(self, call_sid):
+        """Forget a call"""
+        raise NotImplementedError
+
+    def purge(self, older_than):
+        """Delete states not updated since `older_than` (epoch seconds), returns count"""
+        raise NotImplementedError
+
+    def count(self):
+        """Number of stored sessions"""
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store (single worker deployments)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def load(self, call_sid):
+        with self._lock:
+            entry = self._states.get(call_sid)
+        return entry[1] if entry else None
+
+    def save(self, call_sid, state):
+        with self._lock:
+            self._states[call_sid] = (time.time(), state)
+
+    def delete(self, call_sid):
+        with self._lock:
+            self._states.pop(call_sid, None)
+
+    def purge(self, older_than):
+        with self._lock:
+            stale = [sid for sid, (updated, _) in self._states.items() if updated < older_than]
+            for call_sid in stale:
+                del self._states[call_sid]
+        return len(stale)
+
+    def count(self):
+        return len(self._states)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Shared store in a WAL-mode SQLite file (multiple worker processes on one node)"""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "call_sid TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)")
+
+    def _connection(self):
+        """One connection per thread - sqlite3 connections are not thread-safe"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, call_sid):
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE call_sid = ?", (call_sid,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, call_sid, state):
+        self._connection().execute(
+            "INSERT INTO sessions (call_sid, state, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(call_sid) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (call_sid, json.dumps(state, ensure_ascii=False), time.time())
+        )
+
+    def delete(self, call_sid):
+        self._connection().execute("DELETE FROM sessions WHERE call_sid = ?", (call_sid,))
+
+    def purge(self, older_than):
+        cursor = self._connection().execute("DELETE FROM sessions WHERE updated_at < ?", (older_than,))
+        return cursor.rowcount
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(backend=None):
+    """Build the session store configured by Config.SESSION_STORE"""
+    backend = backend or Config.SESSION_STORE
+
+    if backend == "sqlite":
+        return SQLiteSessionStore(Config.SESSION_STORE_PATH)
+    if backend != "memory":
+        print(f"⚠️ Unknown session store '{backend}', using in-memory store")
+    return InMemorySessionStore()
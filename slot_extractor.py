@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+KLARIQO SLOT EXTRACTION MODULE
+Single-pass extraction of session variables (class, age, location, admission
+type, inquiry focus) from Hinglish / Devanagari transcripts, shared by all routers
+"""
+
+import re
+
+# Devanagari digits → ASCII so "क्लास २" and "५ साल" match the numeric patterns
+DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+
+# Word boundary that also treats Devanagari letters and vowel signs as word characters
+_WB_BEFORE = r"(?<![\wऀ-ॿ])"
+_WB_AFTER = r"(?![\wऀ-ॿ])"
+
+# Fixed phrases → (slot, value). Earlier entries win ties within a slot.
+KEYWORD_SLOTS = {
+    "admission_type": [
+        ("firsttime", ["first time", "firsttime", "pehli bar", "pehli baar", "पहली बार",
+                       "naya admission", "new admission", "नया एडमिशन", "नया दाखिला"]),
+        ("transfer", ["transfer", "ट्रांसफर", "dusre school se", "doosre school se",
+                      "दूसरे स्कूल से", "change school", "school change", "स्कूल बदल"]),
+    ],
+    "admission_class": [
+        ("KG1", ["kg1", "kg 1", "nursery", "pre kg", "prekg", "lkg", "नर्सरी", "एलकेजी"]),
+        ("KG2", ["kg2", "kg 2", "ukg", "यूकेजी"]),
+        ("Class 1", ["first class", "pehli class", "पहली क्लास", "पहली कक्षा"]),
+        ("Class 2", ["second class", "dusri class", "doosri class", "दूसरी क्लास", "दूसरी कक्षा"]),
+        ("Class 3", ["third class", "teesri class", "tisri class", "तीसरी क्लास", "तीसरी कक्षा"]),
+        ("Class 4", ["fourth class", "chauthi class", "चौथी क्लास", "चौथी कक्षा"]),
+        ("Class 5", ["fifth class", "paanchvi class", "panchvi class", "पांचवी क्लास",
+                     "पाँचवी क्लास", "पांचवीं क्लास", "पाँचवीं कक्षा"]),
+    ],
+    "inquiry_focus": [
+        ("fees", ["fees", "fee", "फीस", "cost", "charges", "kitna paisa", "खर्चा"]),
+        ("transport", ["transport", "bus", "बस", "pickup", "pick up", "van", "वैन", "परिवहन"]),
+        ("activities", ["activity", "activities", "sports", "खेल", "गतिविधियां", "dance", "music"]),
+        ("admission", ["admission", "एडमिशन", "दाखिला", "प्रवेश", "admit"]),
+        ("timings", ["timing", "timings", "समय", "kitne baje", "कितने बजे"]),
+        ("security", ["security", "safety", "सुरक्षा", "cctv"]),
+    ],
+}
+
+# Numeric and location patterns (named groups so one finditer pass dispatches everything)
+PATTERN_SLOTS = [
+    # "class 2", "क्लास 2", "कक्षा 3", "std 4"
+    ("class_num_after", r"(?:class|क्लास|कक्षा|std|standard)\s*(?P<class_num_after>\d{1,2})"),
+    # "2nd class", "3 क्लास", "4th std"
+    ("class_num_before", r"(?P<class_num_before>\d{1,2})\s*(?:st|nd|rd|th|वीं|वी)?\s*(?:class|क्लास|कक्षा|std)"),
+    # "5 years", "6 saal", "४ साल", "7 वर्ष"
+    ("age", r"(?P<age>\d{1,2})\s*(?:years?|yrs?|saal|sal|साल|वर्ष|baras)"),
+    # "umar 5", "उम्र 6"
+    ("age_after", r"(?:age|umar|umra|उम्र)\s*(?:hai|है|is)?\s*(?P<age_after>\d{1,2})"),
+    # "andheri area", "sector 5 location" (the indicator is not consumed, so "area baner" can still match after it)
+    ("location_before", r"(?P<location_before>[\wऀ-ॿ]+)(?=\s+(?:area|location|locality|इलाका|इलाके))"),
+    # "hum andheri mein rehte hain", "rajpur से आना है"
+    ("location_rehte", r"(?P<location_rehte>[\wऀ-ॿ]+)\s+(?:mein|me|में|se|से)\s+(?:rehte|rahte|रहते|aana|ana|आना|aayega|आएगा)"),
+    # "location hai kothrud", "area baner"
+    ("location_after", r"(?:location|address|area|jagah|जगह|इलाका)\s+(?:is|hai|है|:)?\s*(?P<location_after>[\wऀ-ॿ]{3,})"),
+]
+
+# Words that are never a location even when they sit next to a location indicator
+LOCATION_STOPWORDS = {
+    "hai", "है", "is", "the", "your", "my", "our", "kya", "क्या", "which", "what", "kaun", "कौन",
+    "konsa", "कौनसा", "se", "से", "me", "mein", "में", "aap", "आप", "hum", "हम", "bus", "बस",
+    "pick", "up", "drop", "kahan", "कहाँ", "कहां", "where", "ka", "ki", "के", "का", "की",
+    # Possessives ("mera area andheri hai", "aapke area mein")
+    "mera", "meri", "mere", "hamara", "hamari", "hamare", "humara", "humari", "humare",
+    "aapka", "aapki", "aapke", "apka", "apki", "apke", "tumhara", "tumhari", "tumhare", "apna", "apni", "apne",
+    "मेरा", "मेरी", "मेरे", "हमारा", "हमारी", "हमारे", "आपका", "आपकी", "आपके",
+    "तुम्हारा", "तुम्हारी", "तुम्हारे", "अपना", "अपनी", "अपने",
+    # The location indicators themselves ("kothrud area mein rehte hain")
+    "area", "location", "locality", "address", "jagah", "जगह", "इलाका", "इलाके",
+}
+
+# When several location patterns match, the explicit "location/area <name>" wins
+_LOCATION_PRIORITY = {"location_after": 0, "location_rehte": 1, "location_before": 2}
+
+_INT_SLOTS = {"class_num_after", "class_num_before", "age", "age_after"}
+
+# Lookback when re-scanning a growing interim transcript (longest useful match span)
+_INCREMENTAL_LOOKBACK = 48
+
+
+class SlotExtractor:
+    """Precompiled one-pass slot extractor"""
+
+    def __init__(self):
+        entries = {}   # phrase → (slot, value, priority)
+        for slot, groups in KEYWORD_SLOTS.items():
+            for priority, (value, phrases) in enumerate(groups):
+                for phrase in phrases:
+                    entries.setdefault(phrase, (slot, value, priority))
+
+        # One alternation match consumes its words, so a phrase also carries other slots'
+        # phrases inside it ("new admission" → admission_type and inquiry_focus)
+        self.keyword_values = {}   # phrase → [(slot, value, priority)]
+        for phrase, entry in entries.items():
+            self.keyword_values[phrase] = [entry] + [
+                inner_entry for inner, inner_entry in entries.items()
+                if inner_entry[0] != entry[0]
+                and re.search(_WB_BEFORE + re.escape(inner) + _WB_AFTER, phrase)
+            ]
+
+        # Longest phrases first so "kg 1" beats "kg", "first time" beats "first"
+        phrases = sorted(self.keyword_values, key=len, reverse=True)
+        keyword_alternation = "|".join(re.escape(p) for p in phrases)
+
+        alternatives = [pattern for _, pattern in PATTERN_SLOTS]
+        alternatives.append(f"(?P<keyword>{keyword_alternation})")
+        self.pattern = re.compile(
+            _WB_BEFORE + "(?:" + "|".join(alternatives) + ")" + _WB_AFTER,
+            re.IGNORECASE
+        )
+
+    def extract(self, text):
+        """Extract slots from text in one pass, returns {slot: value}"""
+        text = text.lower().translate(DEVANAGARI_DIGITS)
+        found = {}
+        best_priority = {}
+        location_priority = None
+
+        for match in self.pattern.finditer(text):
+            group = match.lastgroup
+            value = match.group(group)
+
+            if group == "keyword":
+                for slot, slot_value, priority in self.keyword_values[value]:
+                    # Lower priority number wins (fees > transport > ... as routers did before)
+                    if slot not in best_priority or priority < best_priority[slot]:
+                        best_priority[slot] = priority
+                        found[slot] = slot_value
+            elif group in _INT_SLOTS:
+                number = int(value)
+                if group.startswith("class"):
+                    if 1 <= number <= 12:
+                        found["admission_class"] = f"Class {number}"
+                        best_priority["admission_class"] = -1  # explicit number beats ordinal words
+                elif 2 <= number <= 18:
+                    found["student_age"] = number
+            elif value not in LOCATION_STOPWORDS and not value.isdigit():
+                priority = _LOCATION_PRIORITY[group]
+                if location_priority is None or priority < location_priority:
+                    location_priority = priority
+                    found["student_location"] = value
+
+        return found
+
+    def update_session(self, session, text):
+        """Extract slots from text and write changed values into the session"""
+        found = self.extract(text)
+        for slot, value in found.items():
+            if session.session_variables.get(slot) != value:
+                session.update_session_variable(slot, value)
+        return found
+
+    def update_incremental(self, session, partial_text):
+        """
+        Fill slots from a growing interim transcript before end-of-turn
+
+        When the new text extends the last scanned text only the tail (plus a
+        small lookback for matches spanning the boundary) is re-scanned.
+        """
+        previous = session.slot_scan_text
+        if previous and partial_text.startswith(previous):
+            start = max(0, len(previous) - _INCREMENTAL_LOOKBACK)
+            # Don't start mid-word
+            while start > 0 and not partial_text[start - 1].isspace():
+                start -= 1
+            text = partial_text[start:]
+        else:
+            text = partial_text
+
+        session.slot_scan_text = partial_text
+        if not text.strip():
+            return {}
+        return self.update_session(session, text)
+
+
+# Global slot extractor instance
+slot_extractor = SlotExtractor()
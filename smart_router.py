@@ -5,12 +5,15 @@ Linear conversation flow with negative logic (NO LLM - 0ms, $0 cost)
 """
 
 from audio_manager import audio_manager
+from keyword_automaton import KeywordAutomaton
+from dialogue_stage import dialogue_stages
 
 class SmartRouter:
     """Handles INSTANT response selection using conversation flow + negative logic"""
     
     def __init__(self):
         self.setup_patterns()
+        audio_manager.register_reload_listener(self.build_automaton)
         print("⚡ Smart Router initialized: LINEAR FLOW + NEGATIVE LOGIC mode (0ms, $0 cost)")
     
     def setup_patterns(self):
@@ -64,110 +67,144 @@ class SmartRouter:
             "ai_voice_response": "klariqo_agents_sound_so_realistic.mp3 + klariqo_agents_sound_so_realistic2.mp3"
         }
         
-        # 📋 CONVERSATION STAGES
+        # Intent check order (earlier wins when several match) and log labels
+        self.intent_order = [
+            ("pricing", "💰 PRICING INTENT"),
+            ("demo", "🎬 DEMO INTENT"),
+            ("technical", "🔧 TECHNICAL INTENT"),
+            ("receptionist", "👥 RECEPTIONIST OBJECTION"),
+            ("ai_voice", "🤖 AI VOICE CONCERN"),
+        ]
+        
+        # 📋 CONVERSATION STAGES (advance_on: clip played → next stage)
         self.conversation_stages = {
             "post_intro": {
                 "positive_response": "klariqo_provides_voice_agent1.mp3 + voice_agents_trained_details.mp3 + basically_agent_answers_parents.mp3 + agent_guides_onboarding_process.mp3",
-                "negative_response": "I understand you're busy. Would you like me to call you at a better time?"
+                "negative_response": "I understand you're busy. Would you like me to call you at a better time?",
+                "advance_on": {"klariqo_provides_voice_agent1.mp3": "after_explanation"}
             },
             "after_explanation": {
+                "negative_response": "I understand. Would you like me to send you some information via WhatsApp instead?",
                 "default_followup": "What specific aspect would you like to know more about - our pricing, technical setup, or would you like to see a demo?"
             }
         }
+        self.initial_stage = "post_intro"
+        self.fallback_response = "I want to help you in the best way possible. Could you tell me what specific aspect you'd like to know more about?"
+        
+        # Sessions track their stage incrementally through the compiled machine
+        dialogue_stages.compile(self.conversation_stages, self.initial_stage)
         
         print(f"📝 Smart patterns loaded:")
         print(f"   - Negative keywords: {len(self.negative_keywords)}")
         print(f"   - Specific intents: {len(self.specific_intents) // 2}")  # Each intent has keywords + response
         print(f"   - Conversation stages: {len(self.conversation_stages)}")
+        
+        self.build_automaton()
+    
+    def build_automaton(self):
+        """Compile intent, negative and quick-response phrases into one automaton"""
+        automaton = KeywordAutomaton()
+        
+        for priority, (intent, _) in enumerate(self.intent_order):
+            for keyword in self.specific_intents[f"{intent}_keywords"]:
+                automaton.add(keyword, ("intent", priority, intent))
+        
+        for keyword in self.negative_keywords:
+            automaton.add(keyword, ("negative", 0, None))
+        
+        quick_responses = audio_manager.audio_snippets.get("quick_responses", {})
+        for priority, (phrase, filename) in enumerate(quick_responses.items()):
+            automaton.add(phrase, ("quick", priority, filename))
+        
+        # Swap in whole so concurrent turns never see a half-built automaton
+        self.automaton = automaton.build()
+        print(f"🔎 Keyword automaton built: {len(automaton)} phrases")
     
-    def detect_specific_intent(self, user_input):
+    def scan(self, user_input):
+        """All keyword hits in one pass: KeywordMatch(start, end, phrase, (kind, priority, value))"""
+        return self.automaton.find_all(user_input.strip())
+    
+    def _best_match(self, matches, kind):
+        """Highest-priority (lowest number) hit of one kind, or None"""
+        hits = [m for m in matches if m.payload[0] == kind]
+        return min(hits, key=lambda m: (m.payload[1], m.start)) if hits else None
+    
+    def detect_specific_intent(self, user_input, matches=None):
         """Check for high-priority specific intents first"""
-        user_lower = user_input.lower().strip()
-        
-        # Check pricing
-        if any(kw in user_lower for kw in self.specific_intents["pricing_keywords"]):
-            print(f"💰 PRICING INTENT: {user_input}")
-            return "AUDIO", self.specific_intents["pricing_response"]
-        
-        # Check demo
-        if any(kw in user_lower for kw in self.specific_intents["demo_keywords"]):
-            print(f"🎬 DEMO INTENT: {user_input}")
-            return "AUDIO", self.specific_intents["demo_response"]
-        
-        # Check technical
-        if any(kw in user_lower for kw in self.specific_intents["technical_keywords"]):
-            print(f"🔧 TECHNICAL INTENT: {user_input}")
-            return "AUDIO", self.specific_intents["technical_response"]
-        
-        # Check receptionist objection
-        if any(kw in user_lower for kw in self.specific_intents["receptionist_keywords"]):
-            print(f"👥 RECEPTIONIST OBJECTION: {user_input}")
-            return "AUDIO", self.specific_intents["receptionist_response"]
-        
-        # Check AI voice concern
-        if any(kw in user_lower for kw in self.specific_intents["ai_voice_keywords"]):
-            print(f"🤖 AI VOICE CONCERN: {user_input}")
-            return "AUDIO", self.specific_intents["ai_voice_response"]
-        
-        return None, None
+        if matches is None:
+            matches = self.scan(user_input)
+        
+        match = self._best_match(matches, "intent")
+        if match is None:
+            return None, None
+        
+        intent, label = self.intent_order[match.payload[1]]
+        print(f"{label}: {user_input} ('{match.phrase}' at {match.start}-{match.end})")
+        return "AUDIO", self.specific_intents[f"{intent}_response"]
     
-    def is_negative_response(self, user_input):
+    def get_quick_response(self, user_input, matches=None):
+        """Quick-response clip for the input (first phrase in library order), or None"""
+        if matches is None:
+            matches = self.scan(user_input)
+        
+        match = self._best_match(matches, "quick")
+        return match.payload[2] if match else None
+    
+    def is_negative_response(self, user_input, matches=None):
         """Check if user response is negative"""
-        user_lower = user_input.lower().strip()
-        return any(neg in user_lower for neg in self.negative_keywords)
+        if matches is None:
+            matches = self.scan(user_input)
+        return self._best_match(matches, "negative") is not None
     
     def get_conversation_stage(self, session):
-        """Determine what stage of conversation we're in"""
-        if not hasattr(session, 'conversation_history') or len(session.conversation_history) == 0:
-            return "post_intro"
-        
-        # Check if we've already given the main explanation
-        for entry in session.conversation_history:
-            if "klariqo_provides_voice_agent1.mp3" in entry:
-                return "after_explanation"
-        
-        return "post_intro"
+        """Determine what stage of conversation we're in (kept up to date on the session per response)"""
+        return dialogue_stages.current(session)
     
-    def handle_conversation_flow(self, user_input, conversation_stage):
+    def handle_conversation_flow(self, user_input, conversation_stage, matches=None):
         """Handle linear conversation flow based on stage"""
+        if matches is None:
+            matches = self.scan(user_input)
         
         if conversation_stage == "post_intro":
             # First response after intro - use negative logic
-            if self.is_negative_response(user_input):
+            if self.is_negative_response(user_input, matches):
                 print(f"🚫 NEGATIVE RESPONSE (Post-Intro): {user_input}")
-                return "TTS", self.conversation_stages["post_intro"]["negative_response"]
+                return dialogue_stages.response("post_intro", "negative_response")
             else:
                 print(f"✅ POSITIVE RESPONSE (Post-Intro): {user_input}")
-                return "AUDIO", self.conversation_stages["post_intro"]["positive_response"]
+                return dialogue_stages.response("post_intro", "positive_response")
         
         elif conversation_stage == "after_explanation":
             # After main explanation - check for negatives, otherwise ask for clarification
-            if self.is_negative_response(user_input):
+            if self.is_negative_response(user_input, matches):
                 print(f"🚫 NEGATIVE RESPONSE (After Explanation): {user_input}")
-                return "TTS", "I understand. Would you like me to send you some information via WhatsApp instead?"
+                return dialogue_stages.response("after_explanation", "negative_response")
             else:
                 print(f"❓ UNCLEAR INTENT (After Explanation): {user_input}")
-                return "TTS", self.conversation_stages["after_explanation"]["default_followup"]
+                return dialogue_stages.response("after_explanation", "default_followup")
         
         # Default fallback
-        return "TTS", "I want to help you in the best way possible. Could you tell me what specific aspect you'd like to know more about?"
+        return "TTS", self.fallback_response
     
     def get_school_response(self, user_input, session):
         """Get response using LINEAR FLOW + NEGATIVE LOGIC (0ms, $0)"""
         
+        # One pass over the transcript serves every check below
+        matches = self.scan(user_input)
+        
         # PRIORITY 1: Check for specific intents first (pricing, demo, technical, etc.)
-        response_type, content = self.detect_specific_intent(user_input)
+        response_type, content = self.detect_specific_intent(user_input, matches)
         if response_type:
             return response_type, content
         
         # PRIORITY 2: Handle conversation flow based on stage
         conversation_stage = self.get_conversation_stage(session)
-        response_type, content = self.handle_conversation_flow(user_input, conversation_stage)
+        response_type, content = self.handle_conversation_flow(user_input, conversation_stage, matches)
         if response_type:
             return response_type, content
         
         # PRIORITY 3: Default fallback
-        return "TTS", "I want to help you in the best way possible. Could you tell me what specific aspect you'd like to know more about?"
+        return "TTS", self.fallback_response
     
     def validate_response(self, response_content):
         """Validate that the response contains valid audio files"""
@@ -183,6 +220,8 @@ class SmartRouter:
             "negative_keywords": len(self.negative_keywords),
             "specific_intents": len(self.specific_intents) // 2,
             "conversation_stages": len(self.conversation_stages),
+            "stage_machine": dialogue_stages.get_stats(),
+            "automaton_phrases": len(self.automaton),
             "cost_per_response": 0,
             "latency_ms": 0,
             "approach": "Linear Flow + Negative Logic"
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+KLARIQO SPECULATIVE ROUTING MODULE
+Starts routing on stable interim transcripts so the LLM round-trip overlaps
+the endpointing silence; the result is committed only if the final text matches
+"""
+
+import copy
+import time
+import threading
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import Config
+from clip_index import filter_repeats
+from routing_pipeline import routing_pipeline
+from text_utils import normalize_transcript
+
+
+class Speculation:
+    """One in-flight speculative routing call"""
+
+    __slots__ = ("text", "normalized", "future", "started_at", "finished_at", "scratch", "base_slots")
+
+    def __init__(self, text, normalized, future, started_at, session):
+        self.text = text
+        self.normalized = normalized
+        self.future = future
+        self.started_at = started_at
+        self.finished_at = None
+        # Routing runs on a copy so a speculation that misses leaves no slots or token counts behind
+        self.base_slots = dict(session.session_variables)
+        self.scratch = copy.copy(session)
+        self.scratch.session_variables = dict(self.base_slots)
+        self.scratch.prompt_tokens = 0
+
+    def commit(self, session):
+        """Apply the slots this speculation extracted and its prompt tokens to the live session"""
+        for slot, value in self.scratch.session_variables.items():
+            if value != self.base_slots.get(slot) and session.session_variables.get(slot) != value:
+                session.update_session_variable(slot, value)
+        session.prompt_tokens = self.scratch.prompt_tokens
+
+
+class SpeculativeRouter:
+    """Wraps a router: speculates on stable partial text, commits on a close final match"""
+
+    def __init__(self, router):
+        self.router = router
+        self.enabled = Config.SPECULATIVE_ROUTING
+        self.stable_seconds = Config.SPECULATION_STABLE_MS / 1000
+        self.match_ratio = Config.SPECULATION_MATCH_RATIO
+        self.max_per_turn = Config.SPECULATION_MAX_PER_TURN
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.SPECULATION_WORKERS,
+            thread_name_prefix="speculation"
+        )
+
+        self._stats_lock = threading.Lock()
+        self.stats = {"attempts": 0, "hits": 0, "misses": 0, "cancelled": 0, "saved_ms": 0}
+
+    def _count(self, session, key, amount=1):
+        session.speculation_stats[key] = session.speculation_stats.get(key, 0) + amount
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _matches(self, speculated, final):
+        if speculated == final:
+            return True
+        return SequenceMatcher(None, speculated, final).ratio() >= self.match_ratio
+
+    def observe(self, session):
+        """
+        Called by the turn worker after every event/poll while LISTENING
+
+        Cancels speculation the caller has talked past, and starts a new one once
+        the partial transcript has been unchanged for SPECULATION_STABLE_MS.
+        """
+        if not self.enabled:
+            return
+
+        text = session.partial_transcript()
+        if not text:
+            return
+        normalized = normalize_transcript(text)
+
+        current = session.speculation
+        if current is not None:
+            if current.normalized == normalized or self._matches(current.normalized, normalized):
+                return
+            # Caller kept talking - the speculative answer is for a different utterance
+            self.cancel(session)
+
+        if session.speculation_count >= self.max_per_turn:
+            return
+        if time.time() - session.interim_changed_at < self.stable_seconds:
+            return
+
+        started_at = time.time()
+        speculation = Speculation(text, normalized, None, started_at, session)
+
+        def run():
+            try:
+                return self.router.get_school_response(text, speculation.scratch)
+            finally:
+                speculation.finished_at = time.time()
+
+        speculation.future = self.executor.submit(run)
+        session.speculation = speculation
+        session.speculation_count += 1
+        self._count(session, "attempts")
+
+    def cancel(self, session):
+        """Discard the session's in-flight speculation"""
+        speculation = session.speculation
+        if speculation is None:
+            return
+        session.speculation = None
+        speculation.future.cancel()  # Only stops it if not started; otherwise the result is ignored
+        self._count(session, "cancelled")
+
+    def resolve(self, transcript, session, on_clip=None, on_text=None, deadline=None):
+        """
+        Get the response for an endpointed transcript, committing speculation when it matches
+
+        on_clip/on_text are only used on a miss, where the router may stream.
+        A matching speculation still in flight is waited for only as long as
+        the turn deadline allows; after that the turn is routed again under it.
+        """
+        speculation = session.speculation
+        session.speculation = None
+        session.speculation_count = 0
+
+        if speculation is not None:
+            if self._matches(speculation.normalized, normalize_transcript(transcript)):
+                resolved_at = time.time()
+                timeout = deadline.timeout(reserve_ms=Config.DEADLINE_RESPONSE_RESERVE_MS) if deadline else None
+                try:
+                    response_type, content = speculation.future.result(timeout=timeout)
+                except TimeoutError:
+                    print("⏰ Speculation still routing at the deadline, answering locally")
+                except Exception as e:
+                    print(f"⚠️ Speculative routing failed, routing again: {e}")
+                else:
+                    finished_at = speculation.finished_at or time.time()
+                    routing_ms = (finished_at - speculation.started_at) * 1000
+                    waited_ms = max(0.0, (finished_at - resolved_at) * 1000)
+                    self._count(session, "hits")
+                    self._count(session, "saved_ms", int(routing_ms - waited_ms))
+                    print(f"🔮 Speculation hit: saved {int(routing_ms - waited_ms)}ms")
+                    speculation.commit(session)
+
+                    # Turn counter moved on since the speculation started
+                    return filter_repeats(response_type, content, session)
+            else:
+                speculation.future.cancel()
+                self._count(session, "misses")
+
+        return self.router.get_school_response(transcript, session, on_clip, on_text, deadline)
+
+    def get_stats(self):
+        """Speculation hit rate and latency saved across all calls"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["hit_rate"] = round(stats["hits"] / stats["attempts"], 3) if stats["attempts"] else 0.0
+        return stats
+
+# Global speculative router wrapping the tiered routing pipeline
+speculative_router = SpeculativeRouter(routing_pipeline)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+KLARIQO STREAM PARSER MODULE
+Incremental parser for streamed router completions: emits each clip name of
+an "a.mp3 + b.mp3" chain (or of a structured JSON reply's clips array) as
+soon as it is complete and valid, or detects a GENERATE: prefix and emits
+the text sentence by sentence for TTS
+"""
+
+import re
+import json
+import time
+from config import Config
+from audio_manager import audio_manager
+from clip_index import fresh_clip
+from clip_resolver import clip_resolver
+from clip_schema import clip_schema
+
+GENERATE_PREFIX = "GENERATE:"
+
+# Sentence ends: Devanagari danda, full stop, question/exclamation mark
+_SENTENCE_END = re.compile(r"[।.?!]+(?=\s)")
+_QUOTES = str.maketrans("", "", "\"'`")
+
+# Structured replies: {"type": "AUDIO", "clips": ["a.mp3", ...], "text": ""}
+_JSON_TYPE = re.compile(r'"type"\s*:\s*"(\w+)"')
+_JSON_CLIPS = re.compile(r'"clips"\s*:\s*\[')
+_JSON_STRING = re.compile(r'\s*,?\s*"((?:[^"\\]|\\.)*)"')
+_JSON_TEXT = re.compile(r'"text"\s*:\s*"')
+
+
+class StreamingResponseParser:
+    """
+    Feed completion deltas, get events back as they become final
+
+    Events are ("clip", filename) in AUDIO mode and ("text", sentence) in TTS
+    mode. A reply starting with "{" is read as structured JSON: clips stream
+    out of the clips array, generated text sentence by sentence out of the
+    text string. Names not in valid_clips go through resolve_clip(name) →
+    clip or None when given; unresolved names are collected in `rejected`.
+    """
+
+    def __init__(self, valid_clips, min_sentence_chars=None, resolve_clip=None):
+        self.valid_clips = valid_clips
+        self.resolve_clip = resolve_clip
+        self.min_sentence_chars = min_sentence_chars or Config.STREAM_MIN_SENTENCE_CHARS
+        self.mode = None       # None until decided, then "AUDIO", "TTS" or "JSON"
+        self.buffer = ""       # undecided prefix / unfinished clip name / unsent text
+        self.clips = []
+        self.rejected = []
+        self.text_parts = []
+        self.json_type = None  # "AUDIO" / "GENERATE" once the JSON type field has streamed
+        self.json_pos = None   # buffer offset of the next clips array element
+        self.json_text_pos = None  # buffer offset of the next undecoded character of the text string
+        self.json_text = ""    # decoded generated text not yet sent
+        self.json_text_closed = False
+        self.invalid = False   # a JSON reply that did not parse in the end (e.g. truncated)
+
+    def _decide_mode(self):
+        stripped = self.buffer.lstrip()
+        if not stripped:
+            return
+        if stripped.startswith('{'):
+            self.mode = "JSON"
+            self.buffer = stripped
+            return
+        # Free text: quotes are noise
+        self.buffer = self.buffer.translate(_QUOTES)
+        stripped = self.buffer.lstrip()
+        if not stripped:
+            return
+        if stripped.startswith(GENERATE_PREFIX):
+            self.mode = "TTS"
+            self.buffer = stripped[len(GENERATE_PREFIX):].lstrip()
+        elif not GENERATE_PREFIX.startswith(stripped):
+            self.mode = "AUDIO"
+            self.buffer = stripped
+
+    def _clip_event(self, name):
+        name = name.strip()
+        if not name:
+            return []
+        if name not in self.valid_clips and self.resolve_clip:
+            name = self.resolve_clip(name) or name
+        if name in self.valid_clips and name not in self.clips:
+            self.clips.append(name)
+            return [("clip", name)]
+        if name not in self.valid_clips and name not in self.rejected:
+            self.rejected.append(name)
+        return []
+
+    def _audio_events(self, final):
+        events = []
+        while True:
+            plus = self.buffer.find('+')
+            mp3 = self.buffer.find('.mp3')
+            # A name is complete at the next "+" or right after ".mp3"
+            if mp3 != -1 and (plus == -1 or mp3 < plus):
+                cut = mp3 + len('.mp3')
+                events.extend(self._clip_event(self.buffer[:cut]))
+                self.buffer = self.buffer[cut:].lstrip().lstrip('+')
+            elif plus != -1:
+                events.extend(self._clip_event(self.buffer[:plus]))
+                self.buffer = self.buffer[plus + 1:]
+            else:
+                break
+        if final:
+            events.extend(self._clip_event(self.buffer))
+            self.buffer = ""
+        return events
+
+    def _sentences(self, text, final):
+        """(events for the sentences complete in text, unsent rest)"""
+        events = []
+        search_from = 0
+        while True:
+            match = _SENTENCE_END.search(text, search_from)
+            if not match:
+                break
+            if match.end() < self.min_sentence_chars:
+                search_from = match.end()  # Too short to be worth a TTS request - merge with the next
+                continue
+            sentence = text[:match.end()].strip()
+            text = text[match.end():].lstrip()
+            search_from = 0
+            self.text_parts.append(sentence)
+            events.append(("text", sentence))
+        if final and text.strip():
+            sentence = text.strip()
+            self.text_parts.append(sentence)
+            events.append(("text", sentence))
+            text = ""
+        return events, text
+
+    def _text_events(self, final):
+        events, self.buffer = self._sentences(self.buffer, final)
+        return events
+
+    def _json_text_delta(self):
+        """Decode the text string's characters streamed since the last call"""
+        if self.json_text_closed:
+            return ""
+        if self.json_text_pos is None:
+            match = _JSON_TEXT.search(self.buffer)
+            if not match:
+                return ""
+            self.json_text_pos = match.end()
+
+        decoded = []
+        pos, end = self.json_text_pos, len(self.buffer)
+        while pos < end:
+            char = self.buffer[pos]
+            if char == '"':
+                self.json_text_closed = True
+                return "".join(decoded)
+            if char == '\\':
+                size = 6 if self.buffer[pos + 1:pos + 2] == 'u' else 2
+                if pos + size > end:
+                    break  # escape still arriving
+                decoded.append(json.loads(f'"{self.buffer[pos:pos + size]}"'))
+                pos += size
+            else:
+                decoded.append(char)
+                pos += 1
+        self.json_text_pos = pos
+        return "".join(decoded)
+
+    def _json_events(self, final):
+        events = []
+        if self.json_type is None:
+            match = _JSON_TYPE.search(self.buffer)
+            if match:
+                self.json_type = match.group(1)
+
+        if self.json_type == "AUDIO":
+            if self.json_pos is None:
+                match = _JSON_CLIPS.search(self.buffer)
+                if match:
+                    self.json_pos = match.end()
+            while self.json_pos is not None:
+                match = _JSON_STRING.match(self.buffer, self.json_pos)
+                if not match:
+                    break
+                self.json_pos = match.end()
+                events.extend(self._clip_event(json.loads(f'"{match.group(1)}"')))
+
+        if self.json_type == "GENERATE":
+            self.json_text += self._json_text_delta()
+            sentences, self.json_text = self._sentences(self.json_text, final)
+            events.extend(sentences)
+
+        if final:
+            # The whole reply decides; anything the incremental pass missed is emitted now
+            parsed = clip_schema.parse(self.buffer)
+            self.invalid = parsed is None
+            if parsed and parsed[0] == "TTS":
+                if self.json_type != "GENERATE":
+                    self.json_type = "GENERATE"
+                    self.text_parts.append(parsed[1])
+                    events.append(("text", parsed[1]))
+            elif parsed:
+                self.json_type = "AUDIO"
+                for name in parsed[1].split('+'):
+                    events.extend(self._clip_event(name))
+        return events
+
+    def feed(self, delta, final=False):
+        """Add a completion delta; returns the events it completed"""
+        delta = delta or ""
+        self.buffer += delta if self.mode in (None, "JSON") else delta.translate(_QUOTES)
+        if self.mode is None:
+            self._decide_mode()
+            if self.mode is None:
+                if not final:
+                    return []
+                self.mode = "AUDIO"  # A bare partial "GENERATE" is not a valid reply either
+
+        if self.mode == "JSON":
+            return self._json_events(final)
+        return self._audio_events(final) if self.mode == "AUDIO" else self._text_events(final)
+
+    def finish(self):
+        """Flush whatever is left once the stream ends"""
+        return self.feed("", final=True)
+
+    def result(self):
+        """(response_type, content) equivalent to parsing the full completion"""
+        if self.mode == "TTS" or self.json_type == "GENERATE":
+            return "TTS", " ".join(self.text_parts)
+        return "AUDIO", " + ".join(self.clips)
+
+
+class StreamedTurn:
+    """
+    One streamed router call: parses deltas, drops repeats clip by clip and
+    hands playable clips / TTS sentences to on_clip(name) / on_text(sentence)
+    """
+
+    def __init__(self, session, on_clip, on_text):
+        self.parser = StreamingResponseParser(audio_manager.clip_ids, resolve_clip=clip_resolver.resolve)
+        self.session = session
+        self.on_clip = on_clip
+        self.on_text = on_text
+        self.played = []
+        self.repeats = []
+        self.started_at = time.time()
+        self.first_event_ms = None
+
+    def _dispatch(self, events):
+        for kind, value in events:
+            if kind == "clip":
+                clip = fresh_clip(value, self.session, self.played)
+                if clip != value:
+                    self.repeats.append(value)
+                if not clip or clip in self.played:
+                    continue
+                self.played.append(clip)
+                self._mark_first_event()
+                self.on_clip(clip)
+            else:
+                self._mark_first_event()
+                self.on_text(value)
+
+    def _mark_first_event(self):
+        if self.first_event_ms is None:
+            self.first_event_ms = int((time.time() - self.started_at) * 1000)
+
+    def feed(self, delta):
+        self._dispatch(self.parser.feed(delta))
+
+    def finish(self):
+        self._dispatch(self.parser.finish())
+
+    @property
+    def invalid(self):
+        """True if the reply was JSON that never parsed (the call failed, whatever streamed)"""
+        return self.parser.invalid
+    
+    @property
+    def streamed(self):
+        """True once anything has been handed to the callbacks"""
+        return bool(self.played or self.parser.text_parts)
+
+    def failure(self):
+        """Why the call failed when nothing streamed (None when it streamed or every clip was a repeat)"""
+        if self.streamed or (self.repeats and not self.invalid):
+            return None
+        if self.invalid:
+            return "unparseable structured reply"
+        if self.parser.rejected:
+            return f"reply named only unknown clips: {', '.join(self.parser.rejected)}"
+        return "reply had nothing playable"
+
+    def result(self):
+        """
+        (response_type, content) describing exactly what was streamed; when
+        every clip was a repeat it is the repeat fallback, not yet played
+        """
+        if self.parser.rejected:
+            print(f"⚠️ Streamed reply named unknown clips: {', '.join(self.parser.rejected)}")
+        if self.repeats:
+            print(f"🔁 Repeat filtered while streaming: {', '.join(self.repeats)}")
+
+        response_type, content = self.parser.result()
+        if response_type == "TTS" and content:
+            return response_type, content
+        if self.played:
+            return "AUDIO", " + ".join(self.played)
+        return "TTS", Config.REPEAT_FALLBACK_TEXT
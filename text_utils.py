@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+KLARIQO TEXT UTILITIES MODULE
+Transcript normalization shared by speculation and the response caches,
+and prompt token estimates
+"""
+
+import re
+
+# \w misses Devanagari vowel signs and the virama, so the block is kept explicitly (minus the dandas)
+_PUNCTUATION = re.compile(r"[^\w\sऀ-ॿ]+|[।॥]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_transcript(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+_token_encoder = None
+
+
+def estimate_tokens(text):
+    """LLM token count: tiktoken's cl100k when installed, else ~4 UTF-8 bytes per token"""
+    global _token_encoder
+    if _token_encoder is None:
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _token_encoder = False
+    if _token_encoder:
+        return len(_token_encoder.encode(text))
+    return (len(text.encode('utf-8')) + 3) // 4
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+KLARIQO TEXT VECTORS MODULE
+Character n-gram hashing vectorizer (NumPy only, no network/GPU) used by the
+semantic response cache and the offline-trained intent classifier
+"""
+
+import zlib
+import numpy as np
+from config import Config
+from text_utils import normalize_transcript
+
+# Hinglish / Hindi function words that would otherwise dominate short utterances
+# ("fees kya hai" vs "kitni fees lagti hai" share almost nothing else)
+STOPWORDS = {
+    "hai", "hain", "ho", "hota", "hoti", "hote", "kya", "ki", "ka", "ke", "ko", "me", "mein", "se",
+    "aap", "hum", "ji", "toh", "to", "na", "bhi", "lagti", "lagta", "lagte", "batao", "bataiye",
+    "please", "is", "the", "a", "what", "है", "हैं", "क्या", "की", "का", "के", "को", "में", "से",
+    "जी", "तो", "भी", "बताइए", "बताओ",
+}
+
+
+class HashingVectorizer:
+    """Maps text to an L2-normalized float32 vector of hashed character n-gram counts"""
+
+    def __init__(self, dim=None, ngram_range=(2, 4), stopwords=STOPWORDS):
+        self.dim = dim or Config.SEMANTIC_VECTOR_DIM
+        self.ngram_range = ngram_range
+        self.stopwords = stopwords
+
+    def ngram_indexes(self, text):
+        """Hashed bucket index of every within-word character n-gram (crc32 is stable across processes)"""
+        low, high = self.ngram_range
+        indexes = []
+        for word in normalize_transcript(text).split():
+            if word in self.stopwords:
+                continue
+            padded = f" {word} "
+            indexes.extend(
+                zlib.crc32(padded[i:i + n].encode('utf-8')) % self.dim
+                for n in range(low, high + 1)
+                for i in range(len(padded) - n + 1)
+            )
+        return indexes
+
+    def transform(self, text):
+        """One text → vector of shape (dim,); all zeros for empty text"""
+        indexes = self.ngram_indexes(text)
+        vector = np.bincount(indexes, minlength=self.dim).astype(np.float32) if indexes \
+            else np.zeros(self.dim, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def transform_many(self, texts):
+        """Texts → matrix of shape (len(texts), dim)"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.transform(text)
+        return matrix
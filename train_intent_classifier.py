@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+KLARIQO INTENT CLASSIFIER TRAINER
+Builds the local clip-chain classifier from logs/conversation_logs.csv: every
+parent transcript paired with the clip chain the LLM chose. Hashed character
+n-grams feed a softmax linear model trained with NumPy; the weights are saved as
+plain arrays for intent_classifier.py.
+
+Calls are split 80/20 for the evaluation report (accuracy, coverage at each
+confidence level, per-decision latency in µs); the saved model is then refit on
+every call. Held-out turns the LLM answered with generated text or a rare chain
+count as errors if the classifier confidently answers them, so the recommended
+threshold also reflects how well it defers.
+
+Usage: python train_intent_classifier.py [conversation_logs.csv] [model.npz] [target_accuracy]
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+from collections import Counter
+import numpy as np
+from config import Config
+from logger import call_logger
+from text_vectors import HashingVectorizer
+
+DEFAULT_LOG = os.path.join(Config.LOGS_FOLDER, "conversation_logs.csv")
+MIN_EXAMPLES = 3  # clip chains seen fewer times than this stay with the LLM
+CONFIDENCE_LEVELS = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95]
+
+
+def sparse_rows(vectorizer, texts):
+    """Per text: (unique bucket indexes, L2-normalized counts) - the dense matrix would not fit"""
+    rows = []
+    for text in texts:
+        indexes, counts = np.unique(vectorizer.ngram_indexes(text), return_counts=True)
+        values = counts.astype(np.float32)
+        norm = np.linalg.norm(values)
+        rows.append((indexes, values / norm if norm else values))
+    return rows
+
+
+def dense_batch(rows, dim):
+    batch = np.zeros((len(rows), dim), dtype=np.float32)
+    for row, (indexes, values) in enumerate(rows):
+        batch[row, indexes] = values
+    return batch
+
+
+def fit(rows, targets, dim, classes, epochs=40, batch_size=256, learning_rate=0.05, l2=1e-5, seed=7):
+    """Softmax regression with Adam on mini-batches; returns (weights, bias)"""
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((dim, classes), dtype=np.float32)
+    bias = np.zeros(classes, dtype=np.float32)
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    targets = np.asarray(targets)
+    step = 0
+
+    for _ in range(epochs):
+        order = rng.permutation(len(rows))
+        for start in range(0, len(rows), batch_size):
+            picked = order[start:start + batch_size]
+            batch = dense_batch([rows[i] for i in picked], dim)
+
+            scores = batch @ weights + bias
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            probabilities = scores / scores.sum(axis=1, keepdims=True)
+            probabilities[np.arange(len(picked)), targets[picked]] -= 1.0
+            probabilities /= len(picked)
+
+            step += 1
+            for index, (param, grad) in enumerate((
+                (weights, batch.T @ probabilities + l2 * weights),
+                (bias, probabilities.sum(axis=0)),
+            )):
+                first, second = moments[2 * index], moments[2 * index + 1]
+                first *= beta1
+                first += (1 - beta1) * grad
+                second *= beta2
+                second += (1 - beta2) * grad * grad
+                corrected = (first / (1 - beta1 ** step)) / (np.sqrt(second / (1 - beta2 ** step)) + epsilon)
+                param -= learning_rate * corrected
+
+    return weights, bias
+
+
+def evaluate(vectorizer, weights, bias, texts, targets):
+    """Accuracy, coverage per confidence level and per-decision latency (target -1 = should defer)"""
+    predictions, confidences, latencies = [], [], []
+    for text in texts:
+        start = time.perf_counter()
+        scores = vectorizer.transform(text) @ weights + bias
+        scores = np.exp(scores - scores.max())
+        best = int(np.argmax(scores))
+        confidence = float(scores[best] / scores.sum())
+        latencies.append((time.perf_counter() - start) * 1e6)
+        predictions.append(best)
+        confidences.append(confidence)
+
+    targets = np.array(targets)
+    correct = np.array(predictions) == targets
+    learnable = targets >= 0
+    confidences = np.array(confidences)
+    latencies = np.sort(np.array(latencies))
+
+    levels = []
+    for level in CONFIDENCE_LEVELS:
+        covered = confidences >= level
+        levels.append({
+            "confidence": level,
+            "coverage": round(float(covered.mean()), 3),
+            "accuracy": round(float(correct[covered].mean()), 3) if covered.any() else None,
+        })
+
+    return {
+        "turns": len(texts),
+        "learnable_turns": int(learnable.sum()),
+        "accuracy": round(float(correct[learnable].mean()), 3) if learnable.any() else None,
+        "levels": levels,
+        "latency_us": {
+            "p50": round(float(latencies[len(latencies) // 2]), 1),
+            "p95": round(float(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]), 1),
+            "max": round(float(latencies[-1]), 1),
+        },
+    }
+
+
+def main():
+    log_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    model_path = sys.argv[2] if len(sys.argv) > 2 else Config.INTENT_MODEL_PATH
+    target_accuracy = float(sys.argv[3]) if len(sys.argv) > 3 else 0.95
+
+    if not os.path.exists(log_path):
+        print(f"❌ Conversation log not found: {log_path}")
+        return
+
+    # Only clip chains seen often enough are learnable; generated (TTS) replies stay with the LLM
+    turns = call_logger.load_answered_turns(log_path)
+    counts = Counter(content for _, _, response_type, content in turns if response_type == "AUDIO" and content)
+    labels = sorted(label for label, count in counts.items() if count >= MIN_EXAMPLES)
+    label_index = {label: i for i, label in enumerate(labels)}
+
+    if len(labels) < 2:
+        print(f"❌ Need at least 2 clip chains with {MIN_EXAMPLES}+ examples, found {len(labels)}")
+        return
+
+    vectorizer = HashingVectorizer(dim=Config.INTENT_VECTOR_DIM)
+    texts = [transcript for _, transcript, _, _ in turns]
+    targets = np.array([
+        label_index.get(content, -1) if response_type == "AUDIO" else -1
+        for _, _, response_type, content in turns
+    ])
+    rows = sparse_rows(vectorizer, texts)
+
+    # Hold out whole calls so a caller's repeated phrasing can't leak into the test set
+    held_out = np.array([zlib.crc32(call_sid.encode('utf-8')) % 5 == 0 for call_sid, _, _, _ in turns])
+    if held_out.all() or not held_out.any():
+        held_out = np.arange(len(turns)) % 5 == 0
+    learnable = targets >= 0
+    train = learnable & ~held_out
+
+    print(f"🧪 {len(turns)} answered turns: {int(learnable.sum())} on {len(labels)} learnable chains, "
+          f"{int((~learnable).sum())} left to the LLM (generated text or chains seen <{MIN_EXAMPLES} times)")
+    print(f"   training on {int(train.sum())} turns, evaluating on {int(held_out.sum())}")
+
+    weights, bias = fit([rows[i] for i in np.flatnonzero(train)], targets[train], vectorizer.dim, len(labels))
+
+    report = evaluate(
+        vectorizer, weights, bias,
+        [texts[i] for i in np.flatnonzero(held_out)],
+        targets[held_out]
+    )
+
+    if report["accuracy"] is not None:
+        print(f"📊 Held-out accuracy on learnable turns (always answering): {report['accuracy']:.1%}")
+    print(f"   coverage/accuracy over all held-out turns (answering a turn the LLM handled with text counts as wrong)")
+    print(f"   {'confidence':>10s} {'coverage':>9s} {'accuracy':>9s}")
+    threshold = None
+    for level in report["levels"]:
+        accuracy = f"{level['accuracy']:.1%}" if level["accuracy"] is not None else "-"
+        print(f"   {level['confidence']:10.2f} {level['coverage']:9.1%} {accuracy:>9s}")
+        if threshold is None and level["accuracy"] is not None and level["accuracy"] >= target_accuracy:
+            threshold = level["confidence"]
+    latency = report["latency_us"]
+    print(f"⏱️ Per decision: p50 {latency['p50']}µs, p95 {latency['p95']}µs, max {latency['max']}µs")
+
+    if threshold is None:
+        threshold = CONFIDENCE_LEVELS[-1]
+        print(f"⚠️ No confidence level reaches {target_accuracy:.0%} accuracy, using {threshold}")
+    else:
+        print(f"✅ Confidence threshold {threshold} (lowest level with ≥{target_accuracy:.0%} accuracy)")
+
+    # Final model sees every call
+    weights, bias = fit([rows[i] for i in np.flatnonzero(learnable)], targets[learnable], vectorizer.dim, len(labels))
+
+    folder = os.path.dirname(model_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    np.savez(
+        model_path,
+        weights=weights,
+        bias=bias,
+        labels=np.array(labels),
+        dim=np.array(vectorizer.dim),
+        ngram_range=np.array(vectorizer.ngram_range),
+        threshold=np.array(threshold),
+    )
+
+    report.update({"labels": len(labels), "threshold": threshold, "target_accuracy": target_accuracy,
+                   "log": log_path, "trained_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+    report_path = os.path.splitext(model_path)[0] + "_report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    size_kb = os.path.getsize(model_path) // 1024
+    print(f"💾 Saved {model_path} ({size_kb}KB) and {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,25 +8,30 @@ import os
 import time
 from elevenlabs import ElevenLabs, VoiceSettings
 from config import Config
+from http_pool import http_pool
 
 class TTSEngine:
     """Manages text-to-speech generation using ElevenLabs"""
     
     def __init__(self):
-        self.client = ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
+        self.client = ElevenLabs(
+            api_key=Config.ELEVENLABS_API_KEY,
+            httpx_client=http_pool.httpx_client("elevenlabs", Config.PLAYOUT_RENDER_WORKERS),  # one per render worker
+        )
         self.voice_id = Config.VOICE_ID
         self.temp_folder = Config.TEMP_FOLDER
         
         # Ensure temp folder exists
         os.makedirs(self.temp_folder, exist_ok=True)
     
-    def generate_audio(self, text, save_temp=True):
+    def generate_audio(self, text, save_temp=True, timeout=None):
         """
         Generate audio from text using ElevenLabs
         
         Args:
             text (str): Text to convert to speech
             save_temp (bool): Whether to save as temporary file
+            timeout (float): Seconds allowed for the whole synthesis (None = SDK default)
             
         Returns:
             str: Path to generated audio file, or None if failed
@@ -41,18 +46,24 @@ class TTSEngine:
             )
             
             # Generate audio stream
+            request_options = {"timeout_in_seconds": max(1, int(timeout + 0.999))} if timeout else None
             audio_stream = self.client.text_to_speech.stream(
                 text=text,
                 voice_id=self.voice_id,
                 model_id="eleven_flash_v2_5",  # Fast model for real-time
-                voice_settings=voice_settings
+                voice_settings=voice_settings,
+                request_options=request_options
             )
             
-            # Collect audio data
+            # Collect audio data (the SDK timeout is per read, so the total is checked here)
+            cutoff = time.time() + timeout if timeout else None
             audio_data = b""
             for chunk in audio_stream:
                 if chunk:
                     audio_data += chunk
+                if cutoff and time.time() > cutoff:
+                    print(f"⏰ TTS generation passed its {timeout:.1f}s budget, dropped")
+                    return None
             
             if not audio_data:
                 return None
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+KLARIQO SEMANTIC CACHE THRESHOLD TUNER
+Replays parent transcripts from logs/conversation_logs.csv in order and, for a
+sweep of cosine thresholds, measures how often the semantic cache would have
+answered (hit rate) and how often its answer matched what Nisha actually
+played (precision). Recommends the lowest threshold meeting the precision target.
+
+Usage: python tune_semantic_threshold.py [conversation_logs.csv] [min_precision]
+"""
+
+import os
+import sys
+import numpy as np
+from config import Config
+from logger import call_logger
+from text_vectors import HashingVectorizer
+
+DEFAULT_LOG = os.path.join(Config.LOGS_FOLDER, "conversation_logs.csv")
+
+
+def nearest_earlier(vectors, block=512):
+    """For each row: similarity to and index of the most similar earlier row (-1 if none)"""
+    count = len(vectors)
+    best_similarity = np.full(count, -1.0, dtype=np.float32)
+    best_index = np.full(count, -1, dtype=np.int64)
+
+    for start in range(0, count, block):
+        end = min(count, start + block)
+        similarities = vectors[start:end] @ vectors[:end].T
+        # Only entries cached before this turn count (strictly lower triangle)
+        rows = np.arange(start, end)[:, None]
+        similarities[np.arange(end)[None, :] >= rows] = -1.0
+        best_index[start:end] = np.argmax(similarities, axis=1)
+        best_similarity[start:end] = similarities[np.arange(end - start), best_index[start:end]]
+
+    best_index[best_similarity < 0] = -1
+    return best_similarity, best_index
+
+
+def main():
+    log_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG
+    min_precision = float(sys.argv[2]) if len(sys.argv) > 2 else 0.95
+
+    if not os.path.exists(log_path):
+        print(f"❌ Conversation log not found: {log_path}")
+        return
+
+    turns = [
+        (transcript, f"{response_type}:{content}")
+        for _, transcript, response_type, content in call_logger.load_answered_turns(log_path)
+    ]
+    if len(turns) < 2:
+        print(f"❌ Need at least 2 answered parent turns, found {len(turns)}")
+        return
+
+    vectorizer = HashingVectorizer()
+    vectors = vectorizer.transform_many([transcript for transcript, _ in turns])
+    responses = [response for _, response in turns]
+    best_similarity, best_index = nearest_earlier(vectors)
+    same_answer = np.array([
+        index >= 0 and responses[index] == responses[row] for row, index in enumerate(best_index)
+    ])
+
+    print(f"🧪 {len(turns)} answered parent turns from {log_path}")
+    print(f"   (session-state buckets aren't logged, so every earlier turn is a candidate)")
+    print(f"   {'threshold':>9s} {'hit rate':>9s} {'precision':>10s} {'hits':>6s}")
+
+    recommended = None
+    for threshold in np.arange(0.50, 0.99, 0.02):
+        hits = best_similarity >= threshold
+        hit_count = int(hits.sum())
+        precision = float(same_answer[hits].mean()) if hit_count else 1.0
+        print(f"   {threshold:9.2f} {hit_count / len(turns):9.1%} {precision:10.1%} {hit_count:6d}")
+        if recommended is None and hit_count and precision >= min_precision:
+            recommended = threshold
+
+    if recommended is None:
+        print(f"⚠️ No threshold reaches {min_precision:.0%} precision - keep SEMANTIC_CACHE_THRESHOLD high")
+    else:
+        print(f"✅ Recommended SEMANTIC_CACHE_THRESHOLD = {recommended:.2f} "
+              f"(lowest threshold with ≥{min_precision:.0%} precision, current {Config.SEMANTIC_CACHE_THRESHOLD})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+KLARIQO TURN DEADLINE MODULE
+One time budget per turn, from the moment the caller's speech is endpointed
+to the first audio they hear. The deadline object travels with the turn
+through routing, TTS, MP3→PCM conversion and playout; each stage asks how
+much time is left, bounds its own wait by it, and when it runs out takes a
+defined cheaper path instead: a cached answer, else a short "one moment"
+hold reply played while the slow stage finishes. Every miss is counted per stage and logged.
+"""
+
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import Config
+from audio_manager import audio_manager
+from logger import call_logger
+
+# Bounded waits on work that cannot be interrupted (e.g. librosa) run here
+_stage_executor = ThreadPoolExecutor(max_workers=Config.DEADLINE_WORKERS, thread_name_prefix="deadline")
+
+
+class TurnDeadline:
+    """Time budget for one turn; started_at is the endpoint time"""
+
+    __slots__ = ("call_sid", "started_at", "budget", "missed", "met_at")
+
+    def __init__(self, call_sid="", budget_ms=None, started_at=None):
+        self.call_sid = call_sid
+        self.started_at = started_at or time.time()
+        self.budget = (budget_ms or Config.DEADLINE_TURN_MS) / 1000
+        self.missed = []  # stages that ran out of time, in order
+        self.met_at = None  # first audio reached the caller
+
+    @property
+    def expires_at(self):
+        return self.started_at + self.budget
+
+    def elapsed_ms(self):
+        return int((time.time() - self.started_at) * 1000)
+
+    def meet(self):
+        """First audio is playing: later stages are only bound by their own limits"""
+        if self.met_at is None:
+            self.met_at = time.time()
+
+    def remaining(self, reserve_ms=0):
+        """Seconds left (never negative), keeping reserve_ms back for later stages"""
+        if self.met_at is not None:
+            return float("inf")
+        return max(0.0, self.expires_at - reserve_ms / 1000 - time.time())
+
+    def expired(self, reserve_ms=0):
+        return self.remaining(reserve_ms) <= 0
+
+    def timeout(self, cap=None, reserve_ms=0):
+        """Timeout for a blocking call: what is left, capped by the stage's own limit (None = unbounded)"""
+        left = self.remaining(reserve_ms)
+        if cap is not None:
+            left = min(left, cap)
+        return None if left == float("inf") else left
+
+    def miss(self, stage, action):
+        """Record that `stage` ran out of time and what it did instead"""
+        self.missed.append(stage)
+        turn_deadlines.record_miss(self, stage, action)
+
+    def run(self, stage, fn, *args, cap=None, reserve_ms=0, action="skipped"):
+        """fn(*args) bounded by the time left; on a miss returns None (fn's result is dropped)"""
+        left = self.timeout(cap, reserve_ms)
+        if left is not None and left <= 0:
+            self.miss(stage, action)
+            return None
+        future = _stage_executor.submit(fn, *args)
+        try:
+            return future.result(timeout=left)
+        except TimeoutError:
+            self.miss(stage, action)
+            return None
+
+
+def hold_response():
+    """The last-resort reply: the configured hold clip if the library has it, else the hold text"""
+    clip = Config.DEADLINE_HOLD_CLIP
+    if clip and clip in audio_manager.clip_ids:
+        return "AUDIO", clip
+    return "TTS", Config.DEADLINE_HOLD_TEXT
+
+
+class TurnDeadlineMonitor:
+    """Per-stage deadline miss counts across calls"""
+
+    def __init__(self):
+        self.turns = 0
+        self.turns_missed = 0
+        self.misses = Counter()
+        self.actions = Counter()
+        self._lock = threading.Lock()
+
+    def start(self, call_sid, started_at=None):
+        """New deadline for a turn endpointed at started_at"""
+        with self._lock:
+            self.turns += 1
+        return TurnDeadline(call_sid, started_at=started_at)
+
+    def record_miss(self, deadline, stage, action):
+        with self._lock:
+            self.turns_missed += len(deadline.missed) == 1
+            self.misses[stage] += 1
+            self.actions[f"{stage}→{action}"] += 1
+        print(f"⏰ Turn deadline missed at {stage} ({deadline.elapsed_ms()}ms of "
+              f"{int(deadline.budget * 1000)}ms) → {action}")
+        call_logger.log_deadline_miss(deadline.call_sid, stage, action,
+                                      int(deadline.budget * 1000), deadline.elapsed_ms())
+
+    def get_stats(self):
+        """Turns that missed, misses per stage and what each stage fell back to"""
+        with self._lock:
+            return {
+                "budget_ms": Config.DEADLINE_TURN_MS,
+                "turns": self.turns,
+                "turns_missed": self.turns_missed,
+                "miss_rate": round(self.turns_missed / self.turns, 3) if self.turns else 0.0,
+                "misses_by_stage": dict(self.misses),
+                "fallbacks": dict(self.actions),
+            }
+
+# Global turn deadline monitor
+turn_deadlines = TurnDeadlineMonitor()